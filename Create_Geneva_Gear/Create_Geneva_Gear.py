@@ -4,117 +4,291 @@
 # Description: This script creates a solid model of a Geneva Gear that can be varied.
 
 import adsk.core, adsk.fusion, traceback
-import json
+import importlib.util
+import math
 import os
+import sys
+import time
 
+# Make the helper modules next to this script importable
+_scriptDir = os.path.dirname(os.path.realpath(__file__))
+if _scriptDir not in sys.path:
+   sys.path.append(_scriptDir)
+
+# Load a helper module the first time one of its names is used, so starting the add-in with Fusion stays fast
+def _lazyImport(name):
+   if name in sys.modules:
+      return sys.modules[name]
+   spec = importlib.util.find_spec(name)
+   loader = importlib.util.LazyLoader(spec.loader)
+   spec.loader = loader
+   module = importlib.util.module_from_spec(spec)
+   sys.modules[name] = module
+   loader.exec_module(module)
+   return module
+
+import geneva_cache
+import geneva_design_parameters
+import geneva_profile
+import geneva_worker
+
+# These bring in NumPy, hashing and the optimizer. Opening the dialog loads the ones the preview worker
+# uses before the worker starts, so a module is never loaded from two threads at once.
+geneva_catalog = _lazyImport('geneva_catalog')
+geneva_geometry = _lazyImport('geneva_geometry')
+geneva_history = _lazyImport('geneva_history')
+geneva_motion = _lazyImport('geneva_motion')
+geneva_optimize = _lazyImport('geneva_optimize')
+geneva_part_cache = _lazyImport('geneva_part_cache')
+geneva_settings = _lazyImport('geneva_settings')
+geneva_timing = _lazyImport('geneva_timing')
+geneva_train = _lazyImport('geneva_train')
+geneva_validation = _lazyImport('geneva_validation')
+
+# The command and its button in the Create panel of the Design workspace
+COMMAND_ID = 'genevaGearCmd'
+PANEL_ID = 'SolidCreatePanel'
+
+# Event handlers, and what to close when the add-in stops, kept for as long as the add-in runs
+_handlers = []
+_cleanup = []
+
+# Runs once when the add-in starts: registers the command and its button
 def run(context):
-    _handlers = []
     ui = None
     try:
        # Get the  application and user interface objects
        app = adsk.core.Application.get()
        ui = app.userInterface
 
-       # Get the active produce and design
-       product = app.activeProduct
-       design = adsk.fusion.Design.cast(product)
+       # The active design and its root component, looked up each time the dialog opens
+       # because the add-in stays loaded while documents are opened and closed
+       design = None
+       rootComp = None
 
-       # Access the root component of the active design
-       rootComp = design.rootComponent
-
-       #Start up the GUI process
-       cmdDef = ui.commandDefinitions.itemById('genevaGearCmd')
+       #Start up the GUI process, replacing a definition left by an add-in that did not stop cleanly
+       cmdDef = ui.commandDefinitions.itemById(COMMAND_ID)
        if cmdDef:
             cmdDef.deleteMe()
         
        #Fresh cmdDef
        cmdDef = ui.commandDefinitions.addButtonDefinition(
-          'genevaGearCmd',
+          COMMAND_ID,
           'Geneva Gear',
           'Create a Geneva Gear'
        )
 
        #Define function for making the geneva gears
-       def GenevaCreator(drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius):
+       def GenevaCreator(drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius, offset=None, name=None, stages=1, layout='stack'):
          # Initiate timeline group
          timeline = design.timeline
          timelineStart = timeline.count
+
+         # Time each phase of the build when "timingLog" is turned on in the JSON file
+         timer = geneva_timing.PhaseTimer(timingEnabled)
+         buildStart = time.perf_counter()
+
+         # Build in the root component, or in a new component placed at the offset (for example on a catalog grid)
+         parentOccurrence = None
+         genevaComp = rootComp
+         if offset is not None:
+            placement = adsk.core.Matrix3D.create()
+            placement.translation = adsk.core.Vector3D.create(offset[0], offset[1], 0)
+            parentOccurrence = rootComp.occurrences.addNewComponent(placement)
+            genevaComp = parentOccurrence.component
+            if name:
+               genevaComp.name = name
          
 
-         # Math for the gears
+         # Math for the gears, shared with the tools that run without Fusion
+         geometry = geneva_geometry.computeGeometry(drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius)
+         angle = geometry['angle']
+         driveProfileRadius = geometry['driveProfileRadius']
+         pinBaseRadius = geometry['pinBaseRadius']
+         baseCorners = geneva_profile.driveBaseCorners(geometry)
 
-         # Compute angle using taylor series
-         pi = 3.1415926535897932
-         angle = pi/toothNumber
-         cos = 1-angle**2/2+angle**4/24-angle**6/720+angle**8/40320-angle**10/3628800
-         sin = angle-angle**3/6+angle**5/120-angle**7/5040+angle**9/362880-angle**11/39916800
-   
-         # Calculation for 3rd point distance
-         thirdDist = drivenRadius*cos + drivenRadius*sin**2/cos
-   
-         # Calculation for drive radius
-         driveRadius = drivenRadius*sin/(1-sin**2)**(0.5)
-   
-         # Calculation for construction radius
-         constructionRadius = thirdDist - driveRadius
-   
-         # Calculation for slot line length
-         slotLineLength = drivenRadius - constructionRadius
-   
-         # Calculation for drive gear profile radius
-         driveProfileRadius = thirdDist-drivenRadius*cos+slotRadius
-   
-         # Calculation for pin base tangent lines
-         pinBaseRadius = 2*slotRadius
-         const1 = thirdDist - constructionRadius
-         const2 = (const1)/(driveRadius/(pinBaseRadius)-1)
+         # Bodies of the same pair in the part cache, when it is turned on
+         values = geneva_catalog.creatorValues((drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius))
+         cachedParts = partCache.find(values) if partCache is not None else None
+
+         # Publish the inputs as user parameters, the sketches and features below reference them.
+         # Inserted bodies do not follow the parameters, and the other stages of a train stay where they were
+         # placed, so those pairs can not be edited.
+         prefix = geneva_design_parameters.newPrefix(design)
+         names = geneva_design_parameters.publishParameters(design, prefix, drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius, cachedParts is None and stages == 1)
+         timer.lap('parameters')
+
+         # Convert a point from the geometry into a Fusion point on the XY plane
+         def toPoint3D(point):
+            if isinstance(point, str):
+               point = geometry[point]
+            return adsk.core.Point3D.create(point[0], point[1], 0)
+
+         # Transform of a stage placement from geneva_train: a rotation about the Z axis, then a translation
+         def toMatrix3D(placement):
+            angle, x, y, z = placement
+            matrix = adsk.core.Matrix3D.create()
+            matrix.setToRotation(angle, adsk.core.Vector3D.create(0, 0, 1), adsk.core.Point3D.create(0, 0, 0))
+            matrix.translation = adsk.core.Vector3D.create(x, y, z)
+            return matrix
+
+         # Value input that follows one of the gear parameters
+         def parameterInput(expression):
+            return adsk.core.ValueInput.createByString(expression.format(**names))
+
+         # Place a circle at the sketch origin, or on the X axis at the given distance, and size it by a parameter
+         def dimensionCircle(sketch, circle, radiusExpression, distanceExpression=None):
+            center = circle.centerSketchPoint
+            textPoint = adsk.core.Point3D.create(center.geometry.x, center.geometry.y + circle.radius/2, 0)
+            if distanceExpression is None:
+               sketch.geometricConstraints.addCoincident(center, sketch.originPoint)
+            else:
+               sketch.geometricConstraints.addHorizontalPoints(sketch.originPoint, center)
+               distance = sketch.sketchDimensions.addDistanceDimension(sketch.originPoint, center, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
+               distance.parameter.expression = distanceExpression.format(**names)
+            radius = sketch.sketchDimensions.addRadialDimension(circle, textPoint)
+            radius.parameter.expression = radiusExpression.format(**names)
+
+         # Keep a line tangent to two circles with its ends on them
+         def tangentBetween(sketch, line, startCircle, endCircle):
+            constraints = sketch.geometricConstraints
+            constraints.addTangent(startCircle, line)
+            constraints.addTangent(endCircle, line)
+            constraints.addCoincident(line.startSketchPoint, startCircle)
+            constraints.addCoincident(line.endSketchPoint, endCircle)
    
          # Create the necessary components for the gears
-         emptyOccurrence = rootComp.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+         emptyOccurrence = genevaComp.occurrences.addNewComponent(adsk.core.Matrix3D.create())
          emptyOccurrence.isGrounded = True
-         driveOccurrence = rootComp.occurrences.addNewComponent(adsk.core.Matrix3D.create())
-         drivenOccurrence = rootComp.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+         driveOccurrence = genevaComp.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+         drivenOccurrence = genevaComp.occurrences.addNewComponent(adsk.core.Matrix3D.create())
          driveComp = driveOccurrence.component
          drivenComp = drivenOccurrence.component
+         timer.lap('components')
+
+         # Joints, contact set or motion table and timeline group of the pair, the same for built and inserted bodies.
+         # driveJointPoint is a point at the center of the drive wheel. The other stages of a train are added here.
+         def addMotion(driveJointPoint):
+            # Define the geometry to describe the joints
+            driveGeometry = adsk.fusion.JointGeometry.createByPoint(driveJointPoint)
+            drivenGeometry = adsk.fusion.JointGeometry.createByPoint(drivenComp.originConstructionPoint)
+   
+            # Create the joints
+            asBuiltJoints = genevaComp.asBuiltJoints
+            driveJointInput = asBuiltJoints.createInput(driveOccurrence, emptyOccurrence, driveGeometry)
+            driveJointInput.setAsRevoluteJointMotion(adsk.fusion.JointDirections.ZAxisJointDirection)
+            driveJoint = asBuiltJoints.add(driveJointInput)
+            drivenJointInput = asBuiltJoints.createInput(drivenOccurrence, emptyOccurrence, drivenGeometry)
+            drivenJointInput.setAsRevoluteJointMotion(adsk.fusion.JointDirections.ZAxisJointDirection)
+            drivenJoint = asBuiltJoints.add(drivenJointInput)
+            timer.lap('joints')
+
+            # The other stages of a train are more occurrences of the same components, so nothing is built again.
+            # Each drive is held to its shaft by a rigid joint and each driven wheel turns on a revolute joint.
+            trainOccurrences = []
+            stageJoints = []
+            if stages > 1:
+               shaftOccurrence = drivenOccurrence if layout == 'chain' else driveOccurrence
+               for placement in geneva_train.stagePlacements(geometry, stages, layout)[1:]:
+                  stageDrive = genevaComp.occurrences.addExistingComponent(driveComp, toMatrix3D(placement['drive']))
+                  stageDriven = genevaComp.occurrences.addExistingComponent(drivenComp, toMatrix3D(placement['driven']))
+                  shaftInput = asBuiltJoints.createInput(stageDrive, shaftOccurrence, None)
+                  shaftInput.setAsRigidJointMotion()
+                  asBuiltJoints.add(shaftInput)
+                  stagePoint = drivenComp.originConstructionPoint.createForAssemblyContext(stageDriven)
+                  stageInput = asBuiltJoints.createInput(stageDriven, emptyOccurrence, adsk.fusion.JointGeometry.createByPoint(stagePoint))
+                  stageInput.setAsRevoluteJointMotion(adsk.fusion.JointDirections.ZAxisJointDirection)
+                  stageJoints.append((asBuiltJoints.add(stageInput).entityToken, placement['phase']))
+                  trainOccurrences += [stageDrive, stageDriven]
+                  if layout == 'chain':
+                     shaftOccurrence = stageDriven
+               timer.lap('train')
+   
+            # Store the exact motion for the joints to be turned from, contact analysis stays off
+            if motionMode == 'table':
+               table = geneva_motion.motionTable(geometry)
+               design.attributes.add(geneva_motion.ATTRIBUTE_GROUP, prefix, geneva_motion.encodeMotion(driveJoint.entityToken, drivenJoint.entityToken, table))
+               if stageJoints:
+                  design.attributes.add(geneva_train.ATTRIBUTE_GROUP, prefix, geneva_train.encodeTrain(layout, stageJoints))
+               timer.lap('motion table')
+            else:
+               # Create contact set
+               design.isContactAnalysisEnabled = True
+               design.isContactSetAnalysis = True
+               contacts = design.contactSets
+               occurrencesAndBodies = []
+               for occurrence in [emptyOccurrence, driveOccurrence, drivenOccurrence] + trainOccurrences:
+                  if parentOccurrence is not None:
+                     occurrence = occurrence.createForAssemblyContext(parentOccurrence)
+                  occurrencesAndBodies.append(occurrence)
+               contacts.add(occurrencesAndBodies)
+               timer.lap('contact set')
+
+            # Group elements
+            timelineEnd = timeline.count - 1
+            timelineGroup = timeline.timelineGroups.add(timelineStart,timelineEnd)
+            timelineGroup.name = prefix.rstrip('_')
+            timer.lap('timeline group')
+
+            # Add the phase times to the log next to the JSON file
+            if timer.enabled:
+               geneva_timing.writeRecord(script_dir, timer.record(prefix.rstrip('_'), values, timeline.count - timelineStart))
+
+            # Add the pair to the build history
+            recordBuild(values, prefix.rstrip('_'), time.perf_counter() - buildStart, 'built' if cachedParts is None else 'inserted')
+            return prefix
+
+         # Insert the bodies of the same pair built before, only the joints and contact set are added again
+         if cachedParts is not None:
+            importManager = app.importManager
+            for part, component in (('drive', driveComp), ('driven', drivenComp)):
+               importManager.importToTarget(importManager.createSMTImportOptions(cachedParts[part]), component)
+            jointSketch = driveComp.sketches.add(driveComp.xYConstructionPlane)
+            driveJointPoint = jointSketch.sketchPoints.add(toPoint3D('drivePoint'))
+            timer.lap('cache insert')
+            return addMotion(driveJointPoint)
    
          # Create all of the reference points needed for the design
-         startPoint = adsk.core.Point3D.create(0, 0, 0)
-         diameterPoint = adsk.core.Point3D.create(drivenRadius*cos, drivenRadius*sin, 0)
-         drivePoint = adsk.core.Point3D.create(thirdDist, 0, 0)
-         constructionPoint = adsk.core.Point3D.create(constructionRadius*cos, constructionRadius*sin, 0)
-         lowerSlotLineStart = adsk.core.Point3D.create(constructionRadius*cos + slotRadius*sin, constructionRadius*sin - slotRadius*cos, 0)
-         lowerSlotLineEnd = adsk.core.Point3D.create(drivenRadius*cos + slotRadius*sin, drivenRadius*sin - slotRadius*cos, 0)
-         upperSlotLineStart = adsk.core.Point3D.create(constructionRadius*cos - slotRadius*sin, constructionRadius*sin + slotRadius*cos, 0)
-         upperSlotLineEnd = adsk.core.Point3D.create(drivenRadius*cos - slotRadius*sin, drivenRadius*sin + slotRadius*cos, 0)
-         pinPoint = adsk.core.Point3D.create(constructionRadius, 0, 0)
-         tangentLine1Start = adsk.core.Point3D.create(constructionRadius-backlash, pinBaseRadius+backlash, 0)
-         tangentLine1End = adsk.core.Point3D.create(thirdDist+backlash, driveProfileRadius+backlash, 0)
-         tangentLine2Start = adsk.core.Point3D.create(constructionRadius-backlash, -(pinBaseRadius+backlash), 0)
-         tangentLine2End = adsk.core.Point3D.create(thirdDist+backlash, -(driveProfileRadius+backlash), 0)
-         tangentLineIntersection = adsk.core.Point3D.create(constructionRadius-const2, 0, 0)
+         startPoint = toPoint3D('startPoint')
+         diameterPoint = toPoint3D('diameterPoint')
+         drivePoint = toPoint3D('drivePoint')
+         constructionPoint = toPoint3D('constructionPoint')
+         lowerSlotLineStart = toPoint3D('lowerSlotLineStart')
+         lowerSlotLineEnd = toPoint3D('lowerSlotLineEnd')
+         upperSlotLineStart = toPoint3D('upperSlotLineStart')
+         upperSlotLineEnd = toPoint3D('upperSlotLineEnd')
+         pinPoint = toPoint3D('pinPoint')
+         tangentLineIntersection = toPoint3D(baseCorners['apex'] or baseCorners['pinUpper'])
+         tangentLine1End = toPoint3D(baseCorners['discUpper'])
+         tangentLine2End = toPoint3D(baseCorners['discLower'])
    
 
          # Geometry Creation Section
    
          # Create a sketch on the XY plane for the gears
-         sketches = rootComp.sketches
-         sketch1 = sketches.add(rootComp.xYConstructionPlane)
+         sketches = genevaComp.sketches
+         sketch1 = sketches.add(genevaComp.xYConstructionPlane)
    
          # Get sketch lines to draw the sketch
          circles1 = sketch1.sketchCurves.sketchCircles
    
          # Create base circle
          drivenCircle = circles1.addByCenterRadius(startPoint,drivenRadius)
+         dimensionCircle(sketch1, drivenCircle, '{drivenRadius}')
          
          # Extrude the driven circle
          drivenProfile = sketch1.profiles.item(0)
-         extrudeDistance = adsk.core.ValueInput.createByReal(thickness)
-         extrudes = rootComp.features.extrudeFeatures
+         extrudeDistance = parameterInput('{thickness}')
+         extrudes = genevaComp.features.extrudeFeatures
          extrude = extrudes.addSimple(drivenProfile, extrudeDistance, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+         timer.lap('driven extrude')
    
          # Create a sketch on the XY plane to cut the driven gears features
-         sketch2 = sketches.add(rootComp.xYConstructionPlane)
+         sketch2 = sketches.add(genevaComp.xYConstructionPlane)
    
+         # Solve the sketch once after all of the curves, constraints and dimensions are added
+         sketch2.isComputeDeferred = True
+
          # New sketch elements
          lines = sketch2.sketchCurves.sketchLines
          circles = sketch2.sketchCurves.sketchCircles
@@ -127,147 +301,344 @@ def run(context):
          
          # Create profile of the drive gear
          driveProfileCircle = circles.addByCenterRadius(drivePoint,driveProfileRadius) #circle without backlash
+
+         # Construction lines from the center along the slot and towards the drive gear
+         slotAxis = lines.addByTwoPoints(sketch2.originPoint, slotCircle2.centerSketchPoint)
+         slotAxis.isConstruction = True
+         driveAxis = lines.addByTwoPoints(sketch2.originPoint, driveProfileCircle.centerSketchPoint)
+         driveAxis.isConstruction = True
+
+         # Constrain the slot and the drive profile to the parameters
+         constraints2 = sketch2.geometricConstraints
+         dimensions2 = sketch2.sketchDimensions
+         constraints2.addCoincident(slotCircle1.centerSketchPoint, slotAxis)
+         angleDimension = dimensions2.addAngularDimension(driveAxis, slotAxis, toPoint3D((drivenRadius/2*math.cos(angle/2), drivenRadius/2*math.sin(angle/2))))
+         angleDimension.parameter.expression = names['angle']
+         slotLength = dimensions2.addDistanceDimension(sketch2.originPoint, slotCircle2.centerSketchPoint, adsk.fusion.DimensionOrientations.AlignedDimensionOrientation, diameterPoint)
+         slotLength.parameter.expression = names['drivenRadius']
+         slotStart = dimensions2.addDistanceDimension(sketch2.originPoint, slotCircle1.centerSketchPoint, adsk.fusion.DimensionOrientations.AlignedDimensionOrientation, constructionPoint)
+         slotStart.parameter.expression = names['constructionRadius']
+         dimensions2.addRadialDimension(slotCircle1, constructionPoint).parameter.expression = names['slotRadius']
+         dimensions2.addRadialDimension(slotCircle2, diameterPoint).parameter.expression = names['slotRadius']
+         dimensionCircle(sketch2, driveProfileCircle, '{driveProfileRadius}', '{thirdDist}')
+         tangentBetween(sketch2, slotLine1, slotCircle1, slotCircle2)
+         tangentBetween(sketch2, slotLine2, slotCircle1, slotCircle2)
+         sketch2.isComputeDeferred = False
+         timer.lap('slot sketch')
    
          # Create a cut to form the geneva gear
          allGenevaProfiles = adsk.core.ObjectCollection.create() #create a collection for the profile
          for profile in sketch2.profiles: #loop over the profiles
              allGenevaProfiles.add(profile)
          genevaExtrude = extrudes.addSimple(allGenevaProfiles, extrudeDistance, adsk.fusion.FeatureOperations.CutFeatureOperation)
+         timer.lap('slot cut')
          
+         # Create fillets on the first slot and locking cut-out, the pattern copies them with the cut
+         # The corners are known from the geometry so only those edges are looked up, at half the thickness
+         body0 = extrude.bodies.item(0)
+         filletEdges = adsk.core.ObjectCollection.create()
+         for x, y in geneva_profile.filletCornerPoints(geometry):
+            cornerPoint = adsk.core.Point3D.create(x, y, thickness/2)
+            for edge in genevaComp.findBRepUsingPoint(cornerPoint, adsk.fusion.BRepEntityTypes.BRepEdgeEntityType):
+               if edge.body == body0:
+                  filletEdges.add(edge)
+         
+         # Add the fillets
+         fillet = genevaComp.features.filletFeatures
+         filletInput = fillet.createInput()
+         filletInput.addConstantRadiusEdgeSet(filletEdges,parameterInput('{filletRadius}'), True)
+         filletFeature = fillet.add(filletInput)
+         timer.lap('fillet')
+
          # Create circular pattern
-         zAxis = rootComp.zConstructionAxis
-         circularFeats = rootComp.features.circularPatternFeatures
+         zAxis = genevaComp.zConstructionAxis
+         circularFeats = genevaComp.features.circularPatternFeatures
          patternObjects = adsk.core.ObjectCollection.create()
          patternObjects.add(genevaExtrude)
+         patternObjects.add(filletFeature)
          circularFeatInput = circularFeats.createInput(patternObjects, zAxis)
-         circularFeatInput.quantity = adsk.core.ValueInput.createByReal(toothNumber)
+         circularFeatInput.quantity = parameterInput('{toothNumber}')
          circularFeatInput.totalAngle = adsk.core.ValueInput.createByString('360 deg')
          circularFeat = circularFeats.add(circularFeatInput)
-
-         # Create fillets
-         # Create a collection for the edges
-         body0 = rootComp.bRepBodies.item(0)
-         edges = body0.edges
-         filletEdges = adsk.core.ObjectCollection.create()
-
-         # Find the correct edges by sording by the eges alligned with the z axis
-         for edge in edges:
-            tolerance = 0.1
-            edgeStartPoint = edge.startVertex.geometry
-            edgeEndPoint = edge.endVertex.geometry
-            if (abs(edgeStartPoint.x - edgeEndPoint.x) <=tolerance and abs(edgeStartPoint.y - edgeEndPoint.y) <= tolerance and (thickness-tolerance <= edgeEndPoint.z <= thickness+tolerance or thickness- tolerance <= edgeStartPoint.z <= thickness+tolerance)):
-               filletEdges.add(edge)
-         
-         # Add the fillets
-         fillet = rootComp.features.filletFeatures
-         filletInput = fillet.createInput()
-         filletInput.addConstantRadiusEdgeSet(filletEdges,adsk.core.ValueInput.createByReal(filletRadius), True)
-         fillet.add(filletInput)
+         timer.lap('circular pattern')
 
    
          # Create the base of the drive gear
-         sketches = rootComp.sketches
-         sketch3 = sketches.add(rootComp.xYConstructionPlane)
+         sketches = genevaComp.sketches
+         sketch3 = sketches.add(genevaComp.xYConstructionPlane)
+         sketch3.isComputeDeferred = True
          constraints = sketch3.geometricConstraints
          circles3 = sketch3.sketchCurves.sketchCircles
          lines3 = sketch3.sketchCurves.sketchLines       
    
-         #Add sketch geometry
+         #Add sketch geometry, the tangent lines meet past the pin base when the drive profile is the larger circle
          driveCircle = circles3.addByCenterRadius(drivePoint, driveProfileRadius)
          pinBaseCircle = circles3.addByCenterRadius(pinPoint, pinBaseRadius)
-         tangentLine1 = lines3.addByTwoPoints(tangentLine1Start, tangentLine1End)
-         tangentLine2 = lines3.addByTwoPoints(tangentLine2Start, tangentLine2End)
+         tangentLine1 = lines3.addByTwoPoints(tangentLineIntersection, tangentLine1End)
+         if baseCorners['apex']:
+            tangentLine2 = lines3.addByTwoPoints(tangentLine1.startSketchPoint, tangentLine2End)
+         else:
+            tangentLine2 = lines3.addByTwoPoints(toPoint3D(baseCorners['pinLower']), tangentLine2End)
    
          # Add constraints to close profile
-         driveCircle.isFixed = True
-         pinBaseCircle.isFixed = True
+         dimensionCircle(sketch3, driveCircle, '{driveProfileRadius}', '{thirdDist}')
+         dimensionCircle(sketch3, pinBaseCircle, '{pinBaseRadius}', '{constructionRadius}')
          constraints.addTangent(pinBaseCircle,tangentLine1) 
          constraints.addTangent(driveCircle,tangentLine1)
          constraints.addTangent(pinBaseCircle,tangentLine2) 
          constraints.addTangent(driveCircle,tangentLine2)
-         tangentLine1.extend(tangentLineIntersection)
-         tangentLine2.extend(tangentLineIntersection)
+         constraints.addCoincident(tangentLine1.endSketchPoint, driveCircle)
+         constraints.addCoincident(tangentLine2.endSketchPoint, driveCircle)
+         if not baseCorners['apex']:
+            constraints.addCoincident(tangentLine1.startSketchPoint, pinBaseCircle)
+            constraints.addCoincident(tangentLine2.startSketchPoint, pinBaseCircle)
+         sketch3.isComputeDeferred = False
+         timer.lap('drive base sketch')
    
          # Extrude the profiles
-         negativeExtrudeDistance = adsk.core.ValueInput.createByReal(-thickness)
+         negativeExtrudeDistance = parameterInput('-{thickness}')
          driveBottomProfile = adsk.core.ObjectCollection.create() #create a collection for the profile
          for profile in sketch3.profiles: #loop over the profiles
              driveBottomProfile.add(profile)
          driveBaseExtrude = extrudes.addSimple(driveBottomProfile, negativeExtrudeDistance, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+         timer.lap('drive base extrude')
    
          # Create the top of the drive gear sketch
-         sketch4 = sketches.add(rootComp.xYConstructionPlane)
+         sketch4 = sketches.add(genevaComp.xYConstructionPlane)
          circles4 = sketch4.sketchCurves.sketchCircles
          driveBacklash = circles4.addByCenterRadius(drivePoint,driveProfileRadius-backlash)
          drivenBacklash = circles4.addByCenterRadius(startPoint,drivenRadius+backlash)
+         dimensionCircle(sketch4, driveBacklash, '{driveProfileRadius} - {backlash}', '{thirdDist}')
+         dimensionCircle(sketch4, drivenBacklash, '{drivenRadius} + {backlash}')
    
          # Extrude the desired profile
          driveTopProfile = sketch4.profiles.item(0)
          driveTopExtrude = extrudes.addSimple(driveTopProfile, extrudeDistance, adsk.fusion.FeatureOperations.JoinFeatureOperation)
+         timer.lap('drive top')
    
          # Rotate the driven gear so the pin is alligned with the slot
          drivenGear = adsk.core.ObjectCollection.create()
-         drivenGear.add(rootComp.bRepBodies.item(0))
-         zAxis = adsk.core.Vector3D.create(0, 0, 1)
-         transform = adsk.core.Matrix3D.create()
-         transform.setToRotation(angle, zAxis, startPoint)
-         moveFeats = rootComp.features.moveFeatures
-         moveInput = moveFeats.createInput(drivenGear, transform)
+         drivenGear.add(extrude.bodies.item(0))
+         moveFeats = genevaComp.features.moveFeatures
+         moveInput = moveFeats.createInput2(drivenGear)
+         moveInput.defineAsRotate(genevaComp.zConstructionAxis, parameterInput('{angle}'))
          moveFeats.add(moveInput)    
+         timer.lap('move')
    
          # Create pin sketch
-         sketch5 = sketches.add(rootComp.xYConstructionPlane)
+         sketch5 = sketches.add(genevaComp.xYConstructionPlane)
          circles5 = sketch5.sketchCurves.sketchCircles
          pinCircle = circles5.addByCenterRadius(pinPoint, slotRadius-backlash/2)
+         dimensionCircle(sketch5, pinCircle, '{slotRadius} - {backlash} / 2', '{constructionRadius}')
    
          # Extrude pin
          pinProfile = sketch5.profiles.item(0)
          pinExtrude = extrudes.addSimple(pinProfile, extrudeDistance, adsk.fusion.FeatureOperations.JoinFeatureOperation)
+         timer.lap('pin')
    
    
          # Motion Section
    
          # Add the bodies to components
-         body1 = rootComp.bRepBodies.item(0)
-         body2 = rootComp.bRepBodies.item(1)
+         body1 = extrude.bodies.item(0)
+         body2 = driveBaseExtrude.bodies.item(0)
          body1.moveToComponent(drivenOccurrence)
          body2.moveToComponent(driveOccurrence)
+         timer.lap('body moves')
    
          # Create the points to define the joints, note they have to be contruction points, not Point3D
          constructionPoints = driveComp.constructionPoints
          pointInput = constructionPoints.createInput()
          pointInput.setByCenter(driveCircle)
          driveConstructionPoint = constructionPoints.add(pointInput)
-         drivenConstructionPoint = drivenComp.originConstructionPoint
-   
-         # Define the geometry to describe the joints
-         driveGeometry = adsk.fusion.JointGeometry.createByPoint(driveConstructionPoint)
-         drivenGeometry = adsk.fusion.JointGeometry.createByPoint(drivenConstructionPoint)
-   
-         # Create the joints
-         asBuiltJoints = rootComp.asBuiltJoints
-         driveJointInput = asBuiltJoints.createInput(driveOccurrence, emptyOccurrence, driveGeometry)
-         driveJointInput.setAsRevoluteJointMotion(adsk.fusion.JointDirections.ZAxisJointDirection)
-         driveJoint = asBuiltJoints.add(driveJointInput)
-         drivenJointInput = asBuiltJoints.createInput(drivenOccurrence, emptyOccurrence, drivenGeometry)
-         drivenJointInput.setAsRevoluteJointMotion(adsk.fusion.JointDirections.ZAxisJointDirection)
-         drivenJoint = asBuiltJoints.add(drivenJointInput)
-   
-         # Create contact set
-         design.isContactAnalysisEnabled = True
-         design.isContactSetAnalysis = True
-         contacts = design.contactSets
-         occurrencesAndBodies = []
-         occurrencesAndBodies.append(rootComp.occurrences[0])
-         occurrencesAndBodies.append(rootComp.occurrences[1])
-         occurrencesAndBodies.append(rootComp.occurrences[2])
-         contacts.add(occurrencesAndBodies)
-
-         # Group elements
-         timelineEnd = timeline.count - 1
-         timelineGroup = timeline.timelineGroups.add(timelineStart,timelineEnd)
+
+         # Keep the finished bodies so the next build of this pair can insert them
+         if partCache is not None:
+            storeParts(values, driveComp, drivenComp)
+            timer.lap('cache store')
+
+         return addMotion(driveConstructionPoint)
        
 
+       # Write the bodies of a finished pair to the part cache, a failed export only leaves the pair out of the cache
+       def storeParts(values, driveComp, drivenComp):
+         exportManager = design.exportManager
+         components = {'drive': driveComp, 'driven': drivenComp}
+
+         def export(part, path):
+            return exportManager.execute(exportManager.createSMTExportOptions(path, components[part]))
+
+         try:
+            if not partCache.store(values, export):
+               log('Part cache not written: export failed')
+         except:
+            log(f'Part cache not written:\n{traceback.format_exc()}')
+
+       # Turn the joints of a gear pair built in table mode to a drive angle, and the other stages when it is
+       # a train. Returns False when the pair has no table or its joints were deleted.
+       def turnGears(prefix, crankAngle):
+         attribute = design.attributes.itemByName(geneva_motion.ATTRIBUTE_GROUP, prefix)
+         motion = geneva_motion.decodeMotion(attribute.value) if attribute else None
+         if motion is None:
+            return False
+         driveToken, drivenToken, table = motion
+         driveJoints = design.findEntityByToken(driveToken)
+         drivenJoints = design.findEntityByToken(drivenToken)
+         if not driveJoints or not drivenJoints:
+            return False
+         driveJoints[0].jointMotion.rotationValue = crankAngle
+         drivenJoints[0].jointMotion.rotationValue = geneva_motion.drivenAngle(table, crankAngle)
+
+         attribute = design.attributes.itemByName(geneva_train.ATTRIBUTE_GROUP, prefix)
+         train = geneva_train.decodeTrain(attribute.value) if attribute else None
+         if train is not None:
+            layout, stageJoints = train
+            angles = geneva_train.stageAngles(table, layout, [phase for token, phase in stageJoints], crankAngle)
+            for (token, phase), angle in zip(stageJoints, angles):
+               joints = design.findEntityByToken(token)
+               if joints:
+                  joints[0].jointMotion.rotationValue = angle
+         return True
+
+       # Store the motion table of a gear pair built in table mode again after its parameters were edited,
+       # so it is turned with the new index angle. The joints are the same, pairs without a table are left alone.
+       def updateMotion(prefix, drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius):
+         attribute = design.attributes.itemByName(geneva_motion.ATTRIBUTE_GROUP, prefix)
+         motion = geneva_motion.decodeMotion(attribute.value) if attribute else None
+         if motion is None:
+            return
+         driveToken, drivenToken, table = motion
+         geometry = geneva_geometry.computeGeometry(drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius)
+         design.attributes.add(geneva_motion.ATTRIBUTE_GROUP, prefix, geneva_motion.encodeMotion(driveToken, drivenToken, geneva_motion.motionTable(geometry)))
+
+       # Add a build to the history, a history that can not be written is only logged
+       def recordBuild(values, name, seconds, outcome, message=''):
+         try:
+            history.record(values, name, seconds, outcome, message)
+         except:
+            log(f'Build history not written:\n{traceback.format_exc()}')
+
+       # Preset names and the last builds for the dialog, nothing when the history can not be read
+       def readHistory():
+         try:
+            return history.presetNames(), history.recent(recentBuildCount)
+         except:
+            log(f'Build history not read:\n{traceback.format_exc()}')
+            return [], []
+
+       # Write a line to the text commands window
+       def log(message):
+         if hasattr(app, 'log'):
+            app.log(message)
+         else:
+            print(message)
+
+       # Build every gear pair in the catalog file on a grid, with the design compute deferred until the end
+       def CatalogCreator(catalogPath):
+         entries = geneva_catalog.readCatalog(catalogPath, genevaParameters)
+         validEntries = [(number, values) for number, values, problems in entries if not problems]
+         report = []
+
+         for number, values, problems in entries:
+            if problems:
+               report.append(f'Row {number} skipped: ' + '; '.join(problems))
+
+         # Size the grid cells so the largest gear pair fits with some room around it
+         bounds = [geneva_profile.pairBounds(geneva_geometry.computeGeometry(*geneva_catalog.creatorArguments(values))) for number, values in validEntries]
+         cellWidth = max([maxX - minX for minX, minY, maxX, maxY in bounds] or [0])*1.25
+         cellHeight = max([maxY - minY for minX, minY, maxX, maxY in bounds] or [0])*1.25
+         offsets = geneva_catalog.gridOffsets(len(validEntries), cellWidth, cellHeight)
+
+         built = 0
+         batchStart = time.perf_counter()
+         design.isComputeDeferred = True
+         try:
+            for (number, values), offset, (minX, minY, maxX, maxY) in zip(validEntries, offsets, bounds):
+               # Shift each pair so its bounding box starts at the corner of its cell
+               offset = (offset[0] - minX, offset[1] - maxY)
+               designStart = time.perf_counter()
+               try:
+                  GenevaCreator(*geneva_catalog.creatorArguments(values), offset=offset, name=geneva_catalog.entryName(values))
+               except Exception as e:
+                  recordBuild(values, geneva_catalog.entryName(values), time.perf_counter() - designStart, 'failed', f'{type(e).__name__}: {e}')
+                  report.append(f'Row {number} failed:\n{traceback.format_exc()}')
+                  continue
+               built += 1
+               log(f'Row {number} ({geneva_catalog.entryName(values)}) built in {time.perf_counter() - designStart:.2f} s')
+         finally:
+            design.isComputeDeferred = False
+
+         summary = f'Built {built} of {len(entries)} gear pairs in {time.perf_counter() - batchStart:.2f} s'
+         log(summary)
+         for line in report:
+            log(line)
+         ui.messageBox('\n\n'.join([summary] + report))
+
+
+       # Preview section
+
+       # Custom graphics shown while the dialog is open
+       previewGraphics = []
+
+       # Worker thread of the open dialog and the inputs its results are shown in. The worker hands a
+       # result back by firing the custom event, whose handler runs on the UI thread.
+       previewState = {'worker': None, 'inputs': None}
+       previewEventId = 'genevaPreviewReady'
+
+       # Chord tolerance of the preview outlines as a fraction of the driven radius
+       previewTolerance = 0.002
+
+       # Colors of the preview outlines
+       previewColors = {
+          'driven': adsk.fusion.CustomGraphicsSolidColorEffect.create(adsk.core.Color.create(0, 120, 215, 255)),
+          'drive': adsk.fusion.CustomGraphicsSolidColorEffect.create(adsk.core.Color.create(230, 120, 0, 255)),
+       }
+
+       # Remove the preview outlines from the canvas
+       def clearPreview():
+         while previewGraphics:
+            graphics = previewGraphics.pop()
+            if graphics.isValid:
+               graphics.deleteMe()
+
+       # Compute the geometry and the line strips of the preview, this is what the preview cache stores
+       def computePreview(drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius):
+         geometry = geneva_geometry.computeGeometry(drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius)
+         outlines = geneva_profile.tessellateOutlines(geometry, drivenRadius*previewTolerance)
+
+         # Each outline sits on the top face of its part, the drive base sits below the XY plane
+         strips = []
+         for name, z, color in (('driven', thickness, 'driven'), ('driveTop', thickness, 'drive'), ('driveBase', 0, 'drive')):
+            coordinates = []
+            stripLengths = []
+            for loop in outlines[name]:
+               for x, y in loop + loop[:1]:
+                  coordinates.extend((x, y, z))
+               stripLengths.append(len(loop) + 1)
+            strips.append((coordinates, stripLengths, color))
+
+         return {'geometry': geometry, 'strips': strips}
+
+       # Check the dialog values and compute their preview. Runs on the worker thread, so no Fusion API here.
+       def computeDialogPreview(arguments):
+         problems = geneva_validation.validate(geneva_catalog.creatorValues(arguments), genevaParameters)
+         if problems:
+            return {'problems': problems, 'preview': None}
+         return {'problems': [], 'preview': previewCache.get(computePreview, *arguments)}
+
+       # Draw the outlines of both wheels as custom graphics instead of building the features
+       def drawPreview(preview):
+         clearPreview()
+         graphics = rootComp.customGraphicsGroups.add()
+         previewGraphics.append(graphics)
+
+         for coordinates, stripLengths, color in preview['strips']:
+            lines = graphics.addLines(adsk.fusion.CustomGraphicsCoordinates.create(coordinates), [], True, stripLengths)
+            lines.color = previewColors[color]
+
+         app.activeViewport.refresh()
+
+
        #Start of code for GUI and JSON
 
        # Find where the JSON script is located
@@ -276,100 +647,91 @@ def run(context):
        # Find the path to the JSON file
        jsonPath = os.path.join(script_dir, 'geneva_parameters.json')
 
-       if os.path.exists(jsonPath) == False:
-          ui.messageBox(f'JSON file not found!\n\nExpected location:\n{jsonPath}')
-          return
-
-       #open the JSON file
-       try:
-        with open(jsonPath,'r') as f:
-           parameters = json.load(f)
-        genevaParameters = parameters['geneva_mechanism']
-
-       except (json.JSONDecodeError, KeyError):
-          #Display error message if there is an issue
-          ui.messageBox('Bad formatting, check the JSON guide format.')
-          return
-
-       # Get the values stored in the json file
-       try:
-        drivenRadius = genevaParameters['driven_radius']/10.0
-        toothNumber = genevaParameters['number_of_slots']
-        slotRadius = genevaParameters['slot_radius']/10.0
-        backlash = genevaParameters['backlash']/10.0
-        thickness = genevaParameters['thickness']/10.0
-        filletRadius = genevaParameters['filletRadius']/10.0
-        maxDivenRadius = genevaParameters['maxDivenRadius']/10.0
-        minDrivenRadius = genevaParameters['minDrivenRadius']/10.0
-        maxToothNumber = genevaParameters['maxToothNumber']
-        minToothNumber = genevaParameters['minToothNumber']
-        maxSlotRadius = genevaParameters['maxSlotRadius']/10.0
-        minSlotRadius = genevaParameters['minSlotRadius']/10.0
-        maxBacklash = genevaParameters['maxBacklash']/10.0
-        minBacklash = genevaParameters['minBacklash']/10.0
-        maxThickness = genevaParameters['maxThickness']/10.0
-        minThickness = genevaParameters['minThickness']/10.0
-        maxFilletRadius = genevaParameters['maxFilletRadius']/10.0
-        minFilletRadius = genevaParameters['minFilletRadius']/10.0
-
-        # Logic to determine if the values are outside of the prescribed range
-        if drivenRadius > maxDivenRadius:
-           ui.messageBox(f'Driven radius too large, must be under {maxFilletRadius} mm')
-           return
-
-        if toothNumber > maxToothNumber:
-           ui.messageBox(f'Number of slots too large, must be under {maxToothNumber}')
-           return      
-          
-        if slotRadius > maxSlotRadius:
-           ui.messageBox(f'Slot radius too large, must be under {maxSlotRadius} mm')
-           return
-        
-        if backlash > maxBacklash:
-           ui.messageBox(f'Backlash too large, must be under {maxBacklash} mm')
-           return
+       # Every build and the named presets, in a SQLite file next to the JSON file. Opened with the first dialog,
+       # geneva_history brings in the catalog and with it NumPy.
+       history = None
 
-        if thickness > maxThickness:
-           ui.messageBox(f'Thickness too large, must be under {maxThickness} mm')
-           return
-        
-        if filletRadius > maxFilletRadius:
-           ui.messageBox(f'Fillet radius too large, must be under {maxFilletRadius} mm')
-           return
-           
-
-        if drivenRadius < minDrivenRadius:
-           ui.messageBox(f'Driven radius too small, must be above {minDrivenRadius} mm')
-           return
-
-        if toothNumber < minToothNumber:
-           ui.messageBox(f'Number of slots too small, must be above {minToothNumber}')
-           return      
-          
-        if slotRadius < minSlotRadius:
-           ui.messageBox(f'Slot radius too small, must be above {minSlotRadius} mm')
-           return
-        
-        if backlash < minBacklash:
-           ui.messageBox(f'Backlash too small, must be above 0.{minBacklash} mm')
-           return
+       def closeHistory():
+          if history is not None:
+             history.close()
 
-        if thickness < minThickness:
-           ui.messageBox(f'Thickness too small, must be above {minThickness} mm')
-           return
-        
-        if filletRadius < minFilletRadius:
-           ui.messageBox(f'Fillet radius too small, must be above {minFilletRadius} mm')
-           return
+       _cleanup.append(closeHistory)
+
+       # Number of builds listed in the dialog, and their values by list item name
+       recentBuildCount = 10
+       recentBuilds = {}
+
+       # Settings from the JSON file and what is made from them, replaced when the file changes
+       parameters = None
+       genevaParameters = None
+       timingEnabled = False
+       motionMode = 'contact'
+       partCache = None
+       previewCache = None
+
+       # Read the JSON file if it changed since the dialog was last opened, raises geneva_settings.SettingsError
+       def readSettings():
+          nonlocal parameters, genevaParameters, timingEnabled, motionMode, partCache, previewCache
+          loaded = geneva_settings.load(jsonPath)
+          if loaded is parameters:
+             return
+          parameters = loaded
+          genevaParameters = parameters['geneva_mechanism']
 
+          # Timing of the builds is off unless the JSON file turns it on
+          timingEnabled = bool(genevaParameters.get('timingLog', False))
 
-       except KeyError as e:
-          #Display error message if there is an issue
-          ui.messageBox(f'JSON Key deleted, check formatting for JSON file.\nMissing parameter:{e}')
-          return
+          # Contact analysis between the wheels, or joints turned from a kinematic table
+          motionMode = genevaParameters.get('motionMode', 'contact')
+
+          # Finished bodies of the pairs built before, turned off when partCacheMegabytes is 0
+          partCacheMegabytes = genevaParameters.get('partCacheMegabytes', 0)
+          if partCacheMegabytes <= 0:
+             partCache = None
+          elif partCache is None or partCache.maxBytes != partCacheMegabytes*1e6:
+             partCache = geneva_part_cache.PartCache(os.path.join(script_dir, geneva_part_cache.CACHE_FOLDER), partCacheMegabytes*1e6)
+
+          # Cache of the computed previews, rounded to the precision lengths are displayed with.
+          # Kept over OK, which writes the JSON file, unless its size changed.
+          previewCacheSize = max(1, int(genevaParameters.get('previewCacheSize', 64)))
+          if previewCache is None or previewCache.maxSize != previewCacheSize:
+             previewCache = geneva_cache.PreviewCache(
+                previewCacheSize,
+                app.preferences.unitAndValuePreferences.generalPrecision
+             )
        
        # Code for the GUI
 
+       # Name of the choice that creates a new gear pair instead of editing an existing one
+       newGearName = 'New gear pair'
+
+       # Name of the choice that keeps the values in the dialog
+       noValuesName = 'None'
+
+       # Name of the choice that does not turn any gear pair
+       noMotionName = 'None'
+
+       # Prefix of the gear pair picked to be turned from its motion table, None when there is none
+       def motionTarget(inputs):
+          if motionMode != 'table':
+             return None
+          motionInput = inputs.itemById('motionTarget')
+          if motionInput.selectedItem.name == noMotionName:
+             return None
+          return motionInput.selectedItem.name + '_'
+
+       # Problems with the values in the dialog, checked before any preview or feature is built
+       def dialogProblems(inputs):
+          values = geneva_catalog.creatorValues((
+             inputs.itemById('drivenRadius').valueOne,
+             inputs.itemById('slotRadius').valueOne,
+             inputs.itemById('toothNumber').value,
+             inputs.itemById('backlash').valueOne,
+             inputs.itemById('thickness').valueOne,
+             inputs.itemById('filletRadius').valueOne,
+          ))
+          return geneva_validation.validate(values, genevaParameters)
+
        # Shows a preview of what the gears will look like before hitting "OK"
        class MyPreviewHandler(adsk.core.CommandEventHandler):
           def __init__(self):
@@ -386,11 +748,16 @@ def run(context):
                 thickness = inputs.itemById('thickness').valueOne
                 filletRadius = inputs.itemById('filletRadius').valueOne
 
-                # Create the gear on change
-                GenevaCreator(drivenRadius,slotRadius,toothNumber,backlash,thickness,filletRadius)
+                # Turn the picked gear pair instead of drawing a new one
+                if motionTarget(inputs) is not None:
+                   clearPreview()
+                   turnGears(motionTarget(inputs), inputs.itemById('driveAngle').valueOne)
+                   return
 
-                # Make it so its not perminant
-                args.isValudResult = True
+                # Hand the values to the worker, the outlines are drawn by MyPreviewReadyHandler once they are
+                # computed. A newer change replaces them before that. The features are only built in
+                # MyExecuteHandler so isValidResult stays False.
+                previewState['worker'].submit((drivenRadius,slotRadius,toothNumber,backlash,thickness,filletRadius))
 
              except:
                 #Display error message if there is an issue
@@ -416,36 +783,245 @@ def run(context):
                 backlash = inputs.itemById('backlash').valueOne
                 thickness = inputs.itemById('thickness').valueOne
                 filletRadius = inputs.itemById('filletRadius').valueOne
+                trainStages = inputs.itemById('trainStages').value
+                trainLayout = inputs.itemById('trainLayout').selectedItem.name
+
+                # Drop the previews still being computed, they would be drawn over the gears
+                previewState['worker'].cancel()
+
+                # Build every gear pair in the catalog file instead of the values in the dialog
+                clearPreview()
+                if inputs.itemById('buildCatalog').value:
+                   catalogPath = geneva_catalog.findCatalog(script_dir)
+                   if catalogPath is None:
+                      ui.messageBox('Catalog file not found!\n\nExpected one of:\n' + '\n'.join(geneva_catalog.CATALOG_NAMES) + f'\nin {script_dir}')
+                      return
+                   CatalogCreator(catalogPath)
+                   return
+
+                # Leave the picked gear pair turned to the drive angle instead of building
+                if motionTarget(inputs) is not None:
+                   if not turnGears(motionTarget(inputs), inputs.itemById('driveAngle').valueOne):
+                      ui.messageBox('The joints of the gear pair were not found, it can not be turned.')
+                   return
+
+                # Never start a build that would fail partway through
+                problems = dialogProblems(inputs)
+                if problems:
+                   ui.messageBox('The gears can not be built:\n\n' + '\n'.join(problems))
+                   return
 
-                # Create the gears
-                GenevaCreator(drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius)
+                # The first choice of the "Preset" list keeps the values, a preset with its name could not be picked
+                presetName = inputs.itemById('presetName').value.strip()
+                if presetName == noValuesName:
+                   ui.messageBox(f'A preset can not be named "{noValuesName}", pick another name.')
+                   return
 
-                # Write these values to the JSON file
-                genevaParameters = self.parameters['geneva_mechanism']
+                # Create the gears, or change the parameters of an existing pair and let Fusion recompute it.
+                # GenevaCreator adds its own pair to the history, the other outcomes are added here.
+                values = geneva_catalog.creatorValues((drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius))
+                target = inputs.itemById('genevaTarget').selectedItem.name
+                buildStart = time.perf_counter()
+                try:
+                   if target == newGearName:
+                      GenevaCreator(drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius, stages=trainStages, layout=trainLayout)
+                   else:
+                      geneva_design_parameters.updateParameters(design, target + '_', drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius)
+                      updateMotion(target + '_', drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius)
+                      recordBuild(values, target, time.perf_counter() - buildStart, 'updated')
+                except Exception as e:
+                   recordBuild(values, None if target == newGearName else target, time.perf_counter() - buildStart, 'failed', f'{type(e).__name__}: {e}')
+                   raise
 
-                with open(jsonPath, 'w') as f:
-                   genevaParameters['driven_radius'] = drivenRadius*10
-                   genevaParameters['number_of_slots'] = toothNumber
-                   genevaParameters['slot_radius'] = slotRadius*10
-                   genevaParameters['backlash'] = backlash*10
-                   genevaParameters['thickness'] = thickness*10
-                   genevaParameters['filletRadius'] = filletRadius*10
-                   json.dump(parameters, f)
+                # Keep the values under a name
+                if presetName:
+                   history.savePreset(presetName, values)
+
+                # Write these values to the JSON file, all at once so a crash leaves the old file. They go in a copy,
+                # the settings in memory are only replaced once the file is written.
+                genevaParameters = dict(self.parameters['geneva_mechanism'])
+                genevaParameters['driven_radius'] = drivenRadius*10
+                genevaParameters['number_of_slots'] = toothNumber
+                genevaParameters['slot_radius'] = slotRadius*10
+                genevaParameters['backlash'] = backlash*10
+                genevaParameters['thickness'] = thickness*10
+                genevaParameters['filletRadius'] = filletRadius*10
+                genevaParameters['trainStages'] = trainStages
+                genevaParameters['trainLayout'] = trainLayout
+                parameters = dict(self.parameters, geneva_mechanism=genevaParameters)
+                geneva_settings.save(self.jsonPath, parameters)
+                self.parameters = parameters
 
              except:
                 #Display error message if there is an issue
                 ui.messageBox(traceback.format_exc())
                 return
        
+       # Loads the values of an existing gear pair, a preset or a recent build into the dialog when it is
+       # picked, or the values of the optimized design when its button is clicked
+       class MyInputChangedHandler(adsk.core.InputChangedEventHandler):
+          def __init__(self):
+             super().__init__()
+
+          def notify(self,args):
+             try:
+                changedInput = args.input
+                inputs = args.inputs
+                if changedInput.id == 'loadOptimized':
+                   # Values written by geneva_optimize, checked against the ranges like a catalog row
+                   optimized = geneva_optimize.readOptimized(script_dir)
+                   if optimized is None:
+                      ui.messageBox(f'Optimized design not found!\n\nExpected location:\n{os.path.join(script_dir, geneva_optimize.OPTIMIZED_NAME)}')
+                      return
+                   values = geneva_catalog.rowValues(optimized, genevaParameters)
+                   problems = geneva_validation.validate(values, genevaParameters)
+                   if problems:
+                      ui.messageBox('Optimized design is outside of the ranges:\n' + '\n'.join(problems))
+                      return
+                   values = geneva_catalog.creatorArguments(values)
+                elif changedInput.id == 'genevaTarget' and changedInput.selectedItem.name != newGearName:
+                   values = geneva_design_parameters.readParameters(design, changedInput.selectedItem.name + '_')
+                elif changedInput.id == 'preset' and changedInput.selectedItem.name != noValuesName:
+                   values = geneva_catalog.creatorArguments(history.preset(changedInput.selectedItem.name))
+                elif changedInput.id == 'recentBuild' and changedInput.selectedItem.name != noValuesName:
+                   values = geneva_catalog.creatorArguments(recentBuilds[changedInput.selectedItem.name])
+                else:
+                   return
+
+                drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius = values
+                inputs.itemById('drivenRadius').valueOne = drivenRadius
+                inputs.itemById('toothNumber').value = toothNumber
+                inputs.itemById('slotRadius').valueOne = slotRadius
+                inputs.itemById('backlash').valueOne = backlash
+                inputs.itemById('thickness').valueOne = thickness
+                inputs.itemById('filletRadius').valueOne = filletRadius
+
+             except:
+                #Display error message if there is an issue
+                ui.messageBox(traceback.format_exc())
+
+       # Lists every problem with the values in the dialog and disables "OK" while there are any
+       class MyValidateInputsHandler(adsk.core.ValidateInputsEventHandler):
+          def __init__(self):
+             super().__init__()
+
+          def notify(self,args):
+             try:
+                inputs = args.inputs
+                problems = [] if inputs.itemById('buildCatalog').value or motionTarget(inputs) is not None else dialogProblems(inputs)
+                inputs.itemById('validationMessages').formattedText = '<br>'.join(problems) if problems else 'OK'
+                args.areInputsValid = not problems
+
+             except:
+                #Display error message if there is an issue
+                args.areInputsValid = False
+
+       # Draws the preview computed by the worker thread, unless newer values were entered since
+       class MyPreviewReadyHandler(adsk.core.CustomEventHandler):
+          def __init__(self):
+             super().__init__()
+
+          def notify(self,args):
+             try:
+                worker = previewState['worker']
+                result = worker.take(int(args.additionalInfo)) if worker is not None else None
+                if result is None:
+                   return
+
+                # Designs that can not be built are not drawn
+                if result['problems']:
+                   clearPreview()
+                else:
+                   drawPreview(result['preview'])
+
+                # Show how well the preview cache and the worker are doing
+                previewState['inputs'].itemById('previewCacheStats').text = previewCache.summary() + ', ' + worker.summary()
+
+             except:
+                #Display error message if there is an issue
+                ui.messageBox(f'Preview failed:\n{traceback.format_exc()}')
+
+       # Event handlers of the open dialog, kept until it closes so the ones of earlier dialogs do not pile up
+       dialogHandlers = []
+
+       # Stop the preview worker, remove the outlines and drop the handlers, when the dialog closes or the add-in stops
+       def closeDialog():
+          if previewState['worker'] is not None:
+             previewState['worker'].stop()
+             previewState['worker'] = None
+             previewState['inputs'] = None
+             app.unregisterCustomEvent(previewEventId)
+          clearPreview()
+          dialogHandlers.clear()
+
+       # Removes the preview outlines and stops the worker when the dialog is closed
+       class MyDestroyHandler(adsk.core.CommandEventHandler):
+          def __init__(self):
+             super().__init__()
+
+          def notify(self,args):
+             try:
+                closeDialog()
+
+             except:
+                #Display error message if there is an issue
+                ui.messageBox(traceback.format_exc())
+
        # Creates the GUI, showing the different parameters and allowing the user to change them
        class MyCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
           def __init__(self):
              super().__init__()
           def notify(self,args):
+             nonlocal design, rootComp, history
              try:
                 cmd = args.command
                 inputs = cmd.commandInputs
 
+                # The gears are built in the design that is active when the dialog opens. The JSON file is
+                # only read again when it changed. Problems are shown in the dialog, with OK hidden.
+                design = adsk.fusion.Design.cast(app.activeProduct)
+                try:
+                   if not design:
+                      raise geneva_settings.SettingsError('Geneva Gear needs an active design, open one in the Design workspace.')
+                   rootComp = design.rootComponent
+                   readSettings()
+                except geneva_settings.SettingsError as e:
+                   inputs.addTextBoxCommandInput('settingsProblems', 'Problem', str(e).replace('\n', '<br>'), 8, True)
+                   cmd.isOKButtonVisible = False
+                   return
+
+                if history is None:
+                   history = geneva_history.HistoryStore(os.path.join(script_dir, geneva_history.HISTORY_NAME))
+
+                # Values and ranges of the dialog, the JSON file is in mm and the dialog in cm
+                drivenRadius = genevaParameters['driven_radius']/10.0
+                toothNumber = genevaParameters['number_of_slots']
+                slotRadius = genevaParameters['slot_radius']/10.0
+                backlash = genevaParameters['backlash']/10.0
+                thickness = genevaParameters['thickness']/10.0
+                filletRadius = genevaParameters['filletRadius']/10.0
+                maxDivenRadius = genevaParameters['maxDivenRadius']/10.0
+                minDrivenRadius = genevaParameters['minDrivenRadius']/10.0
+                maxToothNumber = genevaParameters['maxToothNumber']
+                minToothNumber = genevaParameters['minToothNumber']
+                maxSlotRadius = genevaParameters['maxSlotRadius']/10.0
+                minSlotRadius = genevaParameters['minSlotRadius']/10.0
+                maxBacklash = genevaParameters['maxBacklash']/10.0
+                minBacklash = genevaParameters['minBacklash']/10.0
+                maxThickness = genevaParameters['maxThickness']/10.0
+                minThickness = genevaParameters['minThickness']/10.0
+                maxFilletRadius = genevaParameters['maxFilletRadius']/10.0
+                minFilletRadius = genevaParameters['minFilletRadius']/10.0
+                trainStages = genevaParameters.get('trainStages', 1)
+                maxTrainStages = genevaParameters.get('maxTrainStages', geneva_settings.MAX_TRAIN_STAGES)
+                trainLayout = genevaParameters.get('trainLayout', geneva_train.TRAIN_LAYOUTS[0])
+
+                # Pick between a new gear pair and the gear pairs already in the design
+                targetInput = inputs.addDropDownCommandInput('genevaTarget', 'Gear pair', adsk.core.DropDownStyles.TextListDropDownStyle)
+                targetInput.listItems.add(newGearName, True)
+                for prefix in geneva_design_parameters.findGears(design):
+                   targetInput.listItems.add(prefix.rstrip('_'), False)
+
                 # Add all of the input parameters
                 inputs.addIntegerSpinnerCommandInput(
                    'toothNumber',
@@ -508,16 +1084,91 @@ def run(context):
                 drivenRadiusSlider.valueOne = drivenRadius
                 filletRadiusSlider.valueOne = filletRadius
 
+                # Build a new gear pair as the first stage of a train, the other stages reuse its components
+                inputs.addIntegerSpinnerCommandInput('trainStages', 'Stages in the train', 1, maxTrainStages, 1, trainStages)
+                layoutInput = inputs.addDropDownCommandInput('trainLayout', 'Train layout', adsk.core.DropDownStyles.TextListDropDownStyle)
+                for layout in geneva_train.TRAIN_LAYOUTS:
+                   layoutInput.listItems.add(layout, layout == trainLayout)
+
+                # Fill in the best design found by geneva_optimize
+                if os.path.exists(os.path.join(script_dir, geneva_optimize.OPTIMIZED_NAME)):
+                   loadOptimizedButton = inputs.addBoolValueInput('loadOptimized', 'Optimized design', False, '', False)
+                   loadOptimizedButton.text = 'Load optimized design'
+
+                # Named presets and the last builds from the history, picking one fills in its values
+                presetNames, builds = readHistory()
+                presetInput = inputs.addDropDownCommandInput('preset', 'Preset', adsk.core.DropDownStyles.TextListDropDownStyle)
+                presetInput.listItems.add(noValuesName, True)
+                for name in presetNames:
+                   presetInput.listItems.add(name, False)
+                recentInput = inputs.addDropDownCommandInput('recentBuild', 'Recent build', adsk.core.DropDownStyles.TextListDropDownStyle)
+                recentInput.listItems.add(noValuesName, True)
+                recentBuilds.clear()
+                for build in builds:
+                   label = f'#{build["id"]} {build["name"]}: {geneva_catalog.entryName(build["values"])}, {build["outcome"]} in {build["seconds"]:.1f} s'
+                   recentBuilds[label] = build['values']
+                   recentInput.listItems.add(label, False)
+
+                # Save the values in the dialog under this name when OK is clicked
+                inputs.addStringValueInput('presetName', 'Save as preset', '')
+
+                # Build the catalog file next to the JSON file instead of a single gear pair
+                inputs.addBoolValueInput('buildCatalog', 'Build catalog file', True, '', False)
+
+                # Turn a gear pair built in table mode, its joints are set from the stored table as the slider moves
+                if motionMode == 'table':
+                   motionInput = inputs.addDropDownCommandInput('motionTarget', 'Turn gear pair', adsk.core.DropDownStyles.TextListDropDownStyle)
+                   motionInput.listItems.add(noMotionName, True)
+                   for attribute in design.attributes.itemsByGroup(geneva_motion.ATTRIBUTE_GROUP):
+                      motionInput.listItems.add(attribute.name.rstrip('_'), False)
+                   inputs.addFloatSliderCommandInput('driveAngle', 'Drive angle', 'deg', 0, 2*math.pi, False)
+
+                # Problems found by geneva_validation, OK stays disabled while there are any
+                inputs.addTextBoxCommandInput('validationMessages', 'Checks', 'OK', 3, True)
+
+                # Hit and miss counters of the preview cache
+                inputs.addTextBoxCommandInput('previewCacheStats', 'Preview cache', previewCache.summary(), 1, True)
+
+                # Hits and size of the part cache
+                if partCache is not None:
+                   inputs.addTextBoxCommandInput('partCacheStats', 'Part cache', partCache.summary(), 1, True)
+
+                # Phase times of the last build, from the timing log
+                if timingEnabled:
+                   inputs.addTextBoxCommandInput('timingSummary', 'Last build', geneva_timing.summary(geneva_timing.lastRecord(script_dir)), 2, True)
+
                # Add event detection
                 onExecute = MyExecuteHandler(jsonPath, parameters)
                 cmd.execute.add(onExecute)
-                _handlers.append(onExecute)
+                dialogHandlers.append(onExecute)
 
                # Add change detection
                 onPreview = MyPreviewHandler()
                 cmd.executePreview.add(onPreview)
-                _handlers.append(onPreview)
+                dialogHandlers.append(onPreview)
+
+               # Add detection of the gear pair selection
+                onInputChanged = MyInputChangedHandler()
+                cmd.inputChanged.add(onInputChanged)
+                dialogHandlers.append(onInputChanged)
+
+               # Add checking of the values
+                onValidateInputs = MyValidateInputsHandler()
+                cmd.validateInputs.add(onValidateInputs)
+                dialogHandlers.append(onValidateInputs)
 
+               # Compute the preview on a worker thread and draw it from a custom event on the UI thread
+                previewReady = app.registerCustomEvent(previewEventId)
+                onPreviewReady = MyPreviewReadyHandler()
+                previewReady.add(onPreviewReady)
+                dialogHandlers.append(onPreviewReady)
+                previewState['inputs'] = inputs
+                previewState['worker'] = geneva_worker.LatestWinsScheduler(computeDialogPreview, lambda generation: app.fireCustomEvent(previewEventId, str(generation)))
+
+               # Add clean up when the dialog closes
+                onDestroy = MyDestroyHandler()
+                cmd.destroy.add(onDestroy)
+                dialogHandlers.append(onDestroy)
 
              except:
                 #Display error message if there is an issue
@@ -528,11 +1179,46 @@ def run(context):
        onCreated = MyCommandCreatedHandler()
        cmdDef.commandCreated.add(onCreated)
        _handlers.append(onCreated)
-       cmdDef.execute()
-       adsk.autoTerminate(False)
+
+       # Button in the Create panel, the dialog is opened from there while the add-in runs
+       panel = ui.allToolbarPanels.itemById(PANEL_ID)
+       if panel and not panel.controls.itemById(COMMAND_ID):
+          panel.controls.addCommand(cmdDef)
+
+       # Close the dialog's worker and outlines if the add-in stops while it is open
+       _cleanup.append(closeDialog)
+
+       # Open the dialog right away when the add-in is started by hand, not when Fusion starts
+       if not context.get('IsApplicationStartup', False):
+          cmdDef.execute()
 
     except Exception as e:
     #Display error message if there is an issue
        if ui:
         error_msg = 'Failed:\n{}\n\nType: {}'.format(traceback.format_exc(), type(e).__name__)
         ui.messageBox(error_msg, 'Error Details')
+
+
+# Runs when the add-in stops: removes the button and the command
+def stop(context):
+    ui = None
+    try:
+       app = adsk.core.Application.get()
+       ui = app.userInterface
+
+       while _cleanup:
+          _cleanup.pop()()
+
+       panel = ui.allToolbarPanels.itemById(PANEL_ID)
+       control = panel.controls.itemById(COMMAND_ID) if panel else None
+       if control:
+          control.deleteMe()
+       cmdDef = ui.commandDefinitions.itemById(COMMAND_ID)
+       if cmdDef:
+          cmdDef.deleteMe()
+       _handlers.clear()
+
+    except:
+       #Display error message if there is an issue
+       if ui:
+          ui.messageBox(f'Stopping Geneva Gear failed:\n{traceback.format_exc()}')
@@ -0,0 +1,60 @@
+# Geneva Gear Preview Cache
+# Description: Bounded least recently used cache for the preview. Entries are keyed on the six gear
+#              parameters rounded to the precision shown in the dialog, so dragging a slider back to a
+#              configuration that was already drawn reuses the stored geometry and graphics.
+
+from collections import OrderedDict
+
+
+class PreviewCache:
+   def __init__(self, maxSize=64, precision=3):
+      self.maxSize = max(1, int(maxSize))
+      self.precision = precision
+      self.hits = 0
+      self.misses = 0
+      self._entries = OrderedDict()
+
+   # Key for a parameter set. Lengths come in as cm and are rounded in mm, which is what the dialog shows.
+   def key(self, drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius):
+      lengths = (drivenRadius, slotRadius, backlash, thickness, filletRadius)
+      rounded = tuple(round(value*10, self.precision) + 0.0 for value in lengths)
+      return (int(toothNumber),) + rounded
+
+   # Return the stored entry for the parameters, or build it with compute(*parameters) and store it
+   def get(self, compute, drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius):
+      key = self.key(drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius)
+      entry = self._entries.get(key)
+      if entry is not None:
+         self.hits += 1
+         self._entries.move_to_end(key)
+         return entry
+
+      self.misses += 1
+      entry = compute(drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius)
+      self._entries[key] = entry
+      if len(self._entries) > self.maxSize:
+         self._entries.popitem(last=False)
+      return entry
+
+   def clear(self):
+      self._entries.clear()
+      self.hits = 0
+      self.misses = 0
+
+   def __len__(self):
+      return len(self._entries)
+
+   # Counters used to tune the cache size
+   def stats(self):
+      lookups = self.hits + self.misses
+      return {
+         'hits': self.hits,
+         'misses': self.misses,
+         'hitRate': self.hits/lookups if lookups else 0.0,
+         'size': len(self._entries),
+         'maxSize': self.maxSize,
+      }
+
+   def summary(self):
+      stats = self.stats()
+      return '{hits} hits, {misses} misses ({rate:.0%}), {size}/{maxSize} entries'.format(rate=stats['hitRate'], **stats)
@@ -0,0 +1,127 @@
+# Geneva Gear Catalog
+# Description: Reads a table of gear parameter sets for building a whole catalog of gear pairs in one run.
+#              The table sits next to geneva_parameters.json as geneva_catalog.json or geneva_catalog.csv and
+#              uses the same keys and millimeter values. Keys left out of a row fall back to geneva_parameters.json.
+
+import csv
+import json
+import math
+import os
+
+import geneva_validation
+
+# File names looked for next to geneva_parameters.json, in order
+CATALOG_NAMES = ('geneva_catalog.json', 'geneva_catalog.csv')
+
+# JSON keys of the six inputs in GenevaCreator order
+PARAMETER_KEYS = ('driven_radius', 'slot_radius', 'number_of_slots', 'backlash', 'thickness', 'filletRadius')
+
+
+# Path of the catalog file in the folder, or None when there is none
+def findCatalog(folder):
+   for name in CATALOG_NAMES:
+      path = os.path.join(folder, name)
+      if os.path.exists(path):
+         return path
+   return None
+
+
+# Raw rows of the catalog file as dictionaries
+def _readRows(path):
+   if path.lower().endswith('.csv'):
+      with open(path, newline='') as f:
+         return [{key.strip(): value for key, value in row.items() if key} for row in csv.DictReader(f)]
+
+   with open(path, 'r') as f:
+      catalog = json.load(f)
+   if isinstance(catalog, dict):
+      catalog = catalog['geneva_catalog']
+   return catalog
+
+
+# Convert one row to numbers, filling in missing keys from the defaults
+def rowValues(row, defaults):
+   values = {}
+   for key in PARAMETER_KEYS:
+      value = row.get(key)
+      if value is None or (isinstance(value, str) and not value.strip()):
+         value = defaults[key]
+      if key == 'number_of_slots':
+         number = float(value)
+         if number != int(number):
+            raise ValueError(f'{key} must be a whole number, got {value}')
+         values[key] = int(number)
+      else:
+         values[key] = float(value)
+      if not math.isfinite(values[key]):
+         raise ValueError(f'{key} must be a number, got {value}')
+   return values
+
+
+# Read the catalog. Returns a list of (row number, values, problems) where values is None
+# when the row could not be read. Problems come from geneva_validation, rows with problems should be
+# skipped and reported.
+def readCatalog(path, genevaParameters):
+   entries = []
+   for number, row in enumerate(_readRows(path), start=1):
+      try:
+         values = rowValues(row, genevaParameters)
+      except (TypeError, ValueError, KeyError) as e:
+         entries.append((number, None, [str(e)]))
+         continue
+      entries.append((number, values, geneva_validation.validate(values, genevaParameters)))
+   return entries
+
+
+# GenevaCreator arguments for a row, lengths converted from mm to cm
+def creatorArguments(values):
+   return tuple(values[key] if key == 'number_of_slots' else values[key]/10.0 for key in PARAMETER_KEYS)
+
+
+# Row for GenevaCreator arguments, lengths converted from cm to mm
+def creatorValues(arguments):
+   return {key: value if key == 'number_of_slots' else value*10.0 for key, value in zip(PARAMETER_KEYS, arguments)}
+
+
+# Name given to the component of a catalog entry
+def entryName(values):
+   return 'Geneva {number_of_slots} slots R{driven_radius:g}'.format(**values)
+
+
+# Offsets of a square grid with the given cell size, filled row by row
+def gridOffsets(count, cellWidth, cellHeight):
+   columns = max(1, int(math.ceil(math.sqrt(count))))
+   return [((i % columns)*cellWidth, -(i // columns)*cellHeight) for i in range(count)]
+
+
+# Command line options shared by the tools that run without Fusion
+def addParameterArguments(parser, folder):
+   parser.add_argument('--catalog', help='JSON or CSV table of parameter sets, see geneva_catalog.csv')
+   parser.add_argument('--parameters', default=os.path.join(folder, 'geneva_parameters.json'), help='defaults and limits')
+   parser.add_argument('--driven-radius', type=float)
+   parser.add_argument('--slots', type=int)
+   parser.add_argument('--slot-radius', type=float)
+   parser.add_argument('--backlash', type=float)
+   parser.add_argument('--thickness', type=float)
+   parser.add_argument('--fillet-radius', type=float)
+
+
+# Parameter sets picked on the command line, in the same form as readCatalog.
+# Returns the parameters from geneva_parameters.json and the entries.
+def argumentEntries(args):
+   with open(args.parameters, 'r') as f:
+      genevaParameters = json.load(f)['geneva_mechanism']
+
+   if args.catalog:
+      return genevaParameters, readCatalog(args.catalog, genevaParameters)
+
+   row = {
+      'driven_radius': args.driven_radius,
+      'number_of_slots': args.slots,
+      'slot_radius': args.slot_radius,
+      'backlash': args.backlash,
+      'thickness': args.thickness,
+      'filletRadius': args.fillet_radius,
+   }
+   values = rowValues(row, genevaParameters)
+   return genevaParameters, [(None, values, geneva_validation.validate(values, genevaParameters))]
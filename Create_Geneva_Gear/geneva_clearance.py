@@ -0,0 +1,332 @@
+# Geneva Gear Clearance Check
+# Description: Turns the 2D outlines of the gear pair through a full drive revolution and reports the smallest
+#              clearance between the driven wheel and the top of the drive wheel (crescent and pin), which share
+#              the same layer, and the crank angle where it happens. A negative clearance is an interference.
+#              The driven wheel follows geneva_kinematics. Distances use a grid index over the outline segments
+#              and are computed for all sampled angles with NumPy. Run "python geneva_clearance.py --help".
+#
+#              The outlines are polylines within chordTolerance of the true arcs, so the result is accurate
+#              to about that tolerance. Clearances larger than searchRadius are reported as searchRadius.
+#              Interference is always reported at its full depth: a point with no segment within searchRadius
+#              is tested against the whole outline, and one that is inside gets its distance to every segment.
+#              The driven wheel has its outer corners rounded by the fillet radius, like the wheel GenevaCreator builds.
+#              The drive base sits below the driven wheel, so only the top of the drive wheel is checked.
+
+import argparse
+import math
+import os
+import sys
+import time
+
+try:
+   import numpy as np
+except ImportError:
+   np = None
+
+import geneva_catalog
+import geneva_geometry
+import geneva_kinematics
+import geneva_profile
+
+# Names of the drive top loops, in the order geneva_profile.driveTopLoops returns them
+DRIVE_PARTS = ('crescent', 'pin')
+
+
+# Closed polylines as flat arrays: vertices, the vertex each segment ends at, the segment that ends at each
+# vertex, whether each vertex is convex, and the loop each vertex belongs to
+def _polylines(loops, tolerance):
+   points = []
+   ends = []
+   loopIds = []
+   for loopId, loop in enumerate(loops):
+      loopPoints = geneva_profile.tessellateSegments(loop, tolerance)
+      start = len(points)
+      count = len(loopPoints)
+      points.extend(loopPoints)
+      ends.extend(start + (i + 1) % count for i in range(count))
+      loopIds.extend([loopId]*count)
+
+   points = np.array(points, dtype=float)
+   ends = np.array(ends)
+   previous = np.empty_like(ends)
+   previous[ends] = np.arange(len(ends))
+
+   # Loops run counter clockwise around the material, a left turn is a convex corner
+   incoming = points - points[previous]
+   outgoing = points[ends] - points
+   convex = incoming[:, 0]*outgoing[:, 1] - incoming[:, 1]*outgoing[:, 0] >= 0
+
+   return {'points': points, 'ends': ends, 'previous': previous, 'convex': convex, 'loops': np.array(loopIds)}
+
+
+# Lists of segment numbers as one array, each list padded with -1 to the length of the longest
+def _padded(lists):
+   width = max(1, max((len(segments) for segments in lists), default=0))
+   table = np.full((len(lists), width), -1, dtype=np.int64)
+   for i, segments in enumerate(lists):
+      table[i, :len(segments)] = segments
+   return table
+
+
+# Uniform grid over the segments of a polyline. Each cell lists every segment whose bounding box, grown by
+# the search radius, covers the cell, so one lookup finds all segments within the search radius of a point.
+# Each row of cells also lists the segments that cross its height, for the inside test of far points.
+def buildIndex(polylines, searchRadius):
+   points = polylines['points']
+   starts = points
+   ends = points[polylines['ends']]
+   low = np.minimum(starts, ends) - searchRadius
+   high = np.maximum(starts, ends) + searchRadius
+
+   cellSize = searchRadius
+   origin = low.min(axis=0)
+   shape = np.floor((high.max(axis=0) - origin)/cellSize).astype(int) + 1
+   cells = [[] for i in range(shape[0]*shape[1])]
+
+   lowCells = np.floor((low - origin)/cellSize).astype(int)
+   highCells = np.floor((high - origin)/cellSize).astype(int)
+   for segment in range(len(points)):
+      for ix in range(lowCells[segment, 0], highCells[segment, 0] + 1):
+         for iy in range(lowCells[segment, 1], highCells[segment, 1] + 1):
+            cells[ix*shape[1] + iy].append(segment)
+
+   rows = [[] for i in range(shape[1])]
+   lowRows = np.floor((np.minimum(starts[:, 1], ends[:, 1]) - origin[1])/cellSize).astype(int)
+   highRows = np.floor((np.maximum(starts[:, 1], ends[:, 1]) - origin[1])/cellSize).astype(int)
+   for segment in range(len(points)):
+      for iy in range(lowRows[segment], highRows[segment] + 1):
+         rows[iy].append(segment)
+
+   # Pad every cell and row to the same length so lookups are one array gather, -1 marks an empty slot
+   return {'polylines': polylines, 'origin': origin, 'cellSize': cellSize, 'shape': shape, 'table': _padded(cells),
+           'rows': _padded(rows), 'searchRadius': searchRadius}
+
+
+# Whether points (n, 2) that lie within the grid are inside the material. A ray from each point to +X crosses
+# the outline an odd number of times from inside, only the segments in the point's row of cells can cross it.
+def _insideOutline(index, queries):
+   points = index['polylines']['points']
+   ends = index['polylines']['ends']
+   row = np.floor((queries[:, 1] - index['origin'][1])/index['cellSize']).astype(int)
+   candidates = index['rows'][row]
+   valid = candidates >= 0
+   candidates = np.maximum(candidates, 0)
+
+   a = points[candidates]
+   b = points[ends[candidates]]
+   x = queries[:, None, 0]
+   y = queries[:, None, 1]
+   spans = (a[..., 1] > y) != (b[..., 1] > y)
+   height = np.where(spans, b[..., 1] - a[..., 1], 1.0)
+   crossing = a[..., 0] + (y - a[..., 1])*(b[..., 0] - a[..., 0])/height
+   crossings = np.count_nonzero(valid & spans & (x < crossing), axis=1)
+   return crossings % 2 == 1
+
+
+# Distance from points (n, 2) to the closest of all the segments and that segment, in chunks of points
+def _allDistances(polylines, queries, chunk=1024):
+   a = polylines['points']
+   ab = a[polylines['ends']] - a
+   lengthSquared = np.maximum(np.einsum('kd,kd->k', ab, ab), 1e-300)
+   distance = np.empty(len(queries))
+   nearest = np.empty(len(queries), dtype=np.int64)
+   for first in range(0, len(queries), chunk):
+      ap = queries[first:first + chunk, None, :] - a
+      t = np.clip(np.einsum('qkd,kd->qk', ap, ab)/lengthSquared, 0.0, 1.0)
+      offset = ap - t[..., None]*ab
+      squared = np.einsum('qkd,qkd->qk', offset, offset)
+      nearest[first:first + chunk] = np.argmin(squared, axis=1)
+      distance[first:first + chunk] = np.sqrt(squared.min(axis=1))
+   return distance, nearest
+
+
+# Signed distance from points (n, 2) to the closest segment of the indexed polyline. Negative when the point
+# is inside the material, at any depth. Points outside and farther than the search radius get the search radius.
+# Also returns the closest segment (-1 for those points).
+def signedDistances(index, queries):
+   shape = index['shape']
+   searchRadius = index['searchRadius']
+
+   cell = np.floor((queries - index['origin'])/index['cellSize']).astype(int)
+   inside = (cell[:, 0] >= 0) & (cell[:, 1] >= 0) & (cell[:, 0] < shape[0]) & (cell[:, 1] < shape[1])
+   cellIds = cell[:, 0]*shape[1] + cell[:, 1]
+
+   # Only points in a cell with segments near them need any distances
+   signed = np.full(len(queries), float(searchRadius))
+   closest = np.full(len(queries), -1, dtype=np.int64)
+   near = np.flatnonzero(inside)
+   near = near[index['table'][cellIds[near], 0] >= 0]
+   if len(near):
+      _nearDistances(index, queries[near], cellIds[near], near, signed, closest)
+
+   # Points in the grid with no segment within the search radius are either clear of the outline or
+   # embedded deep in the material. The embedded ones get their full depth.
+   far = np.flatnonzero(inside & (closest < 0))
+   embedded = far[_insideOutline(index, queries[far])] if len(far) else far
+   if len(embedded):
+      distance, nearest = _allDistances(index['polylines'], queries[embedded])
+      signed[embedded] = -distance
+      closest[embedded] = nearest
+   return signed, closest
+
+
+# Signed distances of the points near to segments, written into signed and closest at the rows in near.
+# Points whose closest segment is farther than the search radius are left as they are.
+def _nearDistances(index, queries, cellIds, near, signed, closest):
+   polylines = index['polylines']
+   points = polylines['points']
+   ends = polylines['ends']
+   searchRadius = index['searchRadius']
+
+   candidates = index['table'][cellIds]
+   valid = candidates >= 0
+   candidates = np.maximum(candidates, 0)
+
+   # Distance to every candidate segment
+   a = points[candidates]
+   ab = points[ends[candidates]] - a
+   ap = queries[:, None, :] - a
+   lengthSquared = np.maximum(np.einsum('qkd,qkd->qk', ab, ab), 1e-300)
+   t = np.clip(np.einsum('qkd,qkd->qk', ap, ab)/lengthSquared, 0.0, 1.0)
+   offset = ap - t[..., None]*ab
+   distance = np.where(valid, np.einsum('qkd,qkd->qk', offset, offset), np.inf)
+
+   best = np.argmin(distance, axis=1)
+   rows = np.arange(len(queries))
+   nearest = candidates[rows, best]
+   nearestT = t[rows, best]
+   distance = np.sqrt(distance[rows, best])
+   found = distance < searchRadius
+
+   # Inside test: left of the closest segment, or at a corner left of both neighbouring segments
+   # (convex corner) or of either of them (concave corner)
+   def leftOf(segments):
+      start = points[segments]
+      direction = points[ends[segments]] - start
+      relative = queries - start
+      return direction[:, 0]*relative[:, 1] - direction[:, 1]*relative[:, 0] > 0
+
+   corner = np.where(nearestT <= 0.0, nearest, ends[nearest])
+   leftPrevious = leftOf(polylines['previous'][corner])
+   leftNext = leftOf(corner)
+   atCorner = np.where(polylines['convex'][corner], leftPrevious & leftNext, leftPrevious | leftNext)
+   atEnd = (nearestT <= 0.0) | (nearestT >= 1.0)
+   insideMaterial = np.where(atEnd, atCorner, leftOf(nearest))
+
+   signed[near[found]] = np.where(insideMaterial, -distance, distance)[found]
+   closest[near[found]] = nearest[found]
+
+
+# Rotate each frame of points (f, n, 2) by its own angle (f,) about a center
+def _rotateFrames(points, angles, center):
+   cos = np.cos(angles)[:, None]
+   sin = np.sin(angles)[:, None]
+   x = points[..., 0] - center[0]
+   y = points[..., 1] - center[1]
+   return np.stack((x*cos - y*sin + center[0], x*sin + y*cos + center[1]), axis=-1)
+
+
+# Rotate the same points (n, 2) by every angle (f,) about a center, giving (f, n, 2)
+def _rotateAll(points, angles, center):
+   return _rotateFrames(np.broadcast_to(points, (len(angles),) + points.shape), angles, center)
+
+
+# Check the clearance of a gear pair over one drive revolution.
+# steps: number of crank angles, chordTolerance and searchRadius: lengths in the units of the geometry
+# (defaults are based on the slot radius), frameChunk: crank angles handled per vectorized pass.
+def checkClearance(geometry, steps=3600, chordTolerance=None, searchRadius=None, frameChunk=256):
+   if np is None:
+      raise ImportError('NumPy is required for the clearance check')
+
+   slotRadius = geometry['slotRadius']
+   if chordTolerance is None:
+      chordTolerance = 0.001*slotRadius
+   if searchRadius is None:
+      searchRadius = max(2*geometry['backlash'], 0.2*slotRadius)
+
+   driven = _polylines(geneva_profile.filletedDrivenWheelLoops(geometry), chordTolerance)
+   drive = _polylines(geneva_profile.driveTopLoops(geometry), chordTolerance)
+   drivenIndex = buildIndex(driven, searchRadius)
+   driveIndex = buildIndex(drive, searchRadius)
+
+   drivePoint = (geometry['thirdDist'], 0.0)
+   crankAngles = np.arange(steps)*2*np.pi/steps
+   drivenAngles = geneva_kinematics.motionBatch(geometry, crankAngles)['angle']
+   clearance = np.empty(steps)
+   closestPart = np.empty(steps, dtype=int)
+
+   for first in range(0, steps, frameChunk):
+      crank = crankAngles[first:first + frameChunk]
+      turn = drivenAngles[first:first + frameChunk]
+      frames = len(crank)
+
+      # Drive outline points seen from the driven wheel, and driven outline points seen from the drive wheel
+      worldDrive = _rotateAll(drive['points'], crank, drivePoint)
+      inDriven = _rotateFrames(worldDrive, -turn, (0.0, 0.0))
+      worldDriven = _rotateAll(driven['points'], turn, (0.0, 0.0))
+      inDrive = _rotateFrames(worldDriven, -crank, drivePoint)
+
+      driveToDriven, _ = signedDistances(drivenIndex, inDriven.reshape(-1, 2))
+      drivenToDrive, nearestDrive = signedDistances(driveIndex, inDrive.reshape(-1, 2))
+      driveToDriven = driveToDriven.reshape(frames, -1)
+      drivenToDrive = drivenToDrive.reshape(frames, -1)
+      nearestDrive = nearestDrive.reshape(frames, -1)
+
+      # Closest approach in each frame and the drive part it involves
+      rows = np.arange(frames)
+      closestDrive = np.argmin(driveToDriven, axis=1)
+      closestDriven = np.argmin(drivenToDrive, axis=1)
+      fromDrive = driveToDriven[rows, closestDrive]
+      fromDriven = drivenToDrive[rows, closestDriven]
+      drivenPart = drive['loops'][np.maximum(nearestDrive[rows, closestDriven], 0)]
+      clearance[first:first + frames] = np.minimum(fromDrive, fromDriven)
+      closestPart[first:first + frames] = np.where(fromDrive <= fromDriven, drive['loops'][closestDrive], drivenPart)
+
+   worst = int(np.argmin(clearance))
+   return {
+      'minClearance': float(clearance[worst]),
+      'crankAngle': float(crankAngles[worst]),
+      'drivenAngle': float(drivenAngles[worst]),
+      'drivePart': DRIVE_PARTS[closestPart[worst]],
+      'interference': bool(clearance[worst] < 0),
+      'crankAngles': crankAngles,
+      'clearance': clearance,
+   }
+
+
+def main(argv=None):
+   scriptDir = os.path.dirname(os.path.realpath(__file__))
+   parser = argparse.ArgumentParser(description='Check that the driven and drive wheels of Geneva gear pairs clear each other over a '
+                                                'full drive revolution. Values are in mm. Anything not given comes from geneva_parameters.json.')
+   geneva_catalog.addParameterArguments(parser, scriptDir)
+   parser.add_argument('--steps', type=int, default=3600, help='crank angles checked over one revolution (default: 3600)')
+   parser.add_argument('--tolerance', type=float, help='chord tolerance of the outlines in mm (default: slot radius / 1000)')
+   parser.add_argument('--search-radius', type=float, help='clearances above this are not resolved, in mm (default: the larger of twice the backlash and slot radius / 5)')
+   args = parser.parse_args(argv)
+
+   genevaParameters, entries = geneva_catalog.argumentEntries(args)
+   failed = 0
+   start = time.perf_counter()
+   for number, values, problems in entries:
+      label = geneva_catalog.entryName(values) if values else f'Row {number}'
+      if number is not None and values:
+         label = f'Row {number} ({label})'
+      if problems:
+         print(f'{label} skipped: ' + '; '.join(problems), file=sys.stderr)
+         failed += 1
+         continue
+
+      geometry = geneva_geometry.computeGeometry(*(values[key] for key in geneva_catalog.PARAMETER_KEYS))
+      result = checkClearance(geometry, args.steps, args.tolerance, args.search_radius)
+      state = 'INTERFERENCE' if result['interference'] else 'ok'
+      print(f'{label}: {state}, minimum clearance {result["minClearance"]:.4f} mm with the {result["drivePart"]} '
+            f'at crank angle {math.degrees(result["crankAngle"]):.2f} deg (driven wheel {math.degrees(result["drivenAngle"]):.2f} deg)')
+      if result['interference']:
+         failed += 1
+
+   print(f'Checked {len(entries)} designs in {time.perf_counter() - start:.3f} s')
+   return 1 if failed else 0
+
+
+if __name__ == '__main__':
+   sys.exit(main())
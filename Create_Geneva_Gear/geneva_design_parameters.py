@@ -0,0 +1,111 @@
+# Geneva Gear Design Parameters
+# Description: Publishes the six gear inputs as user parameters of the design, together with the derived
+#              dimensions written as Fusion expressions. The sketches and features of a gear pair reference
+#              these parameters, so changing an existing gear pair only means editing them.
+
+import adsk.core, adsk.fusion
+
+# Attribute group used to remember which parameter prefixes belong to a gear pair
+ATTRIBUTE_GROUP = 'GenevaGear'
+
+# Input parameters: (GenevaCreator argument, parameter suffix, units, comment)
+INPUT_PARAMETERS = (
+   ('drivenRadius', 'driven_radius', 'mm', 'Radius of the driven gear'),
+   ('slotRadius', 'slot_radius', 'mm', 'Radius of the slots'),
+   ('toothNumber', 'slots', '', 'Number of slots'),
+   ('backlash', 'backlash', 'mm', 'Backlash (tolerance) of the gears'),
+   ('thickness', 'thickness', 'mm', 'Thickness of the gears'),
+   ('filletRadius', 'fillet_radius', 'mm', 'Fillet radius of the edges'),
+)
+
+# Derived parameters, the same formulas as geneva_geometry written as expressions.
+# Names in braces are replaced by the full parameter names of the gear pair.
+DERIVED_PARAMETERS = (
+   ('angle', 'angle', 'deg', '180 deg / {slots}'),
+   ('thirdDist', 'third_dist', 'mm', '{driven_radius} * cos({angle}) + {driven_radius} * sin({angle}) ^ 2 / cos({angle})'),
+   ('driveRadius', 'drive_radius', 'mm', '{driven_radius} * sin({angle}) / cos({angle})'),
+   ('constructionRadius', 'construction_radius', 'mm', '{third_dist} - {drive_radius}'),
+   ('driveProfileRadius', 'drive_profile_radius', 'mm', '{third_dist} - {driven_radius} * cos({angle}) + {slot_radius}'),
+   ('pinBaseRadius', 'pin_base_radius', 'mm', '2 * {slot_radius}'),
+)
+
+
+# Full parameter names of a gear pair, keyed by the names GenevaCreator and geneva_geometry use
+def parameterNames(prefix):
+   names = {}
+   for key, suffix, units, comment in INPUT_PARAMETERS + DERIVED_PARAMETERS:
+      names[key] = prefix + suffix
+   return names
+
+
+# First prefix that is not used by any parameter in the design
+def newPrefix(design):
+   index = 1
+   while design.allParameters.itemByName(f'geneva{index}_driven_radius'):
+      index += 1
+   return f'geneva{index}_'
+
+
+# Value input for one of the six inputs, lengths come in as cm like the rest of the API
+def _valueInput(value):
+   return adsk.core.ValueInput.createByReal(value)
+
+
+# Add the user parameters for a new gear pair and remember the prefix on the design.
+# Pairs that are not editable (inserted from the part cache, or trains) get the parameters for reference only.
+def publishParameters(design, prefix, drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius, editable=True):
+   values = {
+      'drivenRadius': drivenRadius,
+      'slotRadius': slotRadius,
+      'toothNumber': toothNumber,
+      'backlash': backlash,
+      'thickness': thickness,
+      'filletRadius': filletRadius,
+   }
+   userParameters = design.userParameters
+   suffixes = {suffix: prefix + suffix for key, suffix, units, comment in INPUT_PARAMETERS + DERIVED_PARAMETERS}
+
+   for key, suffix, units, comment in INPUT_PARAMETERS:
+      userParameters.add(prefix + suffix, _valueInput(values[key]), units, f'Geneva gear: {comment}')
+
+   for key, suffix, units, expression in DERIVED_PARAMETERS:
+      userParameters.add(prefix + suffix, adsk.core.ValueInput.createByString(expression.format(**suffixes)), units, 'Geneva gear: derived')
+
+   if editable:
+      design.attributes.add(ATTRIBUTE_GROUP, prefix, '')
+   return parameterNames(prefix)
+
+
+# Prefixes of the gear pairs in the design whose parameters still exist
+def findGears(design):
+   prefixes = []
+   for attribute in design.attributes.itemsByGroup(ATTRIBUTE_GROUP):
+      if design.userParameters.itemByName(attribute.name + 'driven_radius'):
+         prefixes.append(attribute.name)
+   return sorted(prefixes)
+
+
+# Current values of the six inputs of a gear pair, in GenevaCreator order and units
+def readParameters(design, prefix):
+   userParameters = design.userParameters
+   values = []
+   for key, suffix, units, comment in INPUT_PARAMETERS:
+      value = userParameters.itemByName(prefix + suffix).value
+      values.append(int(round(value)) if key == 'toothNumber' else value)
+   return tuple(values)
+
+
+# Change the six inputs of an existing gear pair and let Fusion recompute the features
+def updateParameters(design, prefix, drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius):
+   values = (drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius)
+   userParameters = design.userParameters
+   parameters = [userParameters.itemByName(prefix + suffix) for key, suffix, units, comment in INPUT_PARAMETERS]
+
+   # Change all of them in one compute when the API supports it
+   if hasattr(design, 'modifyParameters'):
+      design.modifyParameters(parameters, [_valueInput(value) for value in values])
+      return
+
+   for parameter, value in zip(parameters, values):
+      if abs(parameter.value - value) > 1e-9:
+         parameter.value = value
@@ -0,0 +1,181 @@
+# Geneva Gear Profile Export
+# Description: Command line tool that writes the 2D outlines of the driven and drive wheels as DXF and SVG
+#              without Fusion. It uses the same math as GenevaCreator, so the outlines are the exact lines
+#              and arcs of its sketches (they agree to better than 1e-6 mm). Run "python geneva_export.py --help".
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import geneva_catalog
+import geneva_geometry
+import geneva_profile
+
+# Output formats and their file extensions
+FORMATS = ('dxf', 'svg')
+
+
+# Outlines of each part, moved so each wheel turns about the origin. Values are in mm.
+# Returns {part: [(layer, loops)]}
+def partLayers(geometry):
+   loops = geneva_profile.outlineLoops(geometry)
+   driveShift = -geometry['thirdDist']
+
+   def shifted(partLoops):
+      return [[geneva_profile.translateSegment(segment, driveShift, 0.0) for segment in loop] for loop in partLoops]
+
+   return {
+      'driven': [('DRIVEN', loops['driven'])],
+      'drive': [('DRIVE_BASE', shifted(loops['driveBase'])), ('DRIVE_TOP', shifted(loops['driveTop']))],
+   }
+
+
+# Format a number for the output files
+def _number(value):
+   return f'{value:.6f}'.rstrip('0').rstrip('.')
+
+
+# DXF (R12) text for the layers, lengths in mm
+def dxfText(layers):
+   lines = ['0', 'SECTION', '2', 'HEADER', '9', '$ACADVER', '1', 'AC1009', '0', 'ENDSEC',
+            '0', 'SECTION', '2', 'ENTITIES']
+   for layer, loops in layers:
+      for loop in loops:
+         for segment in loop:
+            if segment[0] == 'line':
+               (x0, y0), (x1, y1) = segment[1], segment[2]
+               lines += ['0', 'LINE', '8', layer, '10', _number(x0), '20', _number(y0), '11', _number(x1), '21', _number(y1)]
+               continue
+
+            kind, (cx, cy), radius, startAngle, sweep = segment
+            if abs(abs(sweep) - 2*math.pi) < 1e-12:
+               lines += ['0', 'CIRCLE', '8', layer, '10', _number(cx), '20', _number(cy), '40', _number(radius)]
+               continue
+
+            # DXF arcs always run counter clockwise from the start angle to the end angle
+            if sweep < 0:
+               startAngle, sweep = startAngle + sweep, -sweep
+            start = math.degrees(startAngle) % 360
+            end = (start + math.degrees(sweep)) % 360
+            lines += ['0', 'ARC', '8', layer, '10', _number(cx), '20', _number(cy), '40', _number(radius),
+                      '50', _number(start), '51', _number(end)]
+   lines += ['0', 'ENDSEC', '0', 'EOF']
+   return '\n'.join(lines) + '\n'
+
+
+# SVG path data for one loop, in math coordinates (Y up)
+def _svgPath(loop):
+   start = geneva_profile.segmentEnds(loop[0])[0]
+   commands = [f'M {_number(start[0])} {_number(start[1])}']
+   for segment in loop:
+      if segment[0] == 'line':
+         x, y = segment[2]
+         commands.append(f'L {_number(x)} {_number(y)}')
+         continue
+
+      kind, center, radius, startAngle, sweep = segment
+      # SVG can not draw a full circle in one arc, split long arcs in two
+      pieces = 2 if abs(sweep) > math.pi else 1
+      for i in range(1, pieces + 1):
+         angle = startAngle + sweep*i/pieces
+         x = center[0] + radius*math.cos(angle)
+         y = center[1] + radius*math.sin(angle)
+         sweepFlag = 1 if sweep > 0 else 0
+         commands.append(f'A {_number(radius)} {_number(radius)} 0 0 {sweepFlag} {_number(x)} {_number(y)}')
+   commands.append('Z')
+   return ' '.join(commands)
+
+
+# SVG text for the layers, one group per layer, sized in mm
+def svgText(layers, bounds):
+   minX, minY, maxX, maxY = bounds
+   margin = 0.02*max(maxX - minX, maxY - minY)
+   minX, minY, maxX, maxY = minX - margin, minY - margin, maxX + margin, maxY + margin
+   width = maxX - minX
+   height = maxY - minY
+
+   lines = [
+      '<?xml version="1.0" encoding="UTF-8"?>',
+      f'<svg xmlns="http://www.w3.org/2000/svg" width="{_number(width)}mm" height="{_number(height)}mm" '
+      f'viewBox="{_number(minX)} {_number(-maxY)} {_number(width)} {_number(height)}">',
+      # Flip Y so the outlines keep the same orientation as in Fusion
+      '<g transform="scale(1,-1)" fill="none" stroke="black" stroke-width="0.1">',
+   ]
+   for layer, loops in layers:
+      lines.append(f'<g id="{layer}">')
+      for loop in loops:
+         lines.append(f'<path d="{_svgPath(loop)}"/>')
+      lines.append('</g>')
+   lines += ['</g>', '</svg>']
+   return '\n'.join(lines) + '\n'
+
+
+# Bounding box of a set of layers from their tessellated outlines
+def layerBounds(layers, tolerance):
+   xs = []
+   ys = []
+   for layer, loops in layers:
+      for loop in loops:
+         for x, y in geneva_profile.tessellateSegments(loop, tolerance):
+            xs.append(x)
+            ys.append(y)
+   return (min(xs), min(ys), max(xs), max(ys))
+
+
+# Write the files of one design, values are the catalog keys in mm. Returns the paths written.
+def exportDesign(values, folder, stem, formats=FORMATS):
+   geometry = geneva_geometry.computeGeometry(*(values[key] for key in geneva_catalog.PARAMETER_KEYS))
+   paths = []
+   for part, layers in partLayers(geometry).items():
+      for fileFormat in formats:
+         if fileFormat == 'dxf':
+            text = dxfText(layers)
+         else:
+            text = svgText(layers, layerBounds(layers, 0.01*geometry['slotRadius']))
+         path = os.path.join(folder, f'{stem}_{part}.{fileFormat}')
+         with open(path, 'w') as f:
+            f.write(text)
+         paths.append(path)
+   return paths
+
+
+# File name stem of a design
+def designStem(values, number=None):
+   stem = 'geneva_{number_of_slots}slots_R{driven_radius:g}_S{slot_radius:g}_B{backlash:g}'.format(**values)
+   if number is not None:
+      stem = f'row{number}_' + stem
+   return stem
+
+
+def main(argv=None):
+   scriptDir = os.path.dirname(os.path.realpath(__file__))
+   parser = argparse.ArgumentParser(description='Write the driven and drive wheel outlines of Geneva gear pairs as DXF and SVG. '
+                                                'Values are in mm. Anything not given comes from geneva_parameters.json.')
+   geneva_catalog.addParameterArguments(parser, scriptDir)
+   parser.add_argument('--format', choices=FORMATS, action='append', help='output format, can be repeated (default: both)')
+   parser.add_argument('--output', default='.', help='folder the files are written to')
+   args = parser.parse_args(argv)
+
+   genevaParameters, entries = geneva_catalog.argumentEntries(args)
+   formats = tuple(args.format or FORMATS)
+   os.makedirs(args.output, exist_ok=True)
+
+   written = 0
+   failed = 0
+   start = time.perf_counter()
+   for number, values, problems in entries:
+      if problems:
+         label = 'Design' if number is None else f'Row {number}'
+         print(f'{label} skipped: ' + '; '.join(problems), file=sys.stderr)
+         failed += 1
+         continue
+      written += len(exportDesign(values, args.output, designStem(values, number), formats))
+
+   print(f'Wrote {written} files for {len(entries) - failed} designs in {time.perf_counter() - start:.3f} s')
+   return 1 if failed else 0
+
+
+if __name__ == '__main__':
+   sys.exit(main())
@@ -0,0 +1,166 @@
+# Geneva Gear Geometry
+# Description: Computes the derived dimensions and reference points of a Geneva gear pair.
+#              This module does not use the Fusion API so it can be reused outside of Fusion.
+#              A single parameter set uses plain Python, arrays of parameter sets use NumPy.
+
+import math
+
+try:
+   import numpy as np
+except ImportError:
+   np = None
+
+# Names of the derived values, in the order they are calculated
+VALUE_NAMES = (
+   'angle',
+   'cos',
+   'sin',
+   'thirdDist',
+   'driveRadius',
+   'constructionRadius',
+   'slotLineLength',
+   'driveProfileRadius',
+   'pinBaseRadius',
+   'const1',
+   'const2',
+)
+
+# Names of the reference points used to draw the sketches, stored as (x, y) on the XY plane
+POINT_NAMES = (
+   'startPoint',
+   'diameterPoint',
+   'drivePoint',
+   'constructionPoint',
+   'lowerSlotLineStart',
+   'lowerSlotLineEnd',
+   'upperSlotLineStart',
+   'upperSlotLineEnd',
+   'pinPoint',
+   'tangentLine1Start',
+   'tangentLine1End',
+   'tangentLine2Start',
+   'tangentLine2End',
+   'tangentLineIntersection',
+)
+
+# Names of the six input parameters, in the order GenevaCreator takes them
+PARAMETER_NAMES = ('drivenRadius', 'slotRadius', 'toothNumber', 'backlash', 'thickness', 'filletRadius')
+
+
+# Shared math for the single and batched versions, sin and cos are passed in so the same
+# formulas work on floats (math) and on arrays (NumPy)
+def _derive(drivenRadius, slotRadius, toothNumber, backlash, sinFunc, cosFunc):
+   # Half of the angle between two slots
+   angle = math.pi/toothNumber
+   cos = cosFunc(angle)
+   sin = sinFunc(angle)
+
+   # Calculation for 3rd point distance
+   thirdDist = drivenRadius*cos + drivenRadius*sin**2/cos
+
+   # Calculation for drive radius
+   driveRadius = drivenRadius*sin/cos
+
+   # Calculation for construction radius
+   constructionRadius = thirdDist - driveRadius
+
+   # Calculation for slot line length
+   slotLineLength = drivenRadius - constructionRadius
+
+   # Calculation for drive gear profile radius
+   driveProfileRadius = thirdDist-drivenRadius*cos+slotRadius
+
+   # Calculation for pin base tangent lines
+   pinBaseRadius = 2*slotRadius
+   const1 = thirdDist - constructionRadius
+   const2 = (const1)/(driveRadius/(pinBaseRadius)-1)
+
+   values = {
+      'angle': angle,
+      'cos': cos,
+      'sin': sin,
+      'thirdDist': thirdDist,
+      'driveRadius': driveRadius,
+      'constructionRadius': constructionRadius,
+      'slotLineLength': slotLineLength,
+      'driveProfileRadius': driveProfileRadius,
+      'pinBaseRadius': pinBaseRadius,
+      'const1': const1,
+      'const2': const2,
+   }
+
+   # Reference points for the sketches
+   points = {
+      'startPoint': (0*drivenRadius, 0*drivenRadius),
+      'diameterPoint': (drivenRadius*cos, drivenRadius*sin),
+      'drivePoint': (thirdDist, 0*drivenRadius),
+      'constructionPoint': (constructionRadius*cos, constructionRadius*sin),
+      'lowerSlotLineStart': (constructionRadius*cos + slotRadius*sin, constructionRadius*sin - slotRadius*cos),
+      'lowerSlotLineEnd': (drivenRadius*cos + slotRadius*sin, drivenRadius*sin - slotRadius*cos),
+      'upperSlotLineStart': (constructionRadius*cos - slotRadius*sin, constructionRadius*sin + slotRadius*cos),
+      'upperSlotLineEnd': (drivenRadius*cos - slotRadius*sin, drivenRadius*sin + slotRadius*cos),
+      'pinPoint': (constructionRadius, 0*drivenRadius),
+      'tangentLine1Start': (constructionRadius-backlash, pinBaseRadius+backlash),
+      'tangentLine1End': (thirdDist+backlash, driveProfileRadius+backlash),
+      'tangentLine2Start': (constructionRadius-backlash, -(pinBaseRadius+backlash)),
+      'tangentLine2End': (thirdDist+backlash, -(driveProfileRadius+backlash)),
+      'tangentLineIntersection': (constructionRadius-const2, 0*drivenRadius),
+   }
+
+   return values, points
+
+
+# Computes every derived value and reference point for one parameter set.
+# Returns a dictionary holding the inputs, the values in VALUE_NAMES and the points in POINT_NAMES.
+def computeGeometry(drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius):
+   values, points = _derive(drivenRadius, slotRadius, toothNumber, backlash, math.sin, math.cos)
+
+   geometry = {
+      'drivenRadius': drivenRadius,
+      'slotRadius': slotRadius,
+      'toothNumber': toothNumber,
+      'backlash': backlash,
+      'thickness': thickness,
+      'filletRadius': filletRadius,
+   }
+   geometry.update(values)
+   geometry.update(points)
+   return geometry
+
+
+# Computes the same dictionary as computeGeometry for many parameter sets in one vectorized pass.
+# Every argument can be a scalar or an array, they are broadcast against each other.
+# Values come back as arrays of shape (n,) and points as arrays of shape (n, 2).
+# Designs that can not be built (for example const2 dividing by zero) give inf or nan instead of raising.
+def computeGeometryBatch(drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius):
+   if np is None:
+      raise ImportError('NumPy is required to compute batches of Geneva gears')
+
+   inputs = np.broadcast_arrays(
+      np.atleast_1d(np.asarray(drivenRadius, dtype=float)),
+      np.atleast_1d(np.asarray(slotRadius, dtype=float)),
+      np.atleast_1d(np.asarray(toothNumber)),
+      np.atleast_1d(np.asarray(backlash, dtype=float)),
+      np.atleast_1d(np.asarray(thickness, dtype=float)),
+      np.atleast_1d(np.asarray(filletRadius, dtype=float)),
+   )
+   drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius = inputs
+
+   with np.errstate(divide='ignore', invalid='ignore'):
+      values, points = _derive(drivenRadius, slotRadius, toothNumber, backlash, np.sin, np.cos)
+
+   geometry = dict(zip(PARAMETER_NAMES, inputs))
+   geometry.update(values)
+   for name, (x, y) in points.items():
+      geometry[name] = np.stack((x, y), axis=-1)
+   return geometry
+
+
+# Picks the i-th design out of a batch in the same form computeGeometry returns
+def geometryAt(batch, i):
+   geometry = {}
+   for name in PARAMETER_NAMES + VALUE_NAMES:
+      geometry[name] = batch[name][i].item()
+   for name in POINT_NAMES:
+      geometry[name] = (batch[name][i, 0].item(), batch[name][i, 1].item())
+   return geometry
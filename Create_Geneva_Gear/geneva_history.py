@@ -0,0 +1,125 @@
+# Geneva Gear History
+# Description: SQLite file next to geneva_parameters.json with every gear pair the add-in built, edited or
+#              failed to build, with how long it took, and the named presets. Builds are only ever added, the
+#              table refuses updates and deletes. Each write is one transaction in a write-ahead log, so a crash
+#              leaves either the whole row or none of it. The dialog only reads the preset names and the last
+#              few builds, both through an index, so it stays fast with any number of builds.
+#              Parameter values use the keys of geneva_parameters.json, in mm.
+
+import json
+import sqlite3
+import time
+
+import geneva_catalog
+
+HISTORY_NAME = 'geneva_history.sqlite'
+
+# Bumped when the tables change, an older file is upgraded when it is opened
+SCHEMA_VERSION = 1
+
+# Outcome of a build: new bodies, bodies from the part cache, parameters of an existing pair changed, or an error
+OUTCOMES = ('built', 'inserted', 'updated', 'failed')
+
+_SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS builds (
+   id INTEGER PRIMARY KEY,
+   time TEXT NOT NULL,
+   name TEXT,
+   {', '.join(f'{key} REAL NOT NULL' for key in geneva_catalog.PARAMETER_KEYS)},
+   seconds REAL,
+   outcome TEXT NOT NULL,
+   message TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS builds_outcome ON builds (outcome, id);
+CREATE TRIGGER IF NOT EXISTS builds_no_update BEFORE UPDATE ON builds
+   BEGIN SELECT RAISE(ABORT, 'the build history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS builds_no_delete BEFORE DELETE ON builds
+   BEGIN SELECT RAISE(ABORT, 'the build history is append-only'); END;
+CREATE TABLE IF NOT EXISTS presets (
+   name TEXT PRIMARY KEY,
+   parameters TEXT NOT NULL,
+   updated TEXT NOT NULL
+) WITHOUT ROWID;
+PRAGMA user_version = {SCHEMA_VERSION};
+'''
+
+
+def _now():
+   return time.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+# Parameter values of a row, number_of_slots back to an integer
+def _rowValues(row):
+   values = {key: row[key] for key in geneva_catalog.PARAMETER_KEYS}
+   values['number_of_slots'] = int(values['number_of_slots'])
+   return values
+
+
+class HistoryStore:
+   # The file is opened on first use
+   def __init__(self, path):
+      self.path = path
+      self._connection = None
+
+   def _connect(self):
+      if self._connection is None:
+         connection = sqlite3.connect(self.path, timeout=5.0)
+         connection.row_factory = sqlite3.Row
+         connection.execute('PRAGMA journal_mode = WAL')
+         connection.execute('PRAGMA synchronous = FULL')
+         if connection.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            connection.executescript(_SCHEMA)
+         self._connection = connection
+      return self._connection
+
+   def close(self):
+      if self._connection is not None:
+         self._connection.close()
+         self._connection = None
+
+   # Add a build, returns its id
+   def record(self, values, name, seconds, outcome, message=''):
+      if outcome not in OUTCOMES:
+         raise ValueError(f'Unknown outcome {outcome!r}, use one of: ' + ', '.join(OUTCOMES))
+      columns = ', '.join(geneva_catalog.PARAMETER_KEYS)
+      marks = ', '.join('?' for key in geneva_catalog.PARAMETER_KEYS)
+      connection = self._connect()
+      with connection:
+         cursor = connection.execute(
+            f'INSERT INTO builds (time, name, {columns}, seconds, outcome, message) VALUES (?, ?, {marks}, ?, ?, ?)',
+            [_now(), name] + [values[key] for key in geneva_catalog.PARAMETER_KEYS] + [seconds, outcome, message])
+      return cursor.lastrowid
+
+   # The last builds with the given outcomes, newest first, as dictionaries with the parameter values under 'values'
+   def recent(self, limit=10, outcomes=('built', 'inserted', 'updated')):
+      rows = []
+      for outcome in outcomes:
+         rows += self._connect().execute('SELECT * FROM builds WHERE outcome = ? ORDER BY id DESC LIMIT ?', (outcome, limit)).fetchall()
+      rows = sorted(rows, key=lambda row: row['id'], reverse=True)[:limit]
+      return [{'id': row['id'], 'time': row['time'], 'name': row['name'], 'values': _rowValues(row),
+               'seconds': row['seconds'], 'outcome': row['outcome'], 'message': row['message']} for row in rows]
+
+   def count(self):
+      return self._connect().execute('SELECT count(*) FROM builds').fetchone()[0]
+
+   # Save the values under a name, replacing a preset with the same name
+   def savePreset(self, name, values):
+      parameters = json.dumps({key: values[key] for key in geneva_catalog.PARAMETER_KEYS})
+      connection = self._connect()
+      with connection:
+         connection.execute('INSERT INTO presets (name, parameters, updated) VALUES (?, ?, ?) '
+                            'ON CONFLICT (name) DO UPDATE SET parameters = excluded.parameters, updated = excluded.updated',
+                            (name, parameters, _now()))
+
+   # Values of a preset, None when there is none with that name
+   def preset(self, name):
+      row = self._connect().execute('SELECT parameters FROM presets WHERE name = ?', (name,)).fetchone()
+      return json.loads(row['parameters']) if row else None
+
+   def presetNames(self):
+      return [row['name'] for row in self._connect().execute('SELECT name FROM presets ORDER BY name')]
+
+   def deletePreset(self, name):
+      connection = self._connect()
+      with connection:
+         connection.execute('DELETE FROM presets WHERE name = ?', (name,))
@@ -0,0 +1,108 @@
+# Geneva Gear Kinematics
+# Description: Motion of the driven wheel for a given drive crank angle: angle, angular velocity, acceleration
+#              and jerk. Uses the center distance (thirdDist) and pin radius (driveRadius) from geneva_geometry.
+#              A single angle uses plain Python, arrays of angles use NumPy in one vectorized pass.
+#
+#              Angles are in radians and counter clockwise positive. The crank angle is 0 in the position the
+#              gears are built in, with the pin at the bottom of a slot. The driven angle is 0 there as well and
+#              keeps adding up from one index to the next. Derivatives are for a drive turning at a constant
+#              driveSpeed (rad/s). The acceleration steps when the pin enters and leaves a slot, so the jerk has
+#              an impulse there that sampled values can not show.
+
+import math
+
+try:
+   import numpy as np
+except ImportError:
+   np = None
+
+
+# Pin radius over center distance, sin(pi/toothNumber) for the gears GenevaCreator builds
+def crankRatio(geometry):
+   return geometry['driveRadius']/geometry['thirdDist']
+
+
+# Crank angle where the pin enters the slot (the driven wheel stops turning) and the driven angle there
+def engagement(geometry):
+   ratio = crankRatio(geometry)
+   engageAngle = math.acos(ratio)
+   dwellAngle = math.atan2(ratio*math.sin(engageAngle), 1 - ratio*math.cos(engageAngle))
+   return engageAngle, dwellAngle
+
+
+# Driven angle and its first three derivatives with respect to the crank angle while the pin is in a slot.
+# Works on floats or arrays depending on the sin, cos and atan2 passed in.
+def _engaged(crankAngle, ratio, sinFunc, cosFunc, atan2Func):
+   sin = sinFunc(crankAngle)
+   cos = cosFunc(crankAngle)
+   denominator = 1 - 2*ratio*cos + ratio**2
+
+   angle = -atan2Func(ratio*sin, 1 - ratio*cos)
+   velocity = -ratio*(cos - ratio)/denominator
+   acceleration = ratio*(1 - ratio**2)*sin/denominator**2
+   jerk = ratio*(1 - ratio**2)*(cos*denominator - 4*ratio*sin**2)/denominator**3
+   return angle, velocity, acceleration, jerk
+
+
+# Motion of the driven wheel for one crank angle.
+# Returns (angle, velocity, acceleration, jerk) of the driven wheel.
+def motion(geometry, crankAngle, driveSpeed=1.0):
+   ratio = crankRatio(geometry)
+   engageAngle, dwellAngle = engagement(geometry)
+
+   # Number of full drive turns and the angle within the current turn, between -pi and pi
+   turns = math.floor((crankAngle + math.pi)/(2*math.pi))
+   local = crankAngle - 2*math.pi*turns
+   indexAngle = -2*dwellAngle*turns
+
+   if abs(local) <= engageAngle:
+      angle, velocity, acceleration, jerk = _engaged(local, ratio, math.sin, math.cos, math.atan2)
+      return (indexAngle + angle, velocity*driveSpeed, acceleration*driveSpeed**2, jerk*driveSpeed**3)
+
+   # Locked between two indexes
+   return (indexAngle - math.copysign(dwellAngle, local), 0.0, 0.0, 0.0)
+
+
+# Motion of the driven wheel for an array of crank angles in one vectorized pass.
+# Returns a dictionary of arrays with the same shape as crankAngles: angle, velocity, acceleration and jerk.
+def motionBatch(geometry, crankAngles, driveSpeed=1.0):
+   if np is None:
+      raise ImportError('NumPy is required to compute the motion for arrays of crank angles')
+
+   ratio = crankRatio(geometry)
+   engageAngle, dwellAngle = engagement(geometry)
+   crankAngles = np.asarray(crankAngles, dtype=float)
+
+   turns = np.floor((crankAngles + np.pi)/(2*np.pi))
+   local = crankAngles - 2*np.pi*turns
+   engaged = np.abs(local) <= engageAngle
+
+   angle, velocity, acceleration, jerk = _engaged(local, ratio, np.sin, np.cos, np.arctan2)
+   lockedAngle = -np.copysign(dwellAngle, local)
+
+   return {
+      'angle': -2*dwellAngle*turns + np.where(engaged, angle, lockedAngle),
+      'velocity': np.where(engaged, velocity*driveSpeed, 0.0),
+      'acceleration': np.where(engaged, acceleration*driveSpeed**2, 0.0),
+      'jerk': np.where(engaged, jerk*driveSpeed**3, 0.0),
+   }
+
+
+# Largest magnitudes over one drive turn, for sizing the motor. Peak velocity is at the middle of the
+# index; the acceleration and jerk are taken from samples of the engaged part of the turn.
+def peakMotion(geometry, driveSpeed=1.0, samples=100001):
+   engageAngle, dwellAngle = engagement(geometry)
+   ratio = crankRatio(geometry)
+   if np is None:
+      crankAngles = [-engageAngle + 2*engageAngle*i/(samples - 1) for i in range(samples)]
+      values = [_engaged(a, ratio, math.sin, math.cos, math.atan2) for a in crankAngles]
+      velocity, acceleration, jerk = (max(abs(v[i]) for v in values) for i in (1, 2, 3))
+   else:
+      crankAngles = np.linspace(-engageAngle, engageAngle, samples)
+      angle, velocity, acceleration, jerk = _engaged(crankAngles, ratio, np.sin, np.cos, np.arctan2)
+      velocity, acceleration, jerk = (float(np.max(np.abs(v))) for v in (velocity, acceleration, jerk))
+   return {
+      'velocity': velocity*driveSpeed,
+      'acceleration': acceleration*driveSpeed**2,
+      'jerk': jerk*driveSpeed**3,
+   }
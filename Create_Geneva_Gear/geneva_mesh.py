@@ -0,0 +1,451 @@
+# Geneva Gear Mesh Export
+# Description: Command line tool that writes the driven and drive wheels as closed triangle meshes (binary STL
+#              or 3MF) for 3D printing, without Fusion. The outlines from geneva_profile are extruded to the
+#              thickness and the driven wheel gets the fillet rounds on its outer edges. Arcs are split into
+#              just enough pieces for the chord tolerance. Vertices and triangles are NumPy arrays and are
+#              written to the files in blocks. Run "python geneva_mesh.py --help".
+#
+#              The driven wheel is triangulated one sector at a time and the triangles are repeated for the
+#              other sectors, so its cost stays about the same as the slot count grows. The drive wheel is
+#              printed with its base on the bed and the locking disc and pin on top of it, in one solid.
+
+import argparse
+import math
+import os
+import sys
+import time
+import zipfile
+
+try:
+   import numpy as np
+except ImportError:
+   np = None
+
+import geneva_catalog
+import geneva_export
+import geneva_geometry
+import geneva_profile
+
+# Output formats and their file extensions
+FORMATS = ('stl', '3mf')
+
+# Chord tolerance in mm, finer than a printer can follow
+DEFAULT_TOLERANCE = 0.01
+
+# Triangles written to the files at a time
+BLOCK_SIZE = 65536
+
+# Decimals of the 3MF vertex coordinates in mm, trailing zeros are left out
+VERTEX_DECIMALS = 6
+
+
+# Points of a loop of segments as an (n, 2) array
+def _loopPoints(segments, tolerance):
+   return np.array(geneva_profile.tessellateSegments(segments, tolerance), dtype=float)
+
+
+# Ear clipping of a polygon that runs counter clockwise, with holes that run clockwise.
+# Each hole is joined to the outline by a bridge to a vertex it can see, then ears are cut off one at a time.
+# Returns an (n, 3) array of counter clockwise triangles, indices into the outline points followed by the
+# points of each hole.
+def triangulate(outline, holes=()):
+   points = np.concatenate([outline] + list(holes)) if holes else np.asarray(outline, dtype=float)
+   polygon = list(range(len(outline)))
+   offset = len(outline)
+   holeIndices = []
+   for hole in holes:
+      holeIndices.append(list(range(offset, offset + len(hole))))
+      offset += len(hole)
+
+   # Holes furthest to the right first, so each bridge can only run into the outline and the holes already joined
+   for hole in sorted(holeIndices, key=lambda indices: -points[indices, 0].max()):
+      polygon = _bridgeHole(points, polygon, hole)
+   return _clipEars(points, polygon)
+
+
+# Twice the signed area of triangles, positive when counter clockwise
+def _cross(a, b, c):
+   return (b[..., 0] - a[..., 0])*(c[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1])*(c[..., 0] - a[..., 0])
+
+
+# Splice a hole into the polygon (lists of point indices) through its rightmost point
+def _bridgeHole(points, polygon, hole):
+   inner = hole[int(np.argmax(points[hole, 0]))]
+   mx, my = points[inner]
+
+   # Nearest crossing of a ray from the hole to the right with an edge of the polygon
+   starts = points[polygon]
+   ends = np.roll(starts, -1, axis=0)
+   crossesRay = (starts[:, 1] - my)*(ends[:, 1] - my) <= 0
+   with np.errstate(divide='ignore', invalid='ignore'):
+      t = (my - starts[:, 1])/(ends[:, 1] - starts[:, 1])
+      x = starts[:, 0] + t*(ends[:, 0] - starts[:, 0])
+   x = np.where(crossesRay & np.isfinite(x) & (x >= mx), x, np.inf)
+   edge = int(np.argmin(x))
+   if not np.isfinite(x[edge]):
+      raise ValueError('Hole is not inside the outline')
+
+   # The end of that edge furthest to the right is seen from the hole, unless a reflex vertex of the polygon
+   # is inside the triangle it makes with the crossing. Then the one of those closest to the ray is.
+   candidate = edge if starts[edge, 0] > ends[edge, 0] else (edge + 1) % len(polygon)
+   crossing = np.array([x[edge], my])
+   previous = points[np.roll(polygon, 1)]
+   following = points[np.roll(polygon, -1)]
+   reflex = _cross(previous, starts, following) < 0
+   a, b, c = points[inner], crossing, points[polygon[candidate]]
+   if _cross(a, b, c) < 0:
+      b, c = c, b
+   inside = reflex & (_cross(a, b, starts) >= 0) & (_cross(b, c, starts) >= 0) & (_cross(c, a, starts) >= 0)
+   inside[candidate] = False
+   if inside.any():
+      angles = np.abs(np.arctan2(starts[:, 1] - my, starts[:, 0] - mx))
+      angles[~inside] = np.inf
+      candidate = int(np.argmin(angles))
+
+   start = hole.index(inner)
+   loop = hole[start:] + hole[:start + 1]
+   return polygon[:candidate + 1] + loop + polygon[candidate:]
+
+
+# Ears of a counter clockwise polygon given as a list of point indices, which may repeat along bridges
+def _clipEars(points, polygon):
+   count = len(polygon)
+   vertices = np.array(polygon)
+   previous = np.roll(np.arange(count), 1)
+   following = np.roll(np.arange(count), -1)
+   alive = np.ones(count, dtype=bool)
+   xy = points[vertices]
+
+   def isReflex(i):
+      return _cross(xy[previous[i]], xy[i], xy[following[i]]) <= 0
+
+   reflex = _cross(xy[previous], xy, xy[following]) <= 0
+   triangles = []
+   remaining = count
+   i = 0
+   misses = 0
+   while remaining > 3:
+      p, n = previous[i], following[i]
+      isEar = not reflex[i]
+      if isEar:
+         # No reflex corner may lie in the ear, other than the corners of the ear itself and their copies
+         candidates = np.flatnonzero(alive & reflex)
+         if len(candidates):
+            others = xy[candidates]
+            a, b, c = xy[p], xy[i], xy[n]
+            inside = (_cross(a, b, others) >= 0) & (_cross(b, c, others) >= 0) & (_cross(c, a, others) >= 0)
+            ids = vertices[candidates]
+            inside &= (ids != vertices[p]) & (ids != vertices[i]) & (ids != vertices[n])
+            isEar = not inside.any()
+
+      if not isEar:
+         misses += 1
+         if misses <= remaining:
+            i = n
+            continue
+         # Only flat or tangled corners left, drop the flattest one so the loop ends
+         aliveIndices = np.flatnonzero(alive)
+         areas = np.abs(_cross(xy[previous[aliveIndices]], xy[aliveIndices], xy[following[aliveIndices]]))
+         i = aliveIndices[int(np.argmin(areas))]
+         p, n = previous[i], following[i]
+
+      if _cross(xy[p], xy[i], xy[n]) > 0:
+         triangles.append((vertices[p], vertices[i], vertices[n]))
+      alive[i] = False
+      following[p] = n
+      previous[n] = p
+      reflex[p] = isReflex(p)
+      reflex[n] = isReflex(n)
+      remaining -= 1
+      misses = 0
+      i = n
+
+   i = int(np.nonzero(alive)[0][0])
+   p, n = previous[i], following[i]
+   if _cross(xy[p], xy[i], xy[n]) > 0:
+      triangles.append((vertices[p], vertices[i], vertices[n]))
+   return np.array(triangles, dtype=np.int64).reshape(-1, 3)
+
+
+# Side walls between a loop of bottom vertices and the matching top vertices, facing out of a counter
+# clockwise loop. bottom and top are index arrays.
+def _walls(bottom, top):
+   nextBottom = np.roll(bottom, -1)
+   nextTop = np.roll(top, -1)
+   return np.concatenate([np.stack([bottom, nextBottom, nextTop], axis=1), np.stack([bottom, nextTop, top], axis=1)])
+
+
+# 3D vertices of 2D points at a height
+def _lift(points, z):
+   return np.column_stack([points, np.full(len(points), float(z))])
+
+
+# One sector of the driven wheel with rounded outer corners, starting and ending at the bottom of a slot
+def drivenSector(geometry):
+   loop = geneva_profile.filletedDrivenWheelLoops(geometry)[0]
+   toothNumber = int(geometry['toothNumber'])
+   sector = loop[:len(loop)//toothNumber]
+
+   # Split the round end of the slot so the sector can start at its middle, on the slot axis
+   lowerWall, slotEnd = sector[0], sector[1]
+   kind, center, radius, startAngle, sweep = slotEnd
+   firstHalf = ('arc', center, radius, startAngle, sweep/2)
+   secondHalf = ('arc', center, radius, startAngle + sweep/2, sweep/2)
+   sectorAngle = 2*math.pi/toothNumber
+   nextSlot = [geneva_profile.rotateSegment(segment, sectorAngle) for segment in (lowerWall, firstHalf)]
+   return [secondHalf] + sector[2:] + nextSlot
+
+
+# Closed mesh of the driven wheel from z = 0 to the thickness. Returns (vertices, triangles).
+def drivenWheelMesh(geometry, tolerance):
+   toothNumber = int(geometry['toothNumber'])
+   thickness = geometry['thickness']
+   sectorAngle = 2*math.pi/toothNumber
+
+   # Outline points of every sector, rotated copies of the first one
+   sectorPoints = _loopPoints(drivenSector(geometry), tolerance)
+   count = len(sectorPoints)
+   angles = sectorAngle*np.arange(toothNumber)
+   c, s = np.cos(angles)[:, None], np.sin(angles)[:, None]
+   outline = np.stack([sectorPoints[:, 0]*c - sectorPoints[:, 1]*s, sectorPoints[:, 0]*s + sectorPoints[:, 1]*c], axis=-1).reshape(-1, 2)
+
+   # The middle of the wheel is a disc well inside the slots and the locking cut-outs
+   innerRadius = 0.5*np.hypot(outline[:, 0], outline[:, 1]).min()
+   if innerRadius <= 0:
+      raise ValueError('The slots reach the center of the driven wheel')
+   innerCount = geneva_profile.arcPieces(innerRadius, sectorAngle, tolerance)
+   innerAngles = sectorAngle*np.arange(toothNumber*innerCount)/innerCount
+   inner = innerRadius*np.column_stack([np.cos(innerAngles), np.sin(innerAngles)])
+
+   # Triangulate the first sector between the outline and the disc, from one slot bottom to the next
+   outlineCount = toothNumber*count
+   ring = np.arange(outlineCount)
+   innerRing = outlineCount + np.arange(toothNumber*innerCount)
+   points2d = np.concatenate([outline, inner, np.zeros((1, 2))])
+   center = len(points2d) - 1
+   local = np.concatenate([np.arange(count + 1), outlineCount + innerCount - np.arange(innerCount + 1)])
+   pieceTriangles = triangulate(points2d[local])
+
+   # The same triangles for every sector, the indices move by one sector on each ring
+   sectors = np.arange(toothNumber)[:, None]
+   outlineIndex = (np.arange(count + 1)[None, :] + sectors*count) % outlineCount
+   innerIndex = outlineCount + (innerCount - np.arange(innerCount + 1)[None, :] + sectors*innerCount) % (toothNumber*innerCount)
+   pieces = np.concatenate([outlineIndex, innerIndex], axis=1)
+   capTriangles = pieces[:, pieceTriangles].reshape(-1, 3)
+   disc = np.stack([np.full(len(innerRing), center), innerRing, np.roll(innerRing, -1)], axis=1)
+   cap = np.concatenate([capTriangles, disc])
+
+   top = len(points2d)
+   vertices = np.concatenate([_lift(points2d, 0.0), _lift(points2d, thickness)])
+   triangles = np.concatenate([cap[:, ::-1], cap + top, _walls(ring, ring + top)])
+   return vertices, triangles
+
+
+# Closed mesh of the drive wheel on its own axis: the base from z = 0 to the thickness and the locking disc
+# and pin on top of it up to twice the thickness. Returns (vertices, triangles).
+def driveWheelMesh(geometry, tolerance):
+   thickness = geometry['thickness']
+   shift = np.array([geometry['thirdDist'], 0.0])
+   base = _loopPoints(geneva_profile.driveBaseLoops(geometry)[0], tolerance) - shift
+   tops = [_loopPoints(loop, tolerance) - shift for loop in geneva_profile.driveTopLoops(geometry)]
+
+   # Points: the base outline, then each top outline, each at three heights where needed
+   baseCount = len(base)
+   vertices = [_lift(base, 0.0), _lift(base, thickness)]
+   triangles = []
+   baseBottom = np.arange(baseCount)
+   baseTop = baseBottom + baseCount
+   offset = 2*baseCount
+   triangles.append(triangulate(base)[:, ::-1])
+   triangles.append(_walls(baseBottom, baseTop))
+
+   # The top of the base has the outlines of the locking disc and the pin as holes, their walls start there
+   topRings = []
+   for points in tops:
+      lower = offset + np.arange(len(points))
+      upper = lower + len(points)
+      vertices += [_lift(points, thickness), _lift(points, 2*thickness)]
+      triangles.append(triangulate(points) + upper[0])
+      triangles.append(_walls(lower, upper))
+      topRings.append(lower)
+      offset += 2*len(points)
+
+   holes = [points[::-1] for points in tops]
+   capTriangles = triangulate(base, holes)
+   mapping = np.concatenate([baseTop] + [ring[::-1] for ring in topRings])
+   triangles.append(mapping[capTriangles])
+   return np.concatenate(vertices), np.concatenate(triangles)
+
+
+# Meshes of both wheels, each about its own axis: {part: (vertices, triangles)}
+def partMeshes(geometry, tolerance=DEFAULT_TOLERANCE):
+   if np is None:
+      raise ImportError('NumPy is required to build meshes')
+   return {
+      'driven': drivenWheelMesh(geometry, tolerance),
+      'drive': driveWheelMesh(geometry, tolerance),
+   }
+
+
+# Binary STL, written a block of triangles at a time
+def writeStl(path, vertices, triangles, name='geneva'):
+   record = np.dtype([('normal', '<f4', (3,)), ('corners', '<f4', (3, 3)), ('attribute', '<u2')])
+   with open(path, 'wb') as f:
+      f.write(name.encode('ascii', 'replace')[:80].ljust(80, b' '))
+      f.write(np.uint32(len(triangles)).tobytes())
+      for start in range(0, len(triangles), BLOCK_SIZE):
+         corners = vertices[triangles[start:start + BLOCK_SIZE]]
+         normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+         lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+         block = np.zeros(len(corners), dtype=record)
+         block['normal'] = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+         block['corners'] = corners
+         f.write(block.tobytes())
+
+
+_CONTENT_TYPES = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                  '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                  '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                  '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+                  '</Types>\n')
+_RELATIONSHIPS = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                  '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                  '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+                  'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+                  '</Relationships>\n')
+
+
+# ASCII digits of every number from 0 to 9999, four characters each with leading zeros
+_DIGIT_GROUPS = None
+
+
+# ASCII digits of non-negative integers as an (n, width) byte array with leading zeros, four digits at a time
+def _digitChars(values, width):
+   global _DIGIT_GROUPS
+   if _DIGIT_GROUPS is None:
+      numbers = np.arange(10000)
+      _DIGIT_GROUPS = np.stack([numbers//10**power % 10 + ord('0') for power in (3, 2, 1, 0)], axis=1).astype(np.uint8)
+   groups = []
+   for group in range(-(-width//4)):
+      values, remainder = np.divmod(values, 10000)
+      groups.append(_DIGIT_GROUPS[remainder])
+   return np.hstack(groups[::-1])[:, -width:]
+
+
+# Integers written without leading zeros, as the characters and which of them to keep
+def _digits(values):
+   width = len(str(int(values.max()))) if len(values) else 1
+   chars = _digitChars(values, width)
+   keep = np.logical_or.accumulate(chars != ord('0'), axis=1)
+   keep[:, -1] = True
+   return chars, keep
+
+
+# Numbers written with up to places decimals, without leading zeros or trailing zeros after the point
+def _decimals(values, places):
+   scaled = np.rint(values*10**places).astype(np.int64)
+   magnitude = np.abs(scaled)
+   wholeWidth = len(str(int(magnitude.max())//10**places)) if len(values) else 1
+   chars = _digitChars(magnitude, wholeWidth + places)
+   significant = chars != ord('0')
+   wholeKeep = np.logical_or.accumulate(significant[:, :wholeWidth], axis=1)
+   wholeKeep[:, -1] = True
+   fractionKeep = np.logical_or.accumulate(significant[:, :wholeWidth - 1:-1], axis=1)[:, ::-1]
+   count = len(values)
+   chars = np.hstack((np.full((count, 1), ord('-'), dtype=np.uint8), chars[:, :wholeWidth],
+                      np.full((count, 1), ord('.'), dtype=np.uint8), chars[:, wholeWidth:]))
+   keep = np.hstack(((scaled < 0)[:, None], wholeKeep, fractionKeep[:, :1], fractionKeep))
+   return chars, keep
+
+
+# Lines of text from fixed text and numbers, one line per row. pieces are bytes or the (chars, keep) of
+# _digits or _decimals. The kept characters of all the rows are picked in one step.
+def _lines(count, pieces):
+   chars = []
+   keep = []
+   for piece in pieces:
+      if isinstance(piece, bytes):
+         text = np.frombuffer(piece, dtype=np.uint8)
+         chars.append(np.broadcast_to(text, (count, len(text))))
+         keep.append(np.ones((count, len(text)), dtype=bool))
+      else:
+         chars.append(piece[0])
+         keep.append(piece[1])
+   return np.hstack(chars)[np.hstack(keep)].tobytes()
+
+
+# 3MF package with one object in mm, the model is streamed into the zip a block at a time. The XML of a block
+# is made from NumPy arrays of characters, not formatted one number at a time.
+def write3mf(path, vertices, triangles, name='geneva'):
+   with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+      package.writestr('[Content_Types].xml', _CONTENT_TYPES)
+      package.writestr('_rels/.rels', _RELATIONSHIPS)
+      with package.open('3D/3dmodel.model', 'w') as model:
+         model.write(('<?xml version="1.0" encoding="UTF-8"?>\n'
+                      '<model unit="millimeter" xml:lang="en-US" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n'
+                      f'<resources><object id="1" type="model" name="{name}"><mesh>\n<vertices>\n').encode('utf-8'))
+         for start in range(0, len(vertices), BLOCK_SIZE):
+            block = vertices[start:start + BLOCK_SIZE]
+            model.write(_lines(len(block), (b'<vertex x="', _decimals(block[:, 0], VERTEX_DECIMALS), b'" y="', _decimals(block[:, 1], VERTEX_DECIMALS),
+                                            b'" z="', _decimals(block[:, 2], VERTEX_DECIMALS), b'"/>\n')))
+         model.write(b'</vertices>\n<triangles>\n')
+         for start in range(0, len(triangles), BLOCK_SIZE):
+            block = triangles[start:start + BLOCK_SIZE]
+            block = block.astype(np.int64)
+            model.write(_lines(len(block), (b'<triangle v1="', _digits(block[:, 0]), b'" v2="', _digits(block[:, 1]),
+                                            b'" v3="', _digits(block[:, 2]), b'"/>\n')))
+         model.write(b'</triangles>\n</mesh></object></resources>\n<build><item objectid="1"/></build>\n</model>\n')
+
+
+WRITERS = {'stl': writeStl, '3mf': write3mf}
+
+
+# Write the meshes of one design, values are the catalog keys in mm. Returns the paths written and the
+# number of triangles.
+def exportDesign(values, folder, stem, formats=FORMATS, tolerance=DEFAULT_TOLERANCE):
+   geometry = geneva_geometry.computeGeometry(*(values[key] for key in geneva_catalog.PARAMETER_KEYS))
+   paths = []
+   triangleCount = 0
+   for part, (vertices, triangles) in partMeshes(geometry, tolerance).items():
+      triangleCount += len(triangles)
+      for fileFormat in formats:
+         path = os.path.join(folder, f'{stem}_{part}.{fileFormat}')
+         WRITERS[fileFormat](path, vertices, triangles, f'{stem}_{part}')
+         paths.append(path)
+   return paths, triangleCount
+
+
+def main(argv=None):
+   scriptDir = os.path.dirname(os.path.realpath(__file__))
+   parser = argparse.ArgumentParser(description='Write the driven and drive wheels of Geneva gear pairs as STL or 3MF meshes for 3D printing. '
+                                                'Values are in mm. Anything not given comes from geneva_parameters.json.')
+   geneva_catalog.addParameterArguments(parser, scriptDir)
+   parser.add_argument('--format', choices=FORMATS, action='append', help='output format, can be repeated (default: stl)')
+   parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help=f'chord tolerance of the arcs in mm (default: {DEFAULT_TOLERANCE:g})')
+   parser.add_argument('--output', default='.', help='folder the files are written to')
+   args = parser.parse_args(argv)
+
+   genevaParameters, entries = geneva_catalog.argumentEntries(args)
+   formats = tuple(args.format or ('stl',))
+   os.makedirs(args.output, exist_ok=True)
+
+   written = 0
+   triangles = 0
+   failed = 0
+   start = time.perf_counter()
+   for number, values, problems in entries:
+      if problems:
+         label = 'Design' if number is None else f'Row {number}'
+         print(f'{label} skipped: ' + '; '.join(problems), file=sys.stderr)
+         failed += 1
+         continue
+      paths, triangleCount = exportDesign(values, args.output, geneva_export.designStem(values, number), formats, args.tolerance)
+      written += len(paths)
+      triangles += triangleCount
+
+   print(f'Wrote {written} files ({triangles} triangles) for {len(entries) - failed} designs in {time.perf_counter() - start:.3f} s')
+   return 1 if failed else 0
+
+
+if __name__ == '__main__':
+   sys.exit(main())
@@ -0,0 +1,58 @@
+# Geneva Gear Motion Table
+# Description: Motion of a gear pair without contact analysis. The driven angle is computed with
+#              geneva_kinematics once, for evenly spaced drive angles over one turn, and stored on the design
+#              with the tokens of the two joints. Turning the drive then sets both joints from the table, which
+#              is a lookup instead of a contact solve, so the assembly stays fast to drag and edit.
+#              This module does not use the Fusion API, the joints are found and turned by the caller.
+
+import json
+import math
+
+import geneva_kinematics
+
+# "motionMode" in geneva_parameters.json: contact analysis between the wheels, or a kinematic table
+MOTION_MODES = ('contact', 'table')
+
+# Attribute group of the tables, one attribute per gear pair named by its parameter prefix
+ATTRIBUTE_GROUP = 'GenevaMotion'
+
+# Drive angles per turn in a table, a quarter degree apart
+TABLE_STEPS = 1440
+
+
+# Driven angles for the drive angles 2*pi*i/steps, i = 0 ... steps. The last one is a whole turn, which
+# moves the driven wheel one index.
+def motionTable(geometry, steps=TABLE_STEPS):
+   if geneva_kinematics.np is None:
+      return [geneva_kinematics.motion(geometry, 2*math.pi*i/steps)[0] for i in range(steps + 1)]
+   crankAngles = geneva_kinematics.np.linspace(0, 2*math.pi, steps + 1)
+   return geneva_kinematics.motionBatch(geometry, crankAngles)['angle'].tolist()
+
+
+# Driven angle for any drive angle, interpolated between the two nearest entries of the table.
+# Every whole turn of the drive adds the index of the last entry, so the angle keeps counting the indexes.
+def drivenTurn(table, crankAngle):
+   steps = len(table) - 1
+   turns, local = divmod(crankAngle/(2*math.pi)*steps, steps)
+   index = min(int(local), steps - 1)
+   fraction = local - index
+   return turns*table[-1] + table[index] + fraction*(table[index + 1] - table[index])
+
+
+# Driven angle for any drive angle, kept between -pi and pi
+def drivenAngle(table, crankAngle):
+   return math.remainder(drivenTurn(table, crankAngle), 2*math.pi)
+
+
+# Attribute value of a gear pair: the entity tokens of its two joints and the table
+def encodeMotion(driveToken, drivenToken, table):
+   return json.dumps({'drive': driveToken, 'driven': drivenToken, 'table': [round(angle, 9) for angle in table]})
+
+
+# Joint tokens and table of an attribute value, None when it can not be read
+def decodeMotion(value):
+   try:
+      motion = json.loads(value)
+      return motion['drive'], motion['driven'], motion['table']
+   except (ValueError, KeyError, TypeError):
+      return None
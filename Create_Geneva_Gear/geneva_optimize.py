@@ -0,0 +1,242 @@
+# Geneva Gear Optimizer
+# Description: Searches the driven radius, slot radius and number of slots within the minimum and maximum values
+#              of geneva_parameters.json for the best gear pair that meets a set of targets: largest envelope,
+#              thinnest wall between a slot and a locking cut-out, peak angular acceleration of the driven wheel
+#              and clearance between the wheels. Run "python geneva_optimize.py --help".
+#
+#              The cheap targets are checked for every candidate first. The survivors are sorted by the objective
+#              and their clearance (geneva_clearance) is checked in batches spread over a process pool, stopping
+#              as soon as enough of them pass. The best design is written to geneva_optimized.json, which the
+#              dialog can load with its "Load optimized design" button.
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+   import numpy as np
+except ImportError:
+   np = None
+
+import geneva_catalog
+import geneva_clearance
+import geneva_geometry
+import geneva_kinematics
+import geneva_profile
+import geneva_validation
+
+# File the best design is written to, next to geneva_parameters.json
+OPTIMIZED_NAME = 'geneva_optimized.json'
+
+# What can be optimized, and whether smaller is better
+OBJECTIVES = {
+   'envelope': True,
+   'acceleration': True,
+   'wall': False,
+}
+
+
+# Candidate designs on a grid over the ranges in geneva_parameters.json, values in mm.
+# The backlash, thickness and fillet radius are the current values from the file. Designs that
+# geneva_validation rejects are left out.
+def candidateGrid(genevaParameters, samples):
+   def steps(minKey, maxKey):
+      low = genevaParameters[minKey]
+      high = genevaParameters[maxKey]
+      return [low + (high - low)*i/(samples - 1) for i in range(samples)] if samples > 1 else [low]
+
+   toothNumbers = range(genevaParameters['minToothNumber'], genevaParameters['maxToothNumber'] + 1)
+   candidates = []
+   for toothNumber in toothNumbers:
+      for drivenRadius in steps('minDrivenRadius', 'maxDivenRadius'):
+         for slotRadius in steps('minSlotRadius', 'maxSlotRadius'):
+            candidates.append({
+               'driven_radius': drivenRadius,
+               'slot_radius': slotRadius,
+               'number_of_slots': toothNumber,
+               'backlash': genevaParameters['backlash'],
+               'thickness': genevaParameters['thickness'],
+               'filletRadius': genevaParameters['filletRadius'],
+            })
+
+   # Validate the whole grid in one pass
+   if np is not None and candidates:
+      columns = {key: [values[key] for values in candidates] for key in geneva_catalog.PARAMETER_KEYS}
+      valid = geneva_validation.validateBatch(columns, genevaParameters)['valid']
+      return [values for values, ok in zip(candidates, valid) if ok]
+   return [values for values in candidates if not geneva_validation.validate(values, genevaParameters)]
+
+
+# Geometry of a candidate, lengths in mm
+def candidateGeometry(values):
+   return geneva_geometry.computeGeometry(*(values[key] for key in geneva_catalog.PARAMETER_KEYS))
+
+
+# Envelope, wall and acceleration of a candidate, or None when it can not be built.
+# accelerations caches the peak acceleration for each number of slots, it only depends on that.
+def quickMetrics(values, driveSpeed, accelerations):
+   if values['slot_radius'] >= values['driven_radius']:
+      return None
+   try:
+      geometry = candidateGeometry(values)
+      minX, minY, maxX, maxY = geneva_profile.pairBounds(geometry)
+      wall = geneva_profile.wallThickness(geometry)
+   except (ValueError, ZeroDivisionError):
+      return None
+
+   toothNumber = values['number_of_slots']
+   if toothNumber not in accelerations:
+      accelerations[toothNumber] = geneva_kinematics.peakMotion(geometry, driveSpeed, 2001)['acceleration']
+
+   envelope = max(maxX - minX, maxY - minY)
+   if not (math.isfinite(envelope) and math.isfinite(wall)):
+      return None
+   return {'envelope': envelope, 'wall': wall, 'acceleration': accelerations[toothNumber]}
+
+
+# Whether the quick metrics meet the targets, any target can be None
+def meetsTargets(metrics, targets):
+   if targets.get('maxEnvelope') is not None and metrics['envelope'] > targets['maxEnvelope']:
+      return False
+   if targets.get('minWall') is not None and metrics['wall'] < targets['minWall']:
+      return False
+   if targets.get('maxAcceleration') is not None and metrics['acceleration'] > targets['maxAcceleration']:
+      return False
+   return True
+
+
+# Clearance of a chunk of candidates, runs in the worker processes.
+# task is (steps, chordTolerance, [(index, values)]), returns [(index, minimum clearance)]
+def _clearanceTask(task):
+   steps, chordTolerance, chunk = task
+   results = []
+   for index, values in chunk:
+      geometry = candidateGeometry(values)
+      results.append((index, geneva_clearance.checkClearance(geometry, steps, chordTolerance)['minClearance']))
+   return results
+
+
+# Search the candidates. Returns up to top designs as dictionaries of values and metrics, best first,
+# and the number of clearance checks that were run.
+def optimize(candidates, targets, objective='envelope', driveSpeed=2*math.pi, top=1, workers=None, steps=720, chordTolerance=0.01, chunkSize=4):
+   if np is None and targets.get('minClearance') is not None:
+      raise ImportError('NumPy is required for the clearance check of the optimizer')
+
+   accelerations = {}
+   feasible = []
+   for values in candidates:
+      metrics = quickMetrics(values, driveSpeed, accelerations)
+      if metrics is not None and meetsTargets(metrics, targets):
+         feasible.append((values, metrics))
+
+   sign = 1 if OBJECTIVES[objective] else -1
+   feasible.sort(key=lambda item: sign*item[1][objective])
+
+   # Check the clearance in order of the objective, one batch of chunks per round so every worker has work,
+   # until enough designs pass
+   minClearance = targets.get('minClearance')
+   workers = workers or os.cpu_count() or 1
+   batchSize = workers*chunkSize
+   best = []
+   checked = 0
+   executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and minClearance is not None else None
+   try:
+      for first in range(0, len(feasible), batchSize):
+         batch = list(enumerate(feasible[first:first + batchSize], start=first))
+         if minClearance is None:
+            clearances = {index: None for index, item in batch}
+         else:
+            chunks = [(steps, chordTolerance, [(index, item[0]) for index, item in batch[i:i + chunkSize]]) for i in range(0, len(batch), chunkSize)]
+            results = executor.map(_clearanceTask, chunks) if executor else map(_clearanceTask, chunks)
+            clearances = dict(result for chunk in results for result in chunk)
+            checked += len(batch)
+
+         for index, (values, metrics) in batch:
+            if clearances[index] is None or clearances[index] >= minClearance:
+               best.append({'values': values, 'metrics': dict(metrics, clearance=clearances[index])})
+         if len(best) >= top:
+            break
+   finally:
+      if executor:
+         executor.shutdown()
+
+   return best[:top], checked
+
+
+# Write the best design in the form the dialog and geneva_catalog.rowValues read
+def writeOptimized(path, design, targets, objective):
+   output = {
+      'geneva_mechanism': {key: design['values'][key] for key in geneva_catalog.PARAMETER_KEYS},
+      'metrics': design['metrics'],
+      'objective': objective,
+      'targets': targets,
+   }
+   with open(path, 'w') as f:
+      json.dump(output, f, indent=1)
+
+
+# Values of the optimized design in the folder as a catalog row, or None when there is none
+def readOptimized(folder):
+   path = os.path.join(folder, OPTIMIZED_NAME)
+   if not os.path.exists(path):
+      return None
+   with open(path, 'r') as f:
+      return json.load(f)['geneva_mechanism']
+
+
+def main(argv=None):
+   scriptDir = os.path.dirname(os.path.realpath(__file__))
+   parser = argparse.ArgumentParser(description='Search the ranges in geneva_parameters.json for the best Geneva gear pair that meets the targets. '
+                                                'Lengths are in mm.')
+   parser.add_argument('--parameters', default=os.path.join(scriptDir, 'geneva_parameters.json'), help='ranges and the backlash, thickness and fillet radius to use')
+   parser.add_argument('--objective', choices=sorted(OBJECTIVES), default='envelope', help='smallest envelope, lowest peak acceleration or thickest wall (default: envelope)')
+   parser.add_argument('--max-envelope', type=float, help='longest side of the bounding box of the pair')
+   parser.add_argument('--min-wall', type=float, default=0.0, help='thinnest wall between a slot and a locking cut-out (default: 0)')
+   parser.add_argument('--max-acceleration', type=float, help='peak angular acceleration of the driven wheel in rad/s^2')
+   parser.add_argument('--min-clearance', type=float, default=0.0, help='smallest gap between the wheels, leave out with --no-clearance (default: 0)')
+   parser.add_argument('--no-clearance', action='store_true', help='skip the clearance check')
+   parser.add_argument('--drive-rpm', type=float, default=60.0, help='drive speed for the acceleration (default: 60)')
+   parser.add_argument('--samples', type=int, default=25, help='grid points over each radius range (default: 25)')
+   parser.add_argument('--steps', type=int, default=720, help='crank angles of each clearance check (default: 720)')
+   parser.add_argument('--tolerance', type=float, default=0.01, help='chord tolerance of the outlines in the clearance check (default: 0.01)')
+   parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+   parser.add_argument('--top', type=int, default=5, help='number of designs to list (default: 5)')
+   parser.add_argument('--output', default=os.path.join(scriptDir, OPTIMIZED_NAME), help='where the best design is written')
+   args = parser.parse_args(argv)
+
+   with open(args.parameters, 'r') as f:
+      genevaParameters = json.load(f)['geneva_mechanism']
+   targets = {
+      'maxEnvelope': args.max_envelope,
+      'minWall': args.min_wall,
+      'maxAcceleration': args.max_acceleration,
+      'minClearance': None if args.no_clearance else args.min_clearance,
+   }
+
+   start = time.perf_counter()
+   candidates = candidateGrid(genevaParameters, args.samples)
+   best, checked = optimize(candidates, targets, args.objective, args.drive_rpm*2*math.pi/60, args.top, args.workers, args.steps, args.tolerance)
+   print(f'Searched {len(candidates)} valid designs, checked the clearance of {checked}, in {time.perf_counter() - start:.3f} s')
+   if not best:
+      print('No design meets the targets', file=sys.stderr)
+      return 1
+
+   for design in best:
+      values = design['values']
+      metrics = design['metrics']
+      clearance = 'not checked' if metrics['clearance'] is None else f'{metrics["clearance"]:.3f} mm'
+      print(f'{values["number_of_slots"]} slots, driven radius {values["driven_radius"]:.2f} mm, slot radius {values["slot_radius"]:.2f} mm: '
+            f'envelope {metrics["envelope"]:.2f} mm, wall {metrics["wall"]:.2f} mm, '
+            f'peak acceleration {metrics["acceleration"]:.2f} rad/s^2, clearance {clearance}')
+
+   writeOptimized(args.output, best[0], targets, args.objective)
+   print(f'Best design written to {args.output}')
+   return 0
+
+
+if __name__ == '__main__':
+   sys.exit(main())
@@ -0,0 +1,147 @@
+# Geneva Gear Part Cache
+# Description: Cache on disk of finished gear bodies, so a gear pair that was built before is inserted from
+#              SMT files instead of going through the sketches, extrudes, fillet and pattern again. Entries
+#              are keyed on a hash of the six parameters and GENERATOR_VERSION. Every entry stores a hash of
+#              each file, an entry whose files do not match is removed instead of used. The least recently
+#              used entries are removed when the cache is larger than its size limit.
+#              The files are written and read through callbacks, this module does not use the Fusion API.
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+# Change this whenever GenevaCreator builds different bodies for the same parameters, old entries are then ignored
+GENERATOR_VERSION = 1
+
+CACHE_FOLDER = 'geneva_part_cache'
+ENTRY_NAME = 'entry.json'
+
+# Bodies stored for a gear pair, one file each
+PARTS = ('drive', 'driven')
+PART_EXTENSION = '.smt'
+
+# Digits the parameters are rounded to in mm, so values that went through cm and back hash the same
+KEY_DIGITS = 6
+
+
+# Key of a parameter set, values uses the keys of geneva_parameters.json in mm
+def cacheKey(values, version=GENERATOR_VERSION):
+   rounded = {key: round(float(value), KEY_DIGITS) + 0.0 for key, value in values.items()}
+   text = json.dumps({'version': version, 'parameters': rounded}, sort_keys=True)
+   return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _fileHash(path):
+   digest = hashlib.sha256()
+   with open(path, 'rb') as f:
+      for block in iter(lambda: f.read(1 << 20), b''):
+         digest.update(block)
+   return digest.hexdigest()
+
+
+class PartCache:
+   def __init__(self, folder, maxBytes):
+      self.folder = folder
+      self.maxBytes = maxBytes
+      self.hits = 0
+      self.misses = 0
+      self.rejected = 0
+
+   def _entryFolder(self, key):
+      return os.path.join(self.folder, key)
+
+   # Paths of the stored part files of a parameter set, {part: path}, or None when there is no usable entry
+   def find(self, values):
+      key = cacheKey(values)
+      entryFolder = self._entryFolder(key)
+      entryPath = os.path.join(entryFolder, ENTRY_NAME)
+      if not os.path.exists(entryPath):
+         self.misses += 1
+         return None
+
+      paths = self._check(key, entryPath)
+      if paths is None:
+         self.rejected += 1
+         self.misses += 1
+         shutil.rmtree(entryFolder, ignore_errors=True)
+         return None
+
+      # The time of the entry file is when it was last used, eviction removes the oldest first
+      os.utime(entryPath)
+      self.hits += 1
+      return paths
+
+   # Paths of an entry whose files are all there and unchanged, None otherwise
+   def _check(self, key, entryPath):
+      try:
+         with open(entryPath) as f:
+            entry = json.load(f)
+         if entry['key'] != key or entry['version'] != GENERATOR_VERSION:
+            return None
+         paths = {}
+         for part in PARTS:
+            path = os.path.join(os.path.dirname(entryPath), part + PART_EXTENSION)
+            if os.path.getsize(path) != entry['files'][part]['bytes'] or _fileHash(path) != entry['files'][part]['sha256']:
+               return None
+            paths[part] = path
+         return paths
+      except (OSError, ValueError, KeyError, TypeError):
+         return None
+
+   # Store the parts of a parameter set. export(part, path) writes the body of one part and returns True
+   # when it did. The entry only appears once every file is written, returns whether it was stored.
+   def store(self, values, export):
+      key = cacheKey(values)
+      entryFolder = self._entryFolder(key)
+      workFolder = entryFolder + '.tmp'
+      shutil.rmtree(workFolder, ignore_errors=True)
+      os.makedirs(workFolder)
+      try:
+         files = {}
+         for part in PARTS:
+            path = os.path.join(workFolder, part + PART_EXTENSION)
+            if not export(part, path) or not os.path.exists(path):
+               return False
+            files[part] = {'bytes': os.path.getsize(path), 'sha256': _fileHash(path)}
+
+         entry = {'key': key, 'version': GENERATOR_VERSION, 'parameters': values, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'files': files}
+         with open(os.path.join(workFolder, ENTRY_NAME), 'w') as f:
+            json.dump(entry, f, indent=1)
+
+         shutil.rmtree(entryFolder, ignore_errors=True)
+         os.replace(workFolder, entryFolder)
+      finally:
+         shutil.rmtree(workFolder, ignore_errors=True)
+
+      self.evict()
+      return True
+
+   # Entries in the cache as (last used, bytes, key), oldest first
+   def entries(self):
+      if not os.path.isdir(self.folder):
+         return []
+      entries = []
+      for key in os.listdir(self.folder):
+         entryPath = os.path.join(self._entryFolder(key), ENTRY_NAME)
+         if not os.path.exists(entryPath):
+            continue
+         size = sum(entry.stat().st_size for entry in os.scandir(self._entryFolder(key)) if entry.is_file())
+         entries.append((os.path.getmtime(entryPath), size, key))
+      return sorted(entries)
+
+   # Remove the least recently used entries until the cache fits in maxBytes
+   def evict(self):
+      entries = self.entries()
+      total = sum(size for used, size, key in entries)
+      for used, size, key in entries:
+         if total <= self.maxBytes:
+            break
+         shutil.rmtree(self._entryFolder(key), ignore_errors=True)
+         total -= size
+
+   def summary(self):
+      entries = self.entries()
+      megabytes = sum(size for used, size, key in entries)/1e6
+      return f'{len(entries)} pairs, {megabytes:.1f} of {self.maxBytes/1e6:g} MB'
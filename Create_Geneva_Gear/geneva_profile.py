@@ -0,0 +1,438 @@
+# Geneva Gear Profiles
+# Description: Builds the 2D outlines of the driven and drive wheels from the geometry in geneva_geometry.
+#              Outlines are closed loops of exact lines and arcs in the assembled position (after the driven
+#              wheel is rotated so the pin sits in a slot). They can be turned into polylines for drawing.
+#
+#              A segment is either ('line', (x0, y0), (x1, y1))
+#              or ('arc', (cx, cy), radius, startAngle, sweep) with angles in radians and a positive sweep
+#              going counter clockwise. Every loop runs counter clockwise around the material.
+
+import math
+
+
+# Point on a circle
+def _polar(center, radius, angle):
+   return (center[0] + radius*math.cos(angle), center[1] + radius*math.sin(angle))
+
+
+# Rotate a point about the origin
+def _rotate(point, angle):
+   c = math.cos(angle)
+   s = math.sin(angle)
+   return (point[0]*c - point[1]*s, point[0]*s + point[1]*c)
+
+
+# Rotate a segment about the origin
+def rotateSegment(segment, angle):
+   if segment[0] == 'line':
+      return ('line', _rotate(segment[1], angle), _rotate(segment[2], angle))
+   return ('arc', _rotate(segment[1], angle), segment[2], segment[3] + angle, segment[4])
+
+
+# Move a segment
+def translateSegment(segment, dx, dy):
+   if segment[0] == 'line':
+      return ('line', (segment[1][0] + dx, segment[1][1] + dy), (segment[2][0] + dx, segment[2][1] + dy))
+   return ('arc', (segment[1][0] + dx, segment[1][1] + dy), segment[2], segment[3], segment[4])
+
+
+# First and last point of a segment
+def segmentEnds(segment):
+   if segment[0] == 'line':
+      return segment[1], segment[2]
+   kind, center, radius, startAngle, sweep = segment
+   return _polar(center, radius, startAngle), _polar(center, radius, startAngle + sweep)
+
+
+# Angle wrapped to -pi..pi
+def _wrapAngle(angle):
+   return (angle + math.pi) % (2*math.pi) - math.pi
+
+
+# Direction of travel at the start and at the end of a segment, as unit vectors
+def segmentDirections(segment):
+   if segment[0] == 'line':
+      (x0, y0), (x1, y1) = segment[1], segment[2]
+      length = math.hypot(x1 - x0, y1 - y0)
+      direction = ((x1 - x0)/length, (y1 - y0)/length)
+      return direction, direction
+   kind, center, radius, startAngle, sweep = segment
+   turn = 1.0 if sweep > 0 else -1.0
+   endAngle = startAngle + sweep
+   return ((-turn*math.sin(startAngle), turn*math.cos(startAngle)),
+           (-turn*math.sin(endAngle), turn*math.cos(endAngle)))
+
+
+# A segment moved sideways towards the material (its left side) by distance:
+# ('line', point, direction) or ('circle', center, radius)
+def _offsetCurve(segment, distance):
+   if segment[0] == 'line':
+      direction = segmentDirections(segment)[0]
+      point = (segment[1][0] - direction[1]*distance, segment[1][1] + direction[0]*distance)
+      return ('line', point, direction)
+   kind, center, radius, startAngle, sweep = segment
+   return ('circle', center, radius - distance if sweep > 0 else radius + distance)
+
+
+# Points where a line and a circle, or two circles, cross
+def _curveIntersections(first, second):
+   if first[0] == 'circle' and second[0] == 'line':
+      first, second = second, first
+   if first[0] == 'line':
+      (px, py), (dx, dy) = first[1], first[2]
+      (cx, cy), radius = second[1], second[2]
+      along = (cx - px)*dx + (cy - py)*dy
+      footX, footY = px + along*dx, py + along*dy
+      hSquared = radius**2 - (footX - cx)**2 - (footY - cy)**2
+      if hSquared < 0:
+         return []
+      h = math.sqrt(hSquared)
+      return [(footX - h*dx, footY - h*dy), (footX + h*dx, footY + h*dy)]
+
+   (x0, y0), r0 = first[1], first[2]
+   (x1, y1), r1 = second[1], second[2]
+   distance = math.hypot(x1 - x0, y1 - y0)
+   a = (r0**2 - r1**2 + distance**2)/(2*distance)
+   hSquared = r0**2 - a**2
+   if hSquared < 0:
+      return []
+   h = math.sqrt(hSquared)
+   ux, uy = (x1 - x0)/distance, (y1 - y0)/distance
+   midX, midY = x0 + a*ux, y0 + a*uy
+   return [(midX - h*uy, midY + h*ux), (midX + h*uy, midY - h*ux)]
+
+
+# Closest point on the line or circle a segment lies on
+def _projectOnSegment(segment, point):
+   if segment[0] == 'line':
+      (px, py) = segment[1]
+      (dx, dy) = segmentDirections(segment)[0]
+      along = (point[0] - px)*dx + (point[1] - py)*dy
+      return (px + along*dx, py + along*dy)
+   kind, center, radius, startAngle, sweep = segment
+   angle = math.atan2(point[1] - center[1], point[0] - center[0])
+   return _polar(center, radius, angle)
+
+
+# Segment with its start or its end moved to a point on it
+def _trimSegment(segment, point, atEnd):
+   if segment[0] == 'line':
+      return ('line', segment[1], point) if atEnd else ('line', point, segment[2])
+   kind, center, radius, startAngle, sweep = segment
+   angle = math.atan2(point[1] - center[1], point[0] - center[0])
+   if atEnd:
+      return ('arc', center, radius, startAngle, sweep + _wrapAngle(angle - (startAngle + sweep)))
+   change = _wrapAngle(angle - startAngle)
+   return ('arc', center, radius, startAngle + change, sweep - change)
+
+
+# Round every sharp corner of a closed loop with an arc of the given radius, like a fillet on the vertical
+# edges of the extruded outline. Corners where the segments already meet tangentially are left alone.
+# The arc of the corner after a segment follows it, so the corner between the last and the first segment
+# ends the loop.
+def filletLoop(loop, radius, tolerance=1e-9):
+   segments = list(loop)
+   count = len(segments)
+   arcs = [None]*count
+   for i in range(count):
+      current = segments[i]
+      following = segments[(i + 1) % count]
+      endDirection = segmentDirections(current)[1]
+      startDirection = segmentDirections(following)[0]
+      turn = endDirection[0]*startDirection[1] - endDirection[1]*startDirection[0]
+      if abs(turn) < tolerance and endDirection[0]*startDirection[0] + endDirection[1]*startDirection[1] > 0:
+         continue
+
+      # The center of the arc is the radius away from both segments, on the side of the material for a convex
+      # corner and on the other side for a concave one. Take the crossing nearest to the corner.
+      side = radius if turn > 0 else -radius
+      corner = segmentEnds(current)[1]
+      crossings = _curveIntersections(_offsetCurve(current, side), _offsetCurve(following, side))
+      if not crossings:
+         raise ValueError(f'Fillet radius {radius:g} does not fit the corner at ({corner[0]:g}, {corner[1]:g})')
+      center = min(crossings, key=lambda point: math.hypot(point[0] - corner[0], point[1] - corner[1]))
+
+      start = _projectOnSegment(current, center)
+      end = _projectOnSegment(following, center)
+      startAngle = math.atan2(start[1] - center[1], start[0] - center[0])
+      endAngle = math.atan2(end[1] - center[1], end[0] - center[0])
+      sweep = (endAngle - startAngle) % (2*math.pi)
+      if turn < 0:
+         sweep -= 2*math.pi
+      segments[i] = _trimSegment(segments[i], start, True)
+      segments[(i + 1) % count] = _trimSegment(segments[(i + 1) % count], end, False)
+      arcs[i] = ('arc', center, radius, startAngle, sweep)
+
+   filleted = []
+   for segment, arc in zip(segments, arcs):
+      filleted.append(segment)
+      if arc is not None:
+         filleted.append(arc)
+   return filleted
+
+
+# Where the outer circle of the driven wheel meets the slots and the locking cut-outs.
+# Returns the distance of the slot mouth along the slot, the angle of the mouth from the slot axis,
+# the angle of the locking tips from the locking axis seen from the wheel center and
+# the same tips seen from the center of the locking cut-out.
+def drivenWheelCorners(geometry):
+   drivenRadius = geometry['drivenRadius']
+   slotRadius = geometry['slotRadius']
+   thirdDist = geometry['thirdDist']
+   lockingRadius = geometry['driveProfileRadius']
+
+   mouthDist = math.sqrt(drivenRadius**2 - slotRadius**2)
+   mouthAngle = math.atan2(slotRadius, mouthDist)
+
+   # Intersection of the outer circle and the locking circle
+   a = (drivenRadius**2 - lockingRadius**2 + thirdDist**2)/(2*thirdDist)
+   h = math.sqrt(max(drivenRadius**2 - a**2, 0.0))
+   tipAngle = math.atan2(h, a)
+   lockingTipAngle = math.atan2(h, thirdDist - a)
+
+   return mouthDist, mouthAngle, tipAngle, lockingTipAngle
+
+
+# Sharp vertical corners of the first slot and locking cut-out, before the pattern and before the driven
+# wheel is rotated into place: the two slot mouths around the slot at the first angle and the two locking
+# tips around the X axis. These are the edges the fillets go on.
+def filletCornerPoints(geometry):
+   angle = geometry['angle']
+   slotRadius = geometry['slotRadius']
+   drivenRadius = geometry['drivenRadius']
+   mouthDist, mouthAngle, tipAngle, lockingTipAngle = drivenWheelCorners(geometry)
+   return [
+      _rotate((mouthDist, -slotRadius), angle),
+      _rotate((mouthDist, slotRadius), angle),
+      _polar((0.0, 0.0), drivenRadius, -tipAngle),
+      _polar((0.0, 0.0), drivenRadius, tipAngle),
+   ]
+
+
+# One sector of the driven wheel, from the lower wall of the slot on the X axis
+# to the lower wall of the next slot
+def drivenWheelSector(geometry):
+   drivenRadius = geometry['drivenRadius']
+   slotRadius = geometry['slotRadius']
+   toothNumber = geometry['toothNumber']
+   angle = geometry['angle']
+   thirdDist = geometry['thirdDist']
+   constructionRadius = geometry['constructionRadius']
+   lockingRadius = geometry['driveProfileRadius']
+
+   mouthDist, mouthAngle, tipAngle, lockingTipAngle = drivenWheelCorners(geometry)
+   lockingAngle = angle
+   nextSlotAngle = 2*math.pi/toothNumber
+   lockingCenter = _polar((0.0, 0.0), thirdDist, lockingAngle)
+
+   return [
+      # Lower wall of the slot, inner end and upper wall
+      ('line', (mouthDist, -slotRadius), (constructionRadius, -slotRadius)),
+      ('arc', (constructionRadius, 0.0), slotRadius, -math.pi/2, -math.pi),
+      ('line', (constructionRadius, slotRadius), (mouthDist, slotRadius)),
+
+      # Outer edge up to the locking cut-out
+      ('arc', (0.0, 0.0), drivenRadius, mouthAngle, lockingAngle - tipAngle - mouthAngle),
+
+      # Locking cut-out, curving in towards the wheel center
+      ('arc', lockingCenter, lockingRadius, lockingAngle + math.pi + lockingTipAngle, -2*lockingTipAngle),
+
+      # Outer edge up to the next slot
+      ('arc', (0.0, 0.0), drivenRadius, lockingAngle + tipAngle, nextSlotAngle - mouthAngle - lockingAngle - tipAngle),
+   ]
+
+
+# Thinnest wall of the driven wheel, between the upper wall of the slot on the X axis and the locking
+# cut-out next to it. Negative when the cut-out breaks into the slot.
+def wallThickness(geometry):
+   slotRadius = geometry['slotRadius']
+   angle = geometry['angle']
+   constructionRadius = geometry['constructionRadius']
+   lockingRadius = geometry['driveProfileRadius']
+   mouthDist, mouthAngle, tipAngle, lockingTipAngle = drivenWheelCorners(geometry)
+   lockingCenter = _polar((0.0, 0.0), geometry['thirdDist'], angle)
+   tip = _polar((0.0, 0.0), geometry['drivenRadius'], angle - tipAngle)
+
+   # The cut-out bulges towards the slot, so the wall is thinnest at one of the ends: the slot mouth
+   # against the cut-out (or its tip when the mouth is past the end of the arc)...
+   mouthX = mouthDist - lockingCenter[0]
+   mouthY = slotRadius - lockingCenter[1]
+   fromAxis = math.atan2(mouthY, mouthX) - (angle + math.pi)
+   fromAxis = (fromAxis + math.pi) % (2*math.pi) - math.pi
+   if abs(fromAxis) <= lockingTipAngle:
+      toCutOut = math.hypot(mouthX, mouthY) - lockingRadius
+   else:
+      toCutOut = math.hypot(mouthDist - tip[0], slotRadius - tip[1])
+
+   # ...or the tip of the cut-out against the slot wall
+   wallX = min(max(tip[0], constructionRadius), mouthDist)
+   toWall = math.hypot(tip[0] - wallX, tip[1] - slotRadius)
+   return min(toCutOut, toWall)
+
+
+# Outline of the driven wheel, one loop
+def drivenWheelLoops(geometry):
+   sector = drivenWheelSector(geometry)
+   toothNumber = int(geometry['toothNumber'])
+   loop = []
+   for k in range(toothNumber):
+      sectorAngle = 2*math.pi*k/toothNumber
+      loop.extend(rotateSegment(segment, sectorAngle) for segment in sector)
+   return [loop]
+
+
+# Outline of the driven wheel with its outer corners rounded by the fillet radius, like the built wheel
+def filletedDrivenWheelLoops(geometry):
+   loops = drivenWheelLoops(geometry)
+   if geometry['filletRadius'] > 0:
+      loops = [filletLoop(loop, geometry['filletRadius']) for loop in loops]
+   return loops
+
+
+# Where the two tangent lines of the drive base touch the locking disc and the pin base.
+# The apex is where the lines meet past the pin base, or None when the pin base is the larger circle.
+def driveBaseCorners(geometry):
+   thirdDist = geometry['thirdDist']
+   constructionRadius = geometry['constructionRadius']
+   driveRadius = thirdDist - constructionRadius
+   discRadius = geometry['driveProfileRadius']
+   pinBaseRadius = geometry['pinBaseRadius']
+   drivePoint = (thirdDist, 0.0)
+   pinPoint = (constructionRadius, 0.0)
+
+   # Half angle between the two tangent lines
+   alpha = math.asin((discRadius - pinBaseRadius)/driveRadius)
+   upperNormal = math.pi/2 + alpha
+
+   if discRadius > pinBaseRadius:
+      apex = (constructionRadius - driveRadius*pinBaseRadius/(discRadius - pinBaseRadius), 0.0)
+   else:
+      apex = None
+
+   return {
+      'apex': apex,
+      'upperNormal': upperNormal,
+      'discUpper': _polar(drivePoint, discRadius, upperNormal),
+      'discLower': _polar(drivePoint, discRadius, -upperNormal),
+      'pinUpper': _polar(pinPoint, pinBaseRadius, upperNormal),
+      'pinLower': _polar(pinPoint, pinBaseRadius, -upperNormal),
+   }
+
+
+# Outline of the base of the drive wheel: the locking disc joined to the pin base by two tangent lines
+def driveBaseLoops(geometry):
+   drivePoint = (geometry['thirdDist'], 0.0)
+   pinPoint = (geometry['constructionRadius'], 0.0)
+   discRadius = geometry['driveProfileRadius']
+   pinBaseRadius = geometry['pinBaseRadius']
+   corners = driveBaseCorners(geometry)
+   upperNormal = corners['upperNormal']
+   apex = corners['apex']
+
+   if apex is not None:
+      # The tangent lines meet in a point past the pin base
+      loop = [
+         ('line', apex, corners['discLower']),
+         ('arc', drivePoint, discRadius, -upperNormal, 2*upperNormal),
+         ('line', corners['discUpper'], apex),
+      ]
+   else:
+      # The tangent lines never meet, wrap around the pin base instead
+      loop = [
+         ('line', corners['pinLower'], corners['discLower']),
+         ('arc', drivePoint, discRadius, -upperNormal, 2*upperNormal),
+         ('line', corners['discUpper'], corners['pinUpper']),
+         ('arc', pinPoint, pinBaseRadius, upperNormal, 2*math.pi - 2*upperNormal),
+      ]
+   return [loop]
+
+
+# Outline of the top of the drive wheel: the crescent shaped locking disc and the pin
+def driveTopLoops(geometry):
+   drivenRadius = geometry['drivenRadius']
+   backlash = geometry['backlash']
+   thirdDist = geometry['thirdDist']
+   constructionRadius = geometry['constructionRadius']
+   slotRadius = geometry['slotRadius']
+   drivePoint = (thirdDist, 0.0)
+   discRadius = geometry['driveProfileRadius'] - backlash
+   clearRadius = drivenRadius + backlash
+
+   # Where the locking disc meets the clearance circle around the driven wheel
+   a = (clearRadius**2 - discRadius**2 + thirdDist**2)/(2*thirdDist)
+   hSquared = clearRadius**2 - a**2
+   if hSquared <= 0:
+      crescent = [('arc', drivePoint, discRadius, math.pi, 2*math.pi)]
+   else:
+      h = math.sqrt(hSquared)
+      discStart = math.atan2(-h, a - thirdDist)
+      discEnd = math.atan2(h, a - thirdDist)
+      clearAngle = math.atan2(h, a)
+      crescent = [
+         ('arc', drivePoint, discRadius, discStart, discEnd - discStart),
+         ('arc', (0.0, 0.0), clearRadius, clearAngle, -2*clearAngle),
+      ]
+
+   pin = [('arc', (constructionRadius, 0.0), slotRadius - backlash/2, math.pi, 2*math.pi)]
+   return [crescent, pin]
+
+
+# Bounding box (minX, minY, maxX, maxY) of the assembled gear pair
+def pairBounds(geometry):
+   drivenRadius = geometry['drivenRadius']
+   discRadius = geometry['driveProfileRadius']
+   apex = driveBaseCorners(geometry)['apex']
+   minX = -drivenRadius if apex is None else min(-drivenRadius, apex[0])
+   maxX = geometry['thirdDist'] + discRadius
+   maxY = max(drivenRadius, discRadius)
+   return (minX, -maxY, maxX, maxY)
+
+
+# All outlines of the gear pair, keyed by the part of the pair they belong to
+def outlineLoops(geometry):
+   return {
+      'driven': drivenWheelLoops(geometry),
+      'driveBase': driveBaseLoops(geometry),
+      'driveTop': driveTopLoops(geometry),
+   }
+
+
+# Number of straight pieces needed to keep an arc within the chord tolerance
+def arcPieces(radius, sweep, tolerance):
+   if tolerance >= radius:
+      step = math.pi/2
+   else:
+      step = 2*math.acos(1 - tolerance/radius)
+   return max(1, int(math.ceil(abs(sweep)/step)))
+
+
+# Turn a list of segments into points. The last point of each segment is left out
+# because it is the first point of the next one.
+def tessellateSegments(segments, tolerance):
+   points = []
+   for segment in segments:
+      if segment[0] == 'line':
+         points.append(segment[1])
+         continue
+      kind, center, radius, startAngle, sweep = segment
+      pieces = arcPieces(radius, sweep, tolerance)
+      for i in range(pieces):
+         points.append(_polar(center, radius, startAngle + sweep*i/pieces))
+   return points
+
+
+# Polylines for every outline. The driven wheel is tessellated one sector at a time and rotated,
+# so the cost stays about the same as the slot count grows.
+def tessellateOutlines(geometry, tolerance):
+   sectorPoints = tessellateSegments(drivenWheelSector(geometry), tolerance)
+   toothNumber = int(geometry['toothNumber'])
+   drivenPoints = []
+   for k in range(toothNumber):
+      sectorAngle = 2*math.pi*k/toothNumber
+      drivenPoints.extend(_rotate(point, sectorAngle) for point in sectorPoints)
+
+   return {
+      'driven': [drivenPoints],
+      'driveBase': [tessellateSegments(loop, tolerance) for loop in driveBaseLoops(geometry)],
+      'driveTop': [tessellateSegments(loop, tolerance) for loop in driveTopLoops(geometry)],
+   }
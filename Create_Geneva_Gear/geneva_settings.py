@@ -0,0 +1,116 @@
+# Geneva Gear Settings
+# Description: Reads and checks geneva_parameters.json for the dialog. The checked file is kept in memory
+#              with its modification time and size, so opening the dialog again only looks at the file's time.
+#              A file that changed is read and checked again. A file with problems is not kept, the message of
+#              the SettingsError says what is wrong. save writes the file atomically: a crash while writing
+#              leaves the old file in place.
+
+import json
+import math
+import os
+import tempfile
+
+import geneva_catalog
+import geneva_motion
+import geneva_train
+import geneva_validation
+
+JSON_NAME = 'geneva_parameters.json'
+
+# Most stages in a train when the JSON file has no maxTrainStages
+MAX_TRAIN_STAGES = 12
+
+# Keys that must be in the file: the six values and the range of each
+REQUIRED_KEYS = tuple(key for keys in geneva_validation.RANGES for key in keys[:3])
+
+
+# Problem with the JSON file, the message is meant for the user
+class SettingsError(Exception):
+   pass
+
+
+# Checked files by path: (modification time, size, parsed file)
+_loaded = {}
+
+
+# The parsed file, {"geneva_mechanism": {...}}. The same object is returned until the file changes.
+def load(jsonPath):
+   try:
+      stat = os.stat(jsonPath)
+   except FileNotFoundError:
+      raise SettingsError(f'JSON file not found!\n\nExpected location:\n{jsonPath}')
+
+   loaded = _loaded.get(jsonPath)
+   if loaded is not None and loaded[:2] == (stat.st_mtime_ns, stat.st_size):
+      return loaded[2]
+
+   _loaded.pop(jsonPath, None)
+   parameters = _read(jsonPath)
+   _loaded[jsonPath] = (stat.st_mtime_ns, stat.st_size, parameters)
+   return parameters
+
+
+def _isNumber(value):
+   return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _read(jsonPath):
+   try:
+      with open(jsonPath, 'r') as f:
+         parameters = json.load(f)
+      genevaParameters = parameters['geneva_mechanism']
+   except (json.JSONDecodeError, KeyError, TypeError):
+      raise SettingsError('Bad formatting, check the JSON guide format.')
+
+   missing = [key for key in REQUIRED_KEYS if key not in genevaParameters]
+   if missing:
+      raise SettingsError(f'JSON Key deleted, check formatting for JSON file.\nMissing parameter: {", ".join(missing)}')
+
+   # Check every value and the combinations of values, and report all problems at once.
+   # A value that is not a number can not be compared, the keys that hold one are named instead.
+   try:
+      problems = geneva_validation.validate({key: genevaParameters[key] for key in geneva_catalog.PARAMETER_KEYS}, genevaParameters)
+   except (TypeError, ValueError, OverflowError):
+      notNumbers = [key for key in REQUIRED_KEYS if not _isNumber(genevaParameters[key])]
+      raise SettingsError('Every value and range in the JSON file must be a number.\nNot a number: ' + ', '.join(notNumbers or REQUIRED_KEYS))
+   if problems:
+      raise SettingsError('The values in the JSON file can not be used:\n\n' + '\n'.join(problems))
+
+   motionMode = genevaParameters.get('motionMode', 'contact')
+   if motionMode not in geneva_motion.MOTION_MODES:
+      raise SettingsError(f'Unknown motionMode "{motionMode}" in the JSON file, use one of: ' + ', '.join(geneva_motion.MOTION_MODES))
+
+   trainLayout = genevaParameters.get('trainLayout', geneva_train.TRAIN_LAYOUTS[0])
+   if trainLayout not in geneva_train.TRAIN_LAYOUTS:
+      raise SettingsError(f'Unknown trainLayout "{trainLayout}" in the JSON file, use one of: ' + ', '.join(geneva_train.TRAIN_LAYOUTS))
+
+   maxTrainStages = genevaParameters.get('maxTrainStages', MAX_TRAIN_STAGES)
+   trainStages = genevaParameters.get('trainStages', 1)
+   if not isinstance(maxTrainStages, int) or maxTrainStages < 1:
+      raise SettingsError('maxTrainStages in the JSON file must be a whole number of at least 1')
+   if not isinstance(trainStages, int) or not 1 <= trainStages <= maxTrainStages:
+      raise SettingsError(f'trainStages in the JSON file must be a whole number from 1 to {maxTrainStages}')
+
+   return parameters
+
+
+# Write the file through a temporary file in the same folder that replaces it in one step. The written
+# object is kept as the checked file, opening the dialog next does not read it back.
+def save(jsonPath, parameters):
+   folder = os.path.dirname(os.path.abspath(jsonPath))
+   handle, workPath = tempfile.mkstemp(dir=folder, prefix='.geneva_parameters_', suffix='.tmp')
+   try:
+      with os.fdopen(handle, 'w') as f:
+         json.dump(parameters, f)
+         f.flush()
+         os.fsync(f.fileno())
+      if os.path.exists(jsonPath):
+         os.chmod(workPath, os.stat(jsonPath).st_mode & 0o777)
+      os.replace(workPath, jsonPath)
+   except BaseException:
+      if os.path.exists(workPath):
+         os.remove(workPath)
+      raise
+
+   stat = os.stat(jsonPath)
+   _loaded[jsonPath] = (stat.st_mtime_ns, stat.st_size, parameters)
@@ -0,0 +1,92 @@
+# Geneva Gear Build Timing
+# Description: Optional timing of the phases of GenevaCreator (sketches, extrudes, fillet, circular pattern,
+#              move, joints, contact set, ...). Each build adds one JSON line to geneva_timing.jsonl next to
+#              geneva_parameters.json, with the parameters, the number of timeline items it added and the time
+#              of each phase. The log is rotated when it gets large. Turned on with "timingLog": true in
+#              geneva_parameters.json, when it is off a lap only checks one flag.
+
+import json
+import os
+import time
+
+LOG_NAME = 'geneva_timing.jsonl'
+
+# The log is rotated to geneva_timing.jsonl.1, .2, ... when it is larger than this, the oldest is deleted
+MAX_LOG_BYTES = 1000000
+LOG_BACKUPS = 3
+
+
+class PhaseTimer:
+   def __init__(self, enabled=False):
+      self.enabled = enabled
+      self.phases = []
+      self._start = self._last = time.perf_counter() if enabled else 0.0
+
+   # End the current phase and start the next one
+   def lap(self, phase):
+      if not self.enabled:
+         return
+      now = time.perf_counter()
+      self.phases.append((phase, now - self._last))
+      self._last = now
+
+   # Time since the timer was made
+   def total(self):
+      return time.perf_counter() - self._start
+
+   # The record written to the log. values uses the keys of geneva_parameters.json, in mm.
+   def record(self, name, values, timelineCount):
+      return {
+         'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+         'name': name,
+         'parameters': values,
+         'timelineCount': timelineCount,
+         'seconds': round(self.total(), 6),
+         'phases': [{'phase': phase, 'seconds': round(seconds, 6)} for phase, seconds in self.phases],
+      }
+
+
+# Move path to path.1, path.1 to path.2, ... once path is larger than maxBytes
+def _rotate(path, maxBytes, backups):
+   if not os.path.exists(path) or os.path.getsize(path) < maxBytes:
+      return
+   for index in range(backups - 1, 0, -1):
+      if os.path.exists(f'{path}.{index}'):
+         os.replace(f'{path}.{index}', f'{path}.{index + 1}')
+   if backups > 0:
+      os.replace(path, f'{path}.1')
+   else:
+      os.remove(path)
+
+
+# Add a record to the log in folder
+def writeRecord(folder, record, maxBytes=MAX_LOG_BYTES, backups=LOG_BACKUPS):
+   path = os.path.join(folder, LOG_NAME)
+   _rotate(path, maxBytes, backups)
+   with open(path, 'a') as f:
+      f.write(json.dumps(record) + '\n')
+
+
+# The last record in the log in folder, None when there is none
+def lastRecord(folder):
+   path = os.path.join(folder, LOG_NAME)
+   if not os.path.exists(path):
+      return None
+   last = None
+   with open(path) as f:
+      for line in f:
+         if line.strip():
+            last = line
+   try:
+      return json.loads(last) if last else None
+   except json.JSONDecodeError:
+      return None
+
+
+# Short text for the dialog: the total and the slowest phases of a record
+def summary(record, phases=3):
+   if record is None:
+      return 'No builds timed yet'
+   slowest = sorted(record['phases'], key=lambda phase: phase['seconds'], reverse=True)[:phases]
+   text = ', '.join(f'{phase["phase"]} {phase["seconds"]:.2f} s' for phase in slowest)
+   return f'{record["name"]}: {record["seconds"]:.2f} s, {record["timelineCount"]} timeline items. Slowest: {text}'
@@ -0,0 +1,307 @@
+# Geneva Gear Tolerance Analysis
+# Description: Monte Carlo analysis of how the backlash holds up against machining errors. GenevaCreator takes
+#              the backlash off the pin (slotRadius - backlash/2) and off the locking disc
+#              (driveProfileRadius - backlash). Real parts are off by a little on every one of those dimensions.
+#              This samples the errors and reports the spread of the clearance, the lost motion of the driven
+#              wheel, and how often a pair would jam. Run "python geneva_tolerance.py --help".
+#
+#              Every dimension gets a normal error whose standard deviation is a third of its tolerance, so
+#              the tolerance is the 3 sigma band. The dimensions are the slot width, the pin diameter, the
+#              locking disc diameter, the locking cut-out diameter and, optionally, the center distance.
+#              Widths and diameters are tolerances on the size, so half of the error goes on each side.
+#              The fits are computed in closed form:
+#                 slot clearance     slot width - pin diameter, the gap between the pin and the slot walls
+#                 locking clearance  cut-out radius - disc radius - center distance error, the smallest gap
+#                                    around the locking disc while the driven wheel is locked
+#                 lost motion        how far the locked driven wheel can turn inside that gap, in degrees
+#                 index play         how far the driven wheel can turn around the pin at the middle of an
+#                                    index, in degrees
+#              A pair jams when either clearance is below zero. The samples run in batches of NumPy arrays,
+#              spread over worker processes, and each batch only returns counts and histograms. Results do not
+#              depend on the number of workers for the same seed.
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+   import numpy as np
+except ImportError:
+   np = None
+
+import geneva_catalog
+import geneva_geometry
+import geneva_validation
+
+# Dimensions that get an error, with the default tolerance in mm (3 sigma, on the size)
+TOLERANCES = {
+   'slot': 0.05,
+   'pin': 0.02,
+   'disc': 0.05,
+   'cutOut': 0.05,
+   'center': 0.0,
+}
+
+# Results that get a distribution, with their units
+METRICS = (
+   ('clearance', 'mm'),
+   ('slotClearance', 'mm'),
+   ('lockClearance', 'mm'),
+   ('lostMotion', 'deg'),
+   ('indexPlay', 'deg'),
+)
+
+# Percentiles reported for every metric
+PERCENTILES = (0.1, 1, 50, 99, 99.9)
+
+# Histogram bins of each metric, wide enough that percentiles are read to a small fraction of a tolerance
+HISTOGRAM_BINS = 4000
+
+
+# Nominal sizes of the fit for one parameter set, lengths in the units of the geometry
+def nominalFit(geometry):
+   return {
+      'slotRadius': geometry['slotRadius'],
+      'pinRadius': geometry['slotRadius'] - geometry['backlash']/2,
+      'discRadius': geometry['driveProfileRadius'] - geometry['backlash'],
+      'cutOutRadius': geometry['driveProfileRadius'],
+      'centerDistance': geometry['thirdDist'],
+      'pinDistance': geometry['constructionRadius'],
+   }
+
+
+# Fit of count sampled pairs. Returns a dictionary of arrays: the metrics and whether each pair jams.
+def sampleFit(geometry, tolerances, count, rng):
+   if np is None:
+      raise ImportError('NumPy is required for the tolerance analysis')
+
+   fit = nominalFit(geometry)
+
+   # Errors of the sizes, half of each goes on each side of the part
+   def error(name):
+      sigma = tolerances.get(name, 0.0)/3
+      return rng.normal(0.0, sigma, count) if sigma > 0 else np.zeros(count)
+
+   slotRadius = fit['slotRadius'] + error('slot')/2
+   pinRadius = fit['pinRadius'] + error('pin')/2
+   discRadius = fit['discRadius'] + error('disc')/2
+   cutOutRadius = fit['cutOutRadius'] + error('cutOut')/2
+   centerError = error('center')
+
+   slotClearance = 2*(slotRadius - pinRadius)
+   gap = cutOutRadius - discRadius
+   lockClearance = gap - np.abs(centerError)
+
+   # The locked wheel turns until the disc touches the cut-out: the centers can move apart sideways by
+   # sqrt(gap^2 - centerError^2) in each direction, at the center distance from the wheel center
+   sideways = np.sqrt(np.maximum(gap**2 - centerError**2, 0.0))
+   lostMotion = np.degrees(2*sideways/fit['centerDistance'])
+   indexPlay = np.degrees(np.maximum(slotClearance, 0.0)/fit['pinDistance'])
+
+   return {
+      'clearance': np.minimum(slotClearance, lockClearance),
+      'slotClearance': slotClearance,
+      'lockClearance': lockClearance,
+      'lostMotion': lostMotion,
+      'indexPlay': indexPlay,
+      'jamSlot': slotClearance < 0,
+      'jamLock': lockClearance < 0,
+   }
+
+
+# Histogram range of each metric: the nominal value plus or minus 8 sigma of the errors that feed it
+def histogramRanges(geometry, tolerances):
+   sigma = {name: tolerances.get(name, 0.0)/3 for name in TOLERANCES}
+   backlash = geometry['backlash']
+   slotSpread = 8*math.hypot(sigma['slot'], sigma['pin'])
+   lockSpread = 8*(math.hypot(sigma['disc'], sigma['cutOut'])/2 + sigma['center']) + 1e-9
+   lockedMax = math.degrees(2*(backlash + lockSpread)/geometry['thirdDist'])
+   indexMax = math.degrees((backlash + slotSpread)/geometry['constructionRadius'])
+   return {
+      'clearance': (backlash - max(slotSpread, lockSpread), backlash + max(slotSpread, lockSpread)),
+      'slotClearance': (backlash - slotSpread - 1e-9, backlash + slotSpread + 1e-9),
+      'lockClearance': (backlash - lockSpread, backlash + lockSpread),
+      'lostMotion': (0.0, lockedMax),
+      'indexPlay': (0.0, indexMax + 1e-9),
+   }
+
+
+# One batch, runs in the worker processes. task is (geometry, tolerances, count, seed, ranges),
+# returns the counts, sums and histograms of the batch.
+def _batchTask(task):
+   geometry, tolerances, count, seed, ranges = task
+   samples = sampleFit(geometry, tolerances, count, np.random.default_rng(seed))
+   summary = {
+      'samples': count,
+      'jam': int(np.count_nonzero(samples['jamSlot'] | samples['jamLock'])),
+      'jamSlot': int(np.count_nonzero(samples['jamSlot'])),
+      'jamLock': int(np.count_nonzero(samples['jamLock'])),
+      'metrics': {},
+   }
+   for name, units in METRICS:
+      values = samples[name]
+      low, high = ranges[name]
+      histogram, edges = np.histogram(values, HISTOGRAM_BINS, (low, high))
+      summary['metrics'][name] = {
+         'sum': float(values.sum()),
+         'sumSquares': float(np.square(values).sum()),
+         'min': float(values.min()),
+         'max': float(values.max()),
+         'below': int(np.count_nonzero(values < low)),
+         'histogram': histogram,
+      }
+   return summary
+
+
+# Add the summary of a batch to the running total
+def _merge(total, summary):
+   if total is None:
+      return summary
+   for key in ('samples', 'jam', 'jamSlot', 'jamLock'):
+      total[key] += summary[key]
+   for name, metric in summary['metrics'].items():
+      merged = total['metrics'][name]
+      for key in ('sum', 'sumSquares', 'below', 'histogram'):
+         merged[key] = merged[key] + metric[key]
+      merged['min'] = min(merged['min'], metric['min'])
+      merged['max'] = max(merged['max'], metric['max'])
+   return total
+
+
+# Value below which the given percent of the samples fall, read from the histogram
+def _percentile(metric, low, high, samples, percent):
+   target = samples*percent/100
+   if target <= metric['below']:
+      return metric['min']
+   cumulative = metric['below'] + np.cumsum(metric['histogram'])
+   index = int(np.searchsorted(cumulative, target))
+   if index >= len(cumulative):
+      return metric['max']
+   width = (high - low)/len(metric['histogram'])
+   before = cumulative[index - 1] if index > 0 else metric['below']
+   inBin = metric['histogram'][index]
+   fraction = (target - before)/inBin if inBin else 0.0
+   return low + (index + fraction)*width
+
+
+# Run the analysis for one parameter set (keys of geneva_parameters.json, in mm). Returns a dictionary with
+# the jam probabilities and, for every metric, the mean, standard deviation, extremes and percentiles.
+def analyze(values, tolerances=None, samples=1000000, batchSize=250000, workers=None, seed=0):
+   if np is None:
+      raise ImportError('NumPy is required for the tolerance analysis')
+
+   tolerances = dict(TOLERANCES, **(tolerances or {}))
+   geometry = geneva_geometry.computeGeometry(*(values[key] for key in geneva_catalog.PARAMETER_KEYS))
+   ranges = histogramRanges(geometry, tolerances)
+
+   # Every batch gets its own random stream from the seed, so the result is the same with any number of workers
+   counts = [min(batchSize, samples - first) for first in range(0, samples, batchSize)]
+   seeds = np.random.SeedSequence(seed).spawn(len(counts))
+   tasks = [(geometry, tolerances, count, batchSeed, ranges) for count, batchSeed in zip(counts, seeds)]
+
+   workers = min(workers or os.cpu_count() or 1, len(tasks))
+   total = None
+   if workers > 1:
+      with ProcessPoolExecutor(max_workers=workers) as executor:
+         for summary in executor.map(_batchTask, tasks):
+            total = _merge(total, summary)
+   else:
+      for task in tasks:
+         total = _merge(total, _batchTask(task))
+
+   result = {
+      'samples': total['samples'],
+      'jamProbability': total['jam']/total['samples'],
+      'slotJamProbability': total['jamSlot']/total['samples'],
+      'lockJamProbability': total['jamLock']/total['samples'],
+      'tolerances': tolerances,
+      'metrics': {},
+   }
+   for name, units in METRICS:
+      metric = total['metrics'][name]
+      low, high = ranges[name]
+      mean = metric['sum']/total['samples']
+      result['metrics'][name] = {
+         'units': units,
+         'mean': mean,
+         'std': math.sqrt(max(metric['sumSquares']/total['samples'] - mean**2, 0.0)),
+         'min': metric['min'],
+         'max': metric['max'],
+         'percentiles': {percent: _percentile(metric, low, high, total['samples'], percent) for percent in PERCENTILES},
+      }
+   return result
+
+
+# Smallest of the backlash values whose jam probability is at most maxJam, with the results of every value
+# tried in order. Returns (backlash or None, [(backlash, result)]).
+def chooseBacklash(values, backlashes, maxJam, **options):
+   results = []
+   for backlash in sorted(backlashes):
+      result = analyze(dict(values, backlash=backlash), **options)
+      results.append((backlash, result))
+      if result['jamProbability'] <= maxJam:
+         return backlash, results
+   return None, results
+
+
+def _report(backlash, result):
+   print(f'Backlash {backlash:g} mm, {result["samples"]} samples: jams {result["jamProbability"]:.3%} '
+         f'(slot {result["slotJamProbability"]:.3%}, locking disc {result["lockJamProbability"]:.3%})')
+   header = ''.join(f'{f"p{percent:g}":>10}' for percent in PERCENTILES)
+   print(f'   {"":20}{"mean":>10}{"std":>10}{header}')
+   for name, units in METRICS:
+      metric = result['metrics'][name]
+      percentiles = ''.join(f'{metric["percentiles"][percent]:10.4f}' for percent in PERCENTILES)
+      print(f'   {name + " (" + units + ")":20}{metric["mean"]:10.4f}{metric["std"]:10.4f}{percentiles}')
+
+
+def main(argv=None):
+   scriptDir = os.path.dirname(os.path.realpath(__file__))
+   parser = argparse.ArgumentParser(description='Monte Carlo analysis of the backlash of a Geneva gear pair against machining errors. '
+                                                'Lengths and tolerances are in mm, tolerances are 3 sigma on the size.')
+   parser.add_argument('--parameters', default=os.path.join(scriptDir, 'geneva_parameters.json'), help='gear pair and ranges to use')
+   parser.add_argument('--backlash', type=float, nargs='+', help='backlash values to try instead of the one in the parameters file')
+   parser.add_argument('--max-jam', type=float, default=0.001, help='jam probability a backlash must stay under to be chosen (default: 0.001)')
+   for name, feature in (('slot', 'slot width'), ('pin', 'pin diameter'), ('disc', 'locking disc diameter'),
+                         ('cutOut', 'locking cut-out diameter'), ('center', 'center distance')):
+      option = ''.join('-' + c.lower() if c.isupper() else c for c in name)
+      parser.add_argument(f'--{option}-tolerance', type=float, default=TOLERANCES[name], dest=name, metavar='MM',
+                          help=f'tolerance of the {feature} (default: {TOLERANCES[name]:g})')
+   parser.add_argument('--samples', type=int, default=1000000, help='sampled pairs for each backlash (default: 1000000)')
+   parser.add_argument('--batch', type=int, default=250000, help='samples in each batch (default: 250000)')
+   parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+   parser.add_argument('--seed', type=int, default=0, help='seed of the random errors (default: 0)')
+   args = parser.parse_args(argv)
+
+   with open(args.parameters, 'r') as f:
+      genevaParameters = json.load(f)['geneva_mechanism']
+   values = {key: genevaParameters[key] for key in geneva_catalog.PARAMETER_KEYS}
+   backlashes = args.backlash or [values['backlash']]
+
+   for backlash in backlashes:
+      problems = geneva_validation.validate(dict(values, backlash=backlash), genevaParameters)
+      if problems:
+         print(f'Backlash {backlash:g} mm can not be built:\n   ' + '\n   '.join(problems), file=sys.stderr)
+         return 1
+
+   tolerances = {name: getattr(args, name) for name in TOLERANCES}
+   start = time.perf_counter()
+   chosen, results = chooseBacklash(values, backlashes, args.max_jam, tolerances=tolerances, samples=args.samples,
+                                    batchSize=args.batch, workers=args.workers, seed=args.seed)
+   for backlash, result in results:
+      _report(backlash, result)
+   print(f'{sum(result["samples"] for backlash, result in results)} samples in {time.perf_counter() - start:.3f} s')
+
+   if chosen is None:
+      print(f'No backlash tried keeps the jam probability under {args.max_jam:g}', file=sys.stderr)
+      return 1
+   print(f'Smallest backlash with a jam probability under {args.max_jam:g}: {chosen:g} mm')
+   return 0
+
+
+if __name__ == '__main__':
+   sys.exit(main())
@@ -0,0 +1,95 @@
+# Geneva Gear Train
+# Description: Placement and motion of the stages of a Geneva train. The first stage is built as a normal gear
+#              pair and every other stage is one more occurrence of the same drive and driven components, so a
+#              train costs one build plus a few occurrences and joints per stage. The stages sit one above the
+#              other, the height of a pair plus a gap apart. The layouts are:
+#                 stack  every stage on the shafts of the first. The drives are keyed to one shaft with their
+#                        phases spread evenly over a turn, so the stages index one after the other.
+#                 chain  the drive of each stage is keyed to the driven wheel of the stage below it, in line
+#                        with it, so each stage indexes once for every turn of its drive, like a counter.
+#              Placements are a rotation about the Z axis followed by a translation, in the units of the
+#              geometry. This module does not use the Fusion API, the occurrences and joints are added by the
+#              caller.
+
+import json
+import math
+
+import geneva_kinematics
+import geneva_motion
+
+# "trainLayout" in geneva_parameters.json
+TRAIN_LAYOUTS = ('stack', 'chain')
+
+# Attribute group of the trains built in table mode, one attribute per train named by its parameter prefix
+ATTRIBUTE_GROUP = 'GenevaTrain'
+
+# Gap between two stages as a fraction of the thickness. A pair is two thicknesses high, the drive base is
+# below the XY plane and the wheels above it.
+STAGE_GAP = 0.5
+
+
+# Rotation about the Z axis by angle around center, then a lift to height z: (angle, x, y, z) of the transform
+def _placement(angle, center, shift, z):
+   cos = math.cos(angle)
+   sin = math.sin(angle)
+   x = center[0] - (cos*center[0] - sin*center[1]) + shift[0]
+   y = center[1] - (sin*center[0] + cos*center[1]) + shift[1]
+   return (angle, x, y, z)
+
+
+# Placement of the drive and driven occurrences of every stage, the first stage is where it was built.
+# Returns a list of dictionaries: 'drive' and 'driven' placements, and 'phase', the drive angle the stage
+# was placed at relative to its drive shaft.
+def stagePlacements(geometry, stages, layout):
+   if layout not in TRAIN_LAYOUTS:
+      raise ValueError(f'Unknown train layout {layout!r}, use one of: ' + ', '.join(TRAIN_LAYOUTS))
+
+   thirdDist = geometry['thirdDist']
+   pitch = (2 + STAGE_GAP)*geometry['thickness']
+   placements = []
+   for stage in range(stages):
+      z = stage*pitch
+      if layout == 'stack':
+         # Turn the drive about its own center and the driven wheel to where that drive angle puts it
+         phase = 2*math.pi*stage/stages
+         drivenPhase = geneva_kinematics.motion(geometry, phase)[0]
+         drive = _placement(phase, (thirdDist, 0.0), (0.0, 0.0), z)
+         driven = _placement(drivenPhase, (0.0, 0.0), (0.0, 0.0), z)
+      else:
+         # Move the pair so its drive center is on the driven center of the stage below
+         phase = 0.0
+         drive = driven = _placement(0.0, (0.0, 0.0), (-stage*thirdDist, 0.0), z)
+      placements.append({'drive': drive, 'driven': driven, 'phase': phase})
+   return placements
+
+
+# Rotation of the driven joints of the stages after the first, for a rotation of the first drive joint.
+# phases are the 'phase' of those stages from stagePlacements. The joints are at 0 where the stages were placed.
+def stageAngles(table, layout, phases, crankAngle):
+   angles = []
+   if layout == 'stack':
+      for phase in phases:
+         angle = geneva_motion.drivenTurn(table, phase + crankAngle) - geneva_motion.drivenTurn(table, phase)
+         angles.append(math.remainder(angle, 2*math.pi))
+   else:
+      # Each drive turns with the driven wheel below it, counting its whole turns
+      angle = geneva_motion.drivenTurn(table, crankAngle)
+      for phase in phases:
+         angle = geneva_motion.drivenTurn(table, angle + phase)
+         angles.append(math.remainder(angle, 2*math.pi))
+   return angles
+
+
+# Attribute value of a train: its layout, and the entity token of the driven joint and the phase of every
+# stage after the first
+def encodeTrain(layout, stages):
+   return json.dumps({'layout': layout, 'stages': [{'driven': token, 'phase': round(phase, 9)} for token, phase in stages]})
+
+
+# Layout and stages of an attribute value, None when it can not be read
+def decodeTrain(value):
+   try:
+      train = json.loads(value)
+      return train['layout'], [(stage['driven'], stage['phase']) for stage in train['stages']]
+   except (ValueError, KeyError, TypeError):
+      return None
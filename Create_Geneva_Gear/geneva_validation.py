@@ -0,0 +1,120 @@
+# Geneva Gear Validation
+# Description: Checks a parameter set before anything is built: every value against its range in
+#              geneva_parameters.json, and the combinations of values that give a gear pair the sketches can not
+#              be drawn for. All problems are reported at once. Values use the JSON keys and millimeters.
+#              A single parameter set uses plain Python, arrays of parameter sets use NumPy.
+
+import math
+
+try:
+   import numpy as np
+except ImportError:
+   np = None
+
+import geneva_geometry
+
+# Range of each input: (JSON key, minimum key, maximum key, name in messages, units), in GenevaCreator order
+RANGES = (
+   ('driven_radius', 'minDrivenRadius', 'maxDivenRadius', 'Driven radius', ' mm'),
+   ('slot_radius', 'minSlotRadius', 'maxSlotRadius', 'Slot radius', ' mm'),
+   ('number_of_slots', 'minToothNumber', 'maxToothNumber', 'Number of slots', ''),
+   ('backlash', 'minBacklash', 'maxBacklash', 'Backlash', ' mm'),
+   ('thickness', 'minThickness', 'maxThickness', 'Thickness', ' mm'),
+   ('filletRadius', 'minFilletRadius', 'maxFilletRadius', 'Fillet radius', ' mm'),
+)
+
+# The pin base may use at most this much of the pin circle radius. The tangent lines of the drive base meet
+# at const2, which goes to infinity as the pin base grows to the pin circle.
+PIN_BASE_MARGIN = 0.9
+
+# Math functions for single values and for arrays
+_SCALAR = {'sqrt': math.sqrt, 'asin': math.asin, 'atan2': math.atan2, 'maximum': max}
+_ARRAY = {'sqrt': np.sqrt, 'asin': np.arcsin, 'atan2': np.arctan2, 'maximum': np.maximum} if np is not None else None
+
+
+# Angle of the outer edge left between a slot mouth and the next locking tip, the same corners as
+# geneva_profile.drivenWheelCorners. Negative when the slot and the locking cut-out overlap.
+def _rimAngle(geometry, f):
+   drivenRadius = geometry['drivenRadius']
+   thirdDist = geometry['thirdDist']
+   lockingRadius = geometry['driveProfileRadius']
+   mouthAngle = f['asin'](geometry['slotRadius']/drivenRadius)
+   a = (drivenRadius**2 - lockingRadius**2 + thirdDist**2)/(2*thirdDist)
+   tipAngle = f['atan2'](f['sqrt'](f['maximum'](drivenRadius**2 - a**2, 0.0)), a)
+   return geometry['angle'] - tipAngle - mouthAngle
+
+
+# Checks that need the geometry: (name, check, message). A check takes the geometry and the math functions
+# and is True when the design is fine. Messages are formatted with the geometry.
+RULES = (
+   ('pinBase',
+    lambda g, f: g['pinBaseRadius'] <= PIN_BASE_MARGIN*g['driveRadius'],
+    'Slot radius {slotRadius:g} mm is too large for {toothNumber} slots with this driven radius, '
+    'the pin base ({pinBaseRadius:g} mm) must stay under {PIN_BASE_MARGIN:g} of the pin circle radius ({driveRadius:.2f} mm)'),
+   ('slotSpacing',
+    lambda g, f: _rimAngle(g, f) > 0,
+    'Slots are wider than the space between them: the slots and the locking cut-outs overlap, '
+    'use a smaller slot radius or fewer slots'),
+   ('filletFits',
+    lambda g, f: g['drivenRadius']*_rimAngle(g, f) >= 2*g['filletRadius'],
+    'Fillet radius {filletRadius:g} mm does not fit on the outer edge between a slot and a locking cut-out'),
+   ('pinSize',
+    lambda g, f: g['backlash'] < g['slotRadius'],
+    'Backlash {backlash:g} mm must be smaller than the slot radius {slotRadius:g} mm, the pin would have no size left'),
+)
+
+
+# Problems with one parameter set, an empty list when it can be built.
+# values and limits are dictionaries with the keys of geneva_parameters.json, in mm.
+def validate(values, limits):
+   problems = []
+   for key, minKey, maxKey, name, units in RANGES:
+      if values[key] < limits[minKey]:
+         problems.append(f'{name} {values[key]:g}{units} is too small, must be at least {limits[minKey]:g}{units}')
+      if values[key] > limits[maxKey]:
+         problems.append(f'{name} {values[key]:g}{units} is too large, must be at most {limits[maxKey]:g}{units}')
+
+   # These make the geometry itself impossible, the other checks would only add noise
+   toothNumber = values['number_of_slots']
+   if toothNumber != int(toothNumber) or toothNumber < 3:
+      problems.append(f'Number of slots must be a whole number of at least 3, got {toothNumber:g}')
+      return problems
+   if values['slot_radius'] <= 0 or values['slot_radius'] >= values['driven_radius']:
+      problems.append(f'Slot radius {values["slot_radius"]:g} mm must be above 0 and smaller than the driven radius {values["driven_radius"]:g} mm')
+      return problems
+
+   geometry = geneva_geometry.computeGeometry(*(values[key] for key, minKey, maxKey, name, units in RANGES))
+   for name, check, message in RULES:
+      if not check(geometry, _SCALAR):
+         problems.append(message.format(PIN_BASE_MARGIN=PIN_BASE_MARGIN, **geometry))
+   return problems
+
+
+# Checks many parameter sets in one vectorized pass. values holds an array (or a single value) for each key.
+# Returns a dictionary of boolean arrays that are True where a set passes: one per range key, one per rule
+# in RULES, 'geometry' for the whole number of slots and slot inside the wheel checks, and 'valid' for all of them.
+def validateBatch(values, limits):
+   if np is None:
+      raise ImportError('NumPy is required to validate arrays of parameter sets')
+
+   arrays = np.broadcast_arrays(*(np.atleast_1d(np.asarray(values[key], dtype=float)) for key, minKey, maxKey, name, units in RANGES))
+   arrays = dict(zip((key for key, minKey, maxKey, name, units in RANGES), arrays))
+   results = {}
+   for key, minKey, maxKey, name, units in RANGES:
+      results[key] = (arrays[key] >= limits[minKey]) & (arrays[key] <= limits[maxKey])
+
+   toothNumber = arrays['number_of_slots']
+   results['geometry'] = ((toothNumber == np.floor(toothNumber)) & (toothNumber >= 3) &
+                          (arrays['slot_radius'] > 0) & (arrays['slot_radius'] < arrays['driven_radius']))
+
+   # Sets that failed the geometry check give nan here, and nan fails every rule
+   with np.errstate(divide='ignore', invalid='ignore'):
+      geometry = geneva_geometry.computeGeometryBatch(*(arrays[key] for key, minKey, maxKey, name, units in RANGES))
+      for name, check, message in RULES:
+         results[name] = check(geometry, _ARRAY) & results['geometry']
+
+   valid = results['geometry']
+   for name, passed in results.items():
+      valid = valid & passed
+   results['valid'] = valid
+   return results
@@ -0,0 +1,93 @@
+# Geneva Gear Background Worker
+# Description: Runs the math behind the preview (validation, geometry and outlines) on a worker thread so the
+#              dialog does not freeze on big gears. Requests are latest wins: a request that has not started
+#              is replaced by a newer one, and a result that finishes after a newer request came in is dropped,
+#              so only the newest parameters are ever drawn. The worker only calls notify(generation) when a
+#              result is ready. In Fusion that fires a custom event and the result is taken on the UI thread,
+#              the Fusion API can not be used from the worker. This module does not use the Fusion API.
+
+import threading
+
+
+class LatestWinsScheduler:
+   # compute(request) runs on the worker thread, notify(generation) is called from it when a result is ready
+   def __init__(self, compute, notify):
+      self._compute = compute
+      self._notify = notify
+      self._condition = threading.Condition()
+      self._generation = 0
+      self._pending = None
+      self._result = None
+      self._stopped = False
+      self.computed = 0
+      self.dropped = 0
+      self._thread = threading.Thread(target=self._run, name='geneva_worker', daemon=True)
+      self._thread.start()
+
+   # Queue a request in place of the one that has not started yet, returns its generation
+   def submit(self, request):
+      with self._condition:
+         self._generation += 1
+         if self._pending is not None:
+            self.dropped += 1
+         self._pending = (self._generation, request)
+         self._result = None
+         self._condition.notify()
+         return self._generation
+
+   # Drop the waiting request and every result that is not taken yet, for example when the gears are built
+   def cancel(self):
+      with self._condition:
+         self._generation += 1
+         if self._pending is not None:
+            self.dropped += 1
+         self._pending = None
+         self._result = None
+
+   # Result of a generation, on the UI thread. None when a newer request was submitted since.
+   # An exception raised by compute is raised here.
+   def take(self, generation):
+      with self._condition:
+         if self._result is None or self._result[0] != generation or generation != self._generation:
+            return None
+         generation, result, error = self._result
+         self._result = None
+      if error is not None:
+         raise error
+      return result
+
+   # Stop the worker thread, a request that is running finishes but is not handed back
+   def stop(self, timeout=5.0):
+      with self._condition:
+         self._stopped = True
+         self._pending = None
+         self._result = None
+         self._condition.notify()
+      self._thread.join(timeout)
+
+   def _run(self):
+      while True:
+         with self._condition:
+            while self._pending is None and not self._stopped:
+               self._condition.wait()
+            if self._stopped:
+               return
+            generation, request = self._pending
+            self._pending = None
+
+         result = error = None
+         try:
+            result = self._compute(request)
+         except Exception as e:
+            error = e
+
+         with self._condition:
+            self.computed += 1
+            if generation != self._generation or self._stopped:
+               self.dropped += 1
+               continue
+            self._result = (generation, result, error)
+         self._notify(generation)
+
+   def summary(self):
+      return f'{self.computed} computed, {self.dropped} superseded'
@@ -0,0 +1,13 @@
+# Fake adsk Package
+# Description: Stand-in for the Fusion 360 adsk package so Create_Geneva_Gear can run without Fusion. Only the
+#              part of the API the script uses is there, and every call on it is recorded (see _recorder).
+
+from . import core, fusion
+
+# Whether Fusion should end the script when run returns, the harness keeps it for the dialog events
+_autoTerminate = True
+
+
+def autoTerminate(value):
+   global _autoTerminate
+   _autoTerminate = value
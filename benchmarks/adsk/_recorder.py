@@ -0,0 +1,154 @@
+# Fake Fusion API Recorder
+# Description: Records every call made on the fake adsk objects: property reads and writes and method calls,
+#              with their arguments and how long they took. Each one stands for a round trip to Fusion.
+#              Calls are grouped by phase (the dialog event being handled), and a build is split further
+#              into sections that each end with the feature that closes them (extrude, fillet, ...).
+#              Calls from other threads (a worker firing a custom event) are not recorded, they do not hold up
+#              the dialog.
+
+import threading
+import time
+
+# Calls that add a feature to the timeline, each one closes a section of the build
+FEATURE_CALLS = {
+   'ExtrudeFeatures.addSimple': 'extrude',
+   'FilletFeatures.add': 'fillet',
+   'CircularPatternFeatures.add': 'pattern',
+   'MoveFeatures.add': 'move',
+   'AsBuiltJoints.add': 'joint',
+   'ContactSets.add': 'contact set',
+   'TimelineGroups.add': 'timeline group',
+}
+
+
+class Recorder:
+   def __init__(self):
+      self.reset()
+
+   # Forget every call and stop recording until the next phase starts
+   def reset(self):
+      self.calls = []
+      self.phase = None
+      self.section = 0
+      self.sectionLabels = {}
+      self.depth = 0
+
+   # Calls from now on belong to this phase, None stops recording
+   def startPhase(self, phase):
+      self.phase = phase
+      self.section = 0
+
+   # Add one call: name is 'Class.member', kind is 'get', 'set' or 'call'
+   def record(self, name, kind, args, duration):
+      if self.phase is None:
+         return
+      self.calls.append((self.phase, self.section, name, kind, args, duration))
+      label = FEATURE_CALLS.get(name)
+      if label:
+         self.sectionLabels[(self.phase, self.section)] = label
+         self.section += 1
+
+   # Name of a phase and section in the reports, phases without features are not split
+   def sectionName(self, phase, section):
+      if not any(key[0] == phase for key in self.sectionLabels):
+         return phase
+      label = self.sectionLabels.get((phase, section), 'finish')
+      return f'{phase} {section + 1:02d} {label}'
+
+   # Number of calls and time spent in them for each section, in the order they happened.
+   # Returns {section name: (calls, seconds)}
+   def summary(self):
+      totals = {}
+      for phase, section, name, kind, args, duration in self.calls:
+         key = self.sectionName(phase, section)
+         count, seconds = totals.get(key, (0, 0.0))
+         totals[key] = (count + 1, seconds + duration)
+      return totals
+
+
+# The one recorder the fake adsk modules report to
+RECORDER = Recorder()
+
+
+# Short form of an argument for the call log
+def describe(value):
+   if isinstance(value, (int, float, str, bool)) or value is None:
+      return value
+   if isinstance(value, (list, tuple)):
+      return f'{type(value).__name__}[{len(value)}]'
+   return type(value).__name__
+
+
+def _onMainThread():
+   return threading.current_thread() is threading.main_thread()
+
+
+# Wrap a function so calling it is recorded. Anything the fake does inside is not recorded.
+def recorded(name, function):
+   def call(*args, **kwargs):
+      if not _onMainThread():
+         return function(*args, **kwargs)
+      RECORDER.depth += 1
+      start = time.perf_counter()
+      try:
+         return function(*args, **kwargs)
+      finally:
+         duration = time.perf_counter() - start
+         RECORDER.depth -= 1
+         if not RECORDER.depth:
+            RECORDER.record(name, 'call', tuple(describe(arg) for arg in args), duration)
+   return call
+
+
+# Static method of a fake class whose calls are recorded, like Point3D.create
+def staticApi(function):
+   return staticmethod(recorded(function.__qualname__, function))
+
+
+# Base of every fake API object: reading and writing public attributes and calling public methods is recorded
+class ApiObject:
+   def __getattribute__(self, name):
+      if name.startswith('_') or RECORDER.depth or not _onMainThread():
+         return object.__getattribute__(self, name)
+
+      # Properties of the fakes compute their value without recording what they use
+      RECORDER.depth += 1
+      try:
+         value = object.__getattribute__(self, name)
+      finally:
+         RECORDER.depth -= 1
+      owner = type(self).__name__
+      if callable(value) and not isinstance(value, (ApiObject, type)):
+         return recorded(f'{owner}.{name}', value)
+      RECORDER.record(f'{owner}.{name}', 'get', (), 0.0)
+      return value
+
+   def __setattr__(self, name, value):
+      if not _onMainThread():
+         object.__setattr__(self, name, value)
+         return
+      recording = not name.startswith('_') and not RECORDER.depth
+      RECORDER.depth += 1
+      try:
+         object.__setattr__(self, name, value)
+      finally:
+         RECORDER.depth -= 1
+      if recording:
+         RECORDER.record(f'{type(self).__name__}.{name}', 'set', (describe(value),), 0.0)
+
+
+# Base of the fake collections: count and item are recorded, iterating uses them like the real API
+class ApiCollection(ApiObject):
+   def __init__(self, items=None):
+      self._items = list(items or [])
+
+   @property
+   def count(self):
+      return len(self._items)
+
+   def item(self, index):
+      return self._items[index]
+
+   def __iter__(self):
+      for index in range(self.count):
+         yield self.item(index)
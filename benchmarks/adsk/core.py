@@ -0,0 +1,429 @@
+# Fake adsk.core
+# Description: The part of adsk.core that Create_Geneva_Gear uses: the application, the user interface and
+#              command dialog, events, and the geometry and value helpers. Everything is recorded by _recorder.
+
+import queue
+
+from ._recorder import ApiCollection, ApiObject, staticApi
+
+
+# Geometry and values
+
+class Point3D(ApiObject):
+   def __init__(self, x, y, z):
+      self.x = x
+      self.y = y
+      self.z = z
+
+   @staticApi
+   def create(x=0.0, y=0.0, z=0.0):
+      return Point3D(x, y, z)
+
+
+class Vector3D(ApiObject):
+   def __init__(self, x, y, z):
+      self.x = x
+      self.y = y
+      self.z = z
+
+   @staticApi
+   def create(x=0.0, y=0.0, z=0.0):
+      return Vector3D(x, y, z)
+
+
+class Matrix3D(ApiObject):
+   def __init__(self):
+      self.translation = Vector3D(0.0, 0.0, 0.0)
+      self._rotation = None
+
+   # The rotation is only kept, nothing is placed by it
+   def setToRotation(self, angle, axis, origin):
+      self._rotation = (angle, axis, origin)
+      return True
+
+   @staticApi
+   def create():
+      return Matrix3D()
+
+
+class ValueInput(ApiObject):
+   def __init__(self, realValue=None, stringValue=None):
+      self.realValue = realValue
+      self.stringValue = stringValue
+
+   @staticApi
+   def createByReal(value):
+      return ValueInput(realValue=value)
+
+   @staticApi
+   def createByString(expression):
+      return ValueInput(stringValue=expression)
+
+
+class ObjectCollection(ApiCollection):
+   def add(self, item):
+      self._items.append(item)
+      return True
+
+   def clear(self):
+      self._items = []
+
+   @staticApi
+   def create():
+      return ObjectCollection()
+
+
+class Color(ApiObject):
+   def __init__(self, red, green, blue, opacity):
+      self.red = red
+      self.green = green
+      self.blue = blue
+      self.opacity = opacity
+
+   @staticApi
+   def create(red, green, blue, opacity):
+      return Color(red, green, blue, opacity)
+
+
+# Events. The script subclasses the handlers, the harness calls notify on them.
+
+class Event(ApiObject):
+   def __init__(self):
+      self._handlers = []
+
+   def add(self, handler):
+      self._handlers.append(handler)
+      return True
+
+   def remove(self, handler):
+      self._handlers.remove(handler)
+      return True
+
+
+class CommandCreatedEventHandler:
+   def __init__(self):
+      pass
+
+
+class CommandEventHandler:
+   def __init__(self):
+      pass
+
+
+class InputChangedEventHandler:
+   def __init__(self):
+      pass
+
+
+class ValidateInputsEventHandler:
+   def __init__(self):
+      pass
+
+
+class CustomEventHandler:
+   def __init__(self):
+      pass
+
+
+class CustomEvent(Event):
+   def __init__(self, eventId):
+      super().__init__()
+      self._eventId = eventId
+
+
+class CommandCreatedEventArgs(ApiObject):
+   def __init__(self, command):
+      self.command = command
+
+
+class CommandEventArgs(ApiObject):
+   def __init__(self, command):
+      self.command = command
+      self.isValidResult = False
+
+
+class InputChangedEventArgs(ApiObject):
+   def __init__(self, changedInput, inputs):
+      self.input = changedInput
+      self.inputs = inputs
+
+
+class ValidateInputsEventArgs(ApiObject):
+   def __init__(self, inputs):
+      self.inputs = inputs
+      self.areInputsValid = True
+
+
+class CustomEventArgs(ApiObject):
+   def __init__(self, additionalInfo):
+      self.additionalInfo = additionalInfo
+
+
+# Command dialog
+
+class DropDownStyles:
+   LabeledIconDropDownStyle = 0
+   TextListDropDownStyle = 1
+   CheckBoxDropDownStyle = 2
+
+
+class CommandInput(ApiObject):
+   def __init__(self, inputId, name):
+      self.id = inputId
+      self.name = name
+      self.isVisible = True
+      self.isEnabled = True
+
+
+class ListItem(ApiObject):
+   def __init__(self, name, isSelected):
+      self.name = name
+      self.isSelected = isSelected
+
+
+class ListItems(ApiCollection):
+   def add(self, name, isSelected, icon=''):
+      listItem = ListItem(name, isSelected)
+      self._items.append(listItem)
+      return listItem
+
+
+class DropDownCommandInput(CommandInput):
+   def __init__(self, inputId, name, style):
+      super().__init__(inputId, name)
+      self.listItems = ListItems()
+
+   @property
+   def selectedItem(self):
+      for listItem in self.listItems._items:
+         if listItem.isSelected:
+            return listItem
+      return None
+
+
+class IntegerSpinnerCommandInput(CommandInput):
+   def __init__(self, inputId, name, minimum, maximum, spinStep, initialValue):
+      super().__init__(inputId, name)
+      self.minimumValue = minimum
+      self.maximumValue = maximum
+      self.value = initialValue
+
+
+class FloatSliderCommandInput(CommandInput):
+   def __init__(self, inputId, name, units, minimum, maximum, hasTwoSliders):
+      super().__init__(inputId, name)
+      self.minimumValue = minimum
+      self.maximumValue = maximum
+      self.valueOne = minimum
+
+
+class BoolValueCommandInput(CommandInput):
+   def __init__(self, inputId, name, isCheckBox, initialValue):
+      super().__init__(inputId, name)
+      self.isCheckBox = isCheckBox
+      self.value = initialValue
+      self.text = ''
+
+
+class StringValueCommandInput(CommandInput):
+   def __init__(self, inputId, name, initialValue):
+      super().__init__(inputId, name)
+      self.value = initialValue
+
+
+class TextBoxCommandInput(CommandInput):
+   def __init__(self, inputId, name, formattedText, numRows, isReadOnly):
+      super().__init__(inputId, name)
+      self.formattedText = formattedText
+      self.text = formattedText
+
+
+class CommandInputs(ApiCollection):
+   def _add(self, commandInput):
+      self._items.append(commandInput)
+      return commandInput
+
+   def itemById(self, inputId):
+      for commandInput in self._items:
+         if commandInput.id == inputId:
+            return commandInput
+      return None
+
+   def addDropDownCommandInput(self, inputId, name, dropDownStyle):
+      return self._add(DropDownCommandInput(inputId, name, dropDownStyle))
+
+   def addIntegerSpinnerCommandInput(self, inputId, name, minimum, maximum, spinStep, initialValue):
+      return self._add(IntegerSpinnerCommandInput(inputId, name, minimum, maximum, spinStep, initialValue))
+
+   def addFloatSliderCommandInput(self, inputId, name, unitType, minimum, maximum, hasTwoSliders=False):
+      return self._add(FloatSliderCommandInput(inputId, name, unitType, minimum, maximum, hasTwoSliders))
+
+   def addBoolValueInput(self, inputId, name, isCheckBox, resourceFolder='', initialValue=False):
+      return self._add(BoolValueCommandInput(inputId, name, isCheckBox, initialValue))
+
+   def addStringValueInput(self, inputId, name, initialValue=''):
+      return self._add(StringValueCommandInput(inputId, name, initialValue))
+
+   def addTextBoxCommandInput(self, inputId, name, formattedText, numRows, isReadOnly):
+      return self._add(TextBoxCommandInput(inputId, name, formattedText, numRows, isReadOnly))
+
+
+class Command(ApiObject):
+   def __init__(self):
+      self.commandInputs = CommandInputs()
+      self.execute = Event()
+      self.executePreview = Event()
+      self.inputChanged = Event()
+      self.validateInputs = Event()
+      self.destroy = Event()
+
+
+class CommandDefinition(ApiObject):
+   def __init__(self, definitionId, name, tooltip):
+      self.id = definitionId
+      self.name = name
+      self.tooltip = tooltip
+      self.commandCreated = Event()
+      self._executed = False
+      self._deleted = False
+
+   # Fusion fires commandCreated after this returns, the harness does that with Session.createCommand
+   def execute(self, input=None):
+      self._executed = True
+      return True
+
+   def deleteMe(self):
+      self._deleted = True
+      return True
+
+
+class CommandDefinitions(ApiCollection):
+   def itemById(self, definitionId):
+      for definition in self._items:
+         if definition.id == definitionId and not definition._deleted:
+            return definition
+      return None
+
+   def addButtonDefinition(self, definitionId, name, tooltip, resourceFolder=''):
+      definition = CommandDefinition(definitionId, name, tooltip)
+      self._items.append(definition)
+      return definition
+
+
+# Application
+
+# Toolbar of the Design workspace, only the Create panel is there
+
+class CommandControl(ApiObject):
+   def __init__(self, commandDefinition):
+      self.id = commandDefinition.id
+      self.commandDefinition = commandDefinition
+      self._deleted = False
+
+   def deleteMe(self):
+      self._deleted = True
+      return True
+
+
+class ToolbarControls(ApiCollection):
+   def itemById(self, controlId):
+      for control in self._items:
+         if control.id == controlId and not control._deleted:
+            return control
+      return None
+
+   def addCommand(self, commandDefinition, positionID='', isBefore=True):
+      control = CommandControl(commandDefinition)
+      self._items.append(control)
+      return control
+
+
+class ToolbarPanel(ApiObject):
+   def __init__(self, panelId):
+      self.id = panelId
+      self.controls = ToolbarControls()
+
+
+class ToolbarPanelList(ApiCollection):
+   def itemById(self, panelId):
+      for panel in self._items:
+         if panel.id == panelId:
+            return panel
+      return None
+
+
+class UserInterface(ApiObject):
+   def __init__(self):
+      self.commandDefinitions = CommandDefinitions()
+      self.allToolbarPanels = ToolbarPanelList([ToolbarPanel('SolidCreatePanel')])
+      self._messages = []
+
+   def messageBox(self, text, title='', buttons=0, icon=0):
+      self._messages.append(text)
+      return 0
+
+
+class UnitAndValuePreferences(ApiObject):
+   def __init__(self):
+      self.generalPrecision = 3
+
+
+class Preferences(ApiObject):
+   def __init__(self):
+      self.unitAndValuePreferences = UnitAndValuePreferences()
+
+
+class Viewport(ApiObject):
+   def refresh(self):
+      return True
+
+
+class SMTImportOptions(ApiObject):
+   def __init__(self, filename):
+      self.filename = filename
+
+
+class ImportManager(ApiObject):
+   def createSMTImportOptions(self, filename):
+      return SMTImportOptions(filename)
+
+   # Adds one body to the target component, as a base feature in the timeline
+   def importToTarget(self, importOptions, target):
+      from .fusion import BRepBody
+      target._bodies.append(BRepBody(target))
+      target._timeline._add()
+      return True
+
+
+class Application(ApiObject):
+   _instance = None
+
+   def __init__(self, product):
+      self.userInterface = UserInterface()
+      self.activeProduct = product
+      self.preferences = Preferences()
+      self.activeViewport = Viewport()
+      self.importManager = ImportManager()
+      self._logs = []
+      self._customEvents = {}
+      self._firedEvents = queue.Queue()
+
+   def log(self, message, level=0, type=0):
+      self._logs.append(message)
+      return True
+
+   def registerCustomEvent(self, eventId):
+      self._customEvents.setdefault(eventId, CustomEvent(eventId))
+      return self._customEvents[eventId]
+
+   def unregisterCustomEvent(self, eventId):
+      return self._customEvents.pop(eventId, None) is not None
+
+   # Can be called from any thread, the harness hands the event to its handlers on the main thread
+   def fireCustomEvent(self, eventId, additionalInfo=''):
+      self._firedEvents.put((eventId, additionalInfo))
+      return eventId in self._customEvents
+
+   @staticApi
+   def get():
+      return Application._instance
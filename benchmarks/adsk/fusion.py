@@ -0,0 +1,678 @@
+# Fake adsk.fusion
+# Description: The part of adsk.fusion that Create_Geneva_Gear uses: the design and its parameters, components,
+#              sketches, features, joints and custom graphics. Nothing is solved or modeled, the fakes only keep
+#              enough state for the script to run (timeline count, parameters, bodies). A sketch has one profile
+#              for every circle in it. Everything is recorded by _recorder.
+
+import itertools
+
+from ._recorder import ApiCollection, ApiObject, staticApi
+from . import core
+
+# Entities that have a token, for Design.findEntityByToken. Tokens are never reused.
+_entities = {}
+_entityIds = itertools.count(1)
+
+
+def _addEntity(entity):
+   token = f'token{next(_entityIds)}'
+   _entities[token] = entity
+   return token
+
+
+# Enumerations
+
+class FeatureOperations:
+   JoinFeatureOperation = 0
+   CutFeatureOperation = 1
+   IntersectFeatureOperation = 2
+   NewBodyFeatureOperation = 3
+   NewComponentFeatureOperation = 4
+
+
+class DimensionOrientations:
+   AlignedDimensionOrientation = 0
+   HorizontalDimensionOrientation = 1
+   VerticalDimensionOrientation = 2
+
+
+class BRepEntityTypes:
+   BRepBodyEntityType = 0
+   BRepFaceEntityType = 1
+   BRepEdgeEntityType = 2
+   BRepVertexEntityType = 3
+
+
+class JointDirections:
+   XAxisJointDirection = 0
+   YAxisJointDirection = 1
+   ZAxisJointDirection = 2
+
+
+class JointTypes:
+   RigidJointType = 0
+   RevoluteJointType = 1
+
+
+# Parameters and attributes
+
+class UserParameter(ApiObject):
+   def __init__(self, name, valueInput, unit, comment):
+      self.name = name
+      self.unit = unit
+      self.comment = comment
+      self.expression = valueInput.stringValue if valueInput.stringValue is not None else str(valueInput.realValue)
+      self.value = valueInput.realValue if valueInput.realValue is not None else 0.0
+
+
+class UserParameters(ApiCollection):
+   def add(self, name, value, units, comment):
+      parameter = UserParameter(name, value, units, comment)
+      self._items.append(parameter)
+      return parameter
+
+   def itemByName(self, name):
+      for parameter in self._items:
+         if parameter.name == name:
+            return parameter
+      return None
+
+
+class ParameterList(ApiCollection):
+   def __init__(self, userParameters):
+      self._userParameters = userParameters
+
+   @property
+   def _items(self):
+      return self._userParameters._items
+
+   def itemByName(self, name):
+      return self._userParameters.itemByName(name)
+
+
+class ModelParameter(ApiObject):
+   def __init__(self):
+      self.expression = ''
+
+
+class Attribute(ApiObject):
+   def __init__(self, groupName, name, value):
+      self.groupName = groupName
+      self.name = name
+      self.value = value
+
+
+class Attributes(ApiCollection):
+   # Like Fusion, adding an attribute that exists changes its value
+   def add(self, groupName, name, value):
+      attribute = self.itemByName(groupName, name)
+      if attribute is not None:
+         attribute.value = value
+         return attribute
+      attribute = Attribute(groupName, name, value)
+      self._items.append(attribute)
+      return attribute
+
+   def itemByName(self, groupName, name):
+      for attribute in self._items:
+         if attribute.groupName == groupName and attribute.name == name:
+            return attribute
+      return None
+
+   def itemsByGroup(self, groupName):
+      return [attribute for attribute in self._items if attribute.groupName == groupName]
+
+
+# Timeline
+
+class TimelineGroup(ApiObject):
+   def __init__(self, start, end):
+      self.name = ''
+      self._start = start
+      self._end = end
+
+
+class TimelineGroups(ApiCollection):
+   def add(self, startIndex, endIndex):
+      group = TimelineGroup(startIndex, endIndex)
+      self._items.append(group)
+      return group
+
+
+class Timeline(ApiObject):
+   def __init__(self):
+      self._count = 0
+      self.timelineGroups = TimelineGroups()
+
+   @property
+   def count(self):
+      return self._count
+
+   # Called by the fakes that add an item to the timeline
+   def _add(self):
+      self._count += 1
+
+
+# Bodies
+
+class BRepEdge(ApiObject):
+   def __init__(self, body):
+      self.body = body
+
+
+class BRepBody(ApiObject):
+   def __init__(self, component):
+      self._component = component
+
+   def moveToComponent(self, target):
+      return self
+
+
+class BRepBodies(ApiCollection):
+   pass
+
+
+# Construction geometry
+
+class ConstructionPlane(ApiObject):
+   pass
+
+
+class ConstructionAxis(ApiObject):
+   pass
+
+
+class ConstructionPoint(ApiObject):
+   def __init__(self, assemblyContext=None):
+      self.assemblyContext = assemblyContext
+
+   def createForAssemblyContext(self, occurrence):
+      return ConstructionPoint(occurrence)
+
+
+class ConstructionPointInput(ApiObject):
+   def setByCenter(self, circularEntity):
+      self._entity = circularEntity
+      return True
+
+
+class ConstructionPoints(ApiCollection):
+   def __init__(self, timeline):
+      super().__init__()
+      self._timeline = timeline
+
+   def createInput(self, occurrence=None):
+      return ConstructionPointInput()
+
+   def add(self, pointInput):
+      point = ConstructionPoint()
+      self._items.append(point)
+      self._timeline._add()
+      return point
+
+
+# Sketches
+
+class SketchPoint(ApiObject):
+   def __init__(self, geometry):
+      self.geometry = geometry
+
+
+class SketchCircle(ApiObject):
+   def __init__(self, center, radius):
+      self.centerSketchPoint = SketchPoint(center)
+      self.radius = radius
+      self.isConstruction = False
+
+
+class SketchLine(ApiObject):
+   def __init__(self, start, end):
+      self.startSketchPoint = start if isinstance(start, SketchPoint) else SketchPoint(start)
+      self.endSketchPoint = end if isinstance(end, SketchPoint) else SketchPoint(end)
+      self.isConstruction = False
+
+
+class SketchCircles(ApiCollection):
+   def addByCenterRadius(self, centerPoint, radius):
+      center = centerPoint.geometry if isinstance(centerPoint, SketchPoint) else centerPoint
+      circle = SketchCircle(center, radius)
+      self._items.append(circle)
+      return circle
+
+
+class SketchLines(ApiCollection):
+   def addByTwoPoints(self, startPoint, endPoint):
+      line = SketchLine(startPoint, endPoint)
+      self._items.append(line)
+      return line
+
+
+class SketchPoints(ApiCollection):
+   def add(self, point):
+      sketchPoint = SketchPoint(point)
+      self._items.append(sketchPoint)
+      return sketchPoint
+
+
+class SketchCurves(ApiObject):
+   def __init__(self):
+      self.sketchCircles = SketchCircles()
+      self.sketchLines = SketchLines()
+
+
+class GeometricConstraint(ApiObject):
+   pass
+
+
+class GeometricConstraints(ApiCollection):
+   def _add(self):
+      constraint = GeometricConstraint()
+      self._items.append(constraint)
+      return constraint
+
+   def addCoincident(self, point, entity):
+      return self._add()
+
+   def addHorizontalPoints(self, pointOne, pointTwo):
+      return self._add()
+
+   def addTangent(self, curveOne, curveTwo):
+      return self._add()
+
+
+class SketchDimension(ApiObject):
+   def __init__(self):
+      self.parameter = ModelParameter()
+
+
+class SketchDimensions(ApiCollection):
+   def _add(self):
+      dimension = SketchDimension()
+      self._items.append(dimension)
+      return dimension
+
+   def addDistanceDimension(self, pointOne, pointTwo, orientation, textPoint, isDriving=True):
+      return self._add()
+
+   def addRadialDimension(self, entity, textPoint, isDriving=True):
+      return self._add()
+
+   def addAngularDimension(self, lineOne, lineTwo, textPoint, isDriving=True):
+      return self._add()
+
+
+class Profile(ApiObject):
+   pass
+
+
+class Profiles(ApiCollection):
+   pass
+
+
+class Sketch(ApiObject):
+   def __init__(self):
+      self.isComputeDeferred = False
+      self.originPoint = SketchPoint(core.Point3D(0.0, 0.0, 0.0))
+      self.sketchPoints = SketchPoints()
+      self.sketchCurves = SketchCurves()
+      self.geometricConstraints = GeometricConstraints()
+      self.sketchDimensions = SketchDimensions()
+
+   @property
+   def profiles(self):
+      return Profiles(Profile() for circle in self.sketchCurves.sketchCircles._items)
+
+
+class Sketches(ApiCollection):
+   def __init__(self, timeline):
+      super().__init__()
+      self._timeline = timeline
+
+   def add(self, planarEntity, occurrenceForCreation=None):
+      sketch = Sketch()
+      self._items.append(sketch)
+      self._timeline._add()
+      return sketch
+
+
+# Features
+
+class ExtrudeFeature(ApiObject):
+   def __init__(self, bodies):
+      self.bodies = BRepBodies(bodies)
+
+
+class ExtrudeFeatures(ApiCollection):
+   def __init__(self, component):
+      super().__init__()
+      self._component = component
+
+   def addSimple(self, profile, distance, operation):
+      bodies = []
+      if operation == FeatureOperations.NewBodyFeatureOperation:
+         bodies.append(BRepBody(self._component))
+         self._component._bodies.append(bodies[0])
+      feature = ExtrudeFeature(bodies)
+      self._items.append(feature)
+      self._component._timeline._add()
+      return feature
+
+
+class FilletFeatureInput(ApiObject):
+   def __init__(self):
+      self._edgeSets = []
+
+   def addConstantRadiusEdgeSet(self, edges, radius, isTangentChain):
+      self._edgeSets.append((edges, radius, isTangentChain))
+      return True
+
+
+class FilletFeature(ApiObject):
+   pass
+
+
+class FilletFeatures(ApiCollection):
+   def __init__(self, timeline):
+      super().__init__()
+      self._timeline = timeline
+
+   def createInput(self):
+      return FilletFeatureInput()
+
+   def add(self, filletInput):
+      feature = FilletFeature()
+      self._items.append(feature)
+      self._timeline._add()
+      return feature
+
+
+class CircularPatternFeatureInput(ApiObject):
+   def __init__(self, inputEntities, axis):
+      self.quantity = None
+      self.totalAngle = None
+      self._inputEntities = inputEntities
+      self._axis = axis
+
+
+class CircularPatternFeature(ApiObject):
+   pass
+
+
+class CircularPatternFeatures(ApiCollection):
+   def __init__(self, timeline):
+      super().__init__()
+      self._timeline = timeline
+
+   def createInput(self, inputEntities, axis):
+      return CircularPatternFeatureInput(inputEntities, axis)
+
+   def add(self, patternInput):
+      feature = CircularPatternFeature()
+      self._items.append(feature)
+      self._timeline._add()
+      return feature
+
+
+class MoveFeatureInput(ApiObject):
+   def __init__(self, inputEntities):
+      self._inputEntities = inputEntities
+
+   def defineAsRotate(self, axisEntity, angle):
+      self._rotation = (axisEntity, angle)
+      return True
+
+
+class MoveFeature(ApiObject):
+   pass
+
+
+class MoveFeatures(ApiCollection):
+   def __init__(self, timeline):
+      super().__init__()
+      self._timeline = timeline
+
+   def createInput2(self, inputEntities):
+      return MoveFeatureInput(inputEntities)
+
+   def add(self, moveInput):
+      feature = MoveFeature()
+      self._items.append(feature)
+      self._timeline._add()
+      return feature
+
+
+class Features(ApiObject):
+   def __init__(self, component):
+      timeline = component._timeline
+      self.extrudeFeatures = ExtrudeFeatures(component)
+      self.filletFeatures = FilletFeatures(timeline)
+      self.circularPatternFeatures = CircularPatternFeatures(timeline)
+      self.moveFeatures = MoveFeatures(timeline)
+
+
+# Joints and contact
+
+class JointGeometry(ApiObject):
+   def __init__(self, entity):
+      self._entity = entity
+
+   @staticApi
+   def createByPoint(point):
+      return JointGeometry(point)
+
+
+class AsBuiltJointInput(ApiObject):
+   def __init__(self, occurrenceOne, occurrenceTwo, geometry):
+      self._occurrences = (occurrenceOne, occurrenceTwo)
+      self._geometry = geometry
+
+   def setAsRevoluteJointMotion(self, rotationAxis, customRotationAxisEntity=None):
+      self._rotationAxis = rotationAxis
+      self._jointType = JointTypes.RevoluteJointType
+      return True
+
+   def setAsRigidJointMotion(self):
+      self._rotationAxis = None
+      self._jointType = JointTypes.RigidJointType
+      return True
+
+
+class RevoluteJointMotion(ApiObject):
+   def __init__(self, jointType):
+      self.jointType = jointType
+      self.rotationValue = 0.0
+
+
+class AsBuiltJoint(ApiObject):
+   def __init__(self, jointInput):
+      self.occurrenceOne, self.occurrenceTwo = jointInput._occurrences
+      self.jointMotion = RevoluteJointMotion(jointInput._jointType)
+      self.entityToken = _addEntity(self)
+
+
+class AsBuiltJoints(ApiCollection):
+   def __init__(self, timeline):
+      super().__init__()
+      self._timeline = timeline
+
+   def createInput(self, occurrenceOne, occurrenceTwo, geometry):
+      return AsBuiltJointInput(occurrenceOne, occurrenceTwo, geometry)
+
+   def add(self, jointInput):
+      joint = AsBuiltJoint(jointInput)
+      self._items.append(joint)
+      self._timeline._add()
+      return joint
+
+
+class ContactSet(ApiObject):
+   pass
+
+
+class ContactSets(ApiCollection):
+   def add(self, occurrencesAndBodies):
+      contactSet = ContactSet()
+      self._items.append(contactSet)
+      return contactSet
+
+
+# Custom graphics
+
+class CustomGraphicsCoordinates(ApiObject):
+   def __init__(self, coordinates):
+      self._coordinates = list(coordinates)
+
+   @staticApi
+   def create(coordinates):
+      return CustomGraphicsCoordinates(coordinates)
+
+
+class CustomGraphicsSolidColorEffect(ApiObject):
+   def __init__(self, color):
+      self.color = color
+
+   @staticApi
+   def create(color):
+      return CustomGraphicsSolidColorEffect(color)
+
+
+class CustomGraphicsLines(ApiObject):
+   def __init__(self):
+      self.color = None
+
+
+class CustomGraphicsGroup(ApiObject):
+   def __init__(self):
+      self.isValid = True
+      self._lines = []
+
+   def addLines(self, coordinates, indexList, isLineStrip, lineStripLengths=None):
+      lines = CustomGraphicsLines()
+      self._lines.append(lines)
+      return lines
+
+   def deleteMe(self):
+      self.isValid = False
+      return True
+
+
+class CustomGraphicsGroups(ApiCollection):
+   def add(self):
+      group = CustomGraphicsGroup()
+      self._items.append(group)
+      return group
+
+
+# Export
+
+class SMTExportOptions(ApiObject):
+   def __init__(self, filename, geometry):
+      self.filename = filename
+      self.geometry = geometry
+
+
+class ExportManager(ApiObject):
+   def createSMTExportOptions(self, filename, geometry):
+      return SMTExportOptions(filename, geometry)
+
+   # Writes a small stand-in file with the number of bodies of the component
+   def execute(self, exportOptions):
+      with open(exportOptions.filename, 'w') as f:
+         f.write(f'fake smt, {len(exportOptions.geometry._bodies)} bodies\n')
+      return True
+
+
+# Components
+
+class Occurrence(ApiObject):
+   def __init__(self, component, assemblyContext=None, transform=None):
+      self.component = component
+      self.isGrounded = False
+      self.assemblyContext = assemblyContext
+      self.transform = transform
+
+   def createForAssemblyContext(self, occurrence):
+      return Occurrence(self.component, occurrence)
+
+
+class Occurrences(ApiCollection):
+   def __init__(self, design):
+      super().__init__()
+      self._design = design
+
+   def addNewComponent(self, transform):
+      occurrence = Occurrence(Component(self._design), transform=transform)
+      self._items.append(occurrence)
+      self._design._timeline._add()
+      return occurrence
+
+   # One more occurrence of a component that is already in the design, its bodies are not copied
+   def addExistingComponent(self, component, transform):
+      occurrence = Occurrence(component, transform=transform)
+      self._items.append(occurrence)
+      self._design._timeline._add()
+      return occurrence
+
+
+class Component(ApiObject):
+   def __init__(self, design):
+      self._design = design
+      self._timeline = design._timeline
+      self._bodies = []
+      self.name = 'Component'
+      self.occurrences = Occurrences(design)
+      self.sketches = Sketches(self._timeline)
+      self.features = Features(self)
+      self.xYConstructionPlane = ConstructionPlane()
+      self.zConstructionAxis = ConstructionAxis()
+      self.constructionPoints = ConstructionPoints(self._timeline)
+      self.originConstructionPoint = ConstructionPoint()
+      self.asBuiltJoints = AsBuiltJoints(self._timeline)
+      self.customGraphicsGroups = CustomGraphicsGroups()
+
+   @property
+   def bRepBodies(self):
+      return BRepBodies(self._bodies)
+
+   # The fake has no shapes, every edge of every body in the component is near the point
+   def findBRepUsingPoint(self, point, entityType, proximityTolerance=-1, isVisibleEntitiesOnly=True):
+      return core.ObjectCollection([BRepEdge(body) for body in self._bodies])
+
+
+# Design
+
+class Design(ApiObject):
+   def __init__(self):
+      self._timeline = Timeline()
+      self._userParameters = UserParameters()
+      self.rootComponent = Component(self)
+      self.attributes = Attributes()
+      self.contactSets = ContactSets()
+      self.exportManager = ExportManager()
+      self.isComputeDeferred = False
+      self.isContactAnalysisEnabled = False
+      self.isContactSetAnalysis = False
+
+   @property
+   def timeline(self):
+      return self._timeline
+
+   @property
+   def userParameters(self):
+      return self._userParameters
+
+   @property
+   def allParameters(self):
+      return ParameterList(self._userParameters)
+
+   def findEntityByToken(self, entityToken):
+      return [_entities[entityToken]] if entityToken in _entities else []
+
+   def modifyParameters(self, parameters, values):
+      for parameter, value in zip(parameters, values):
+         parameter.value = value.realValue
+      return True
+
+   @staticApi
+   def cast(product):
+      return product if isinstance(product, Design) else None
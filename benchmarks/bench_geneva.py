@@ -0,0 +1,166 @@
+# Geneva Gear API Benchmark
+# Description: Builds gear pairs through the whole Create_Geneva_Gear dialog on the fake adsk package, for a
+#              sweep of slot counts and driven radii, and counts the Fusion API calls (round trips) of every
+#              phase and build section. The counts are compared to baseline.json next to this file: the run
+#              fails when any count goes up, or when the script shows a message box. Times are only reported,
+#              the fake API is far faster than Fusion so they show the cost of the script itself.
+#
+#              python bench_geneva.py                      compare to the baseline
+#              python bench_geneva.py --update-baseline    write the current counts as the new baseline
+#              python bench_geneva.py --trace 6 100        print every call of one design
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import fake_fusion
+from adsk._recorder import RECORDER
+
+_benchmarkDir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(fake_fusion.SCRIPT_DIR)
+
+import geneva_catalog
+import geneva_validation
+
+BASELINE_PATH = os.path.join(_benchmarkDir, 'baseline.json')
+
+# The sweep, driven radii in mm
+SLOT_COUNTS = (3, 4, 6, 8, 12, 20)
+DRIVEN_RADII = (40, 100, 200)
+
+
+# Design of the sweep with the JSON keys in mm: the slot radius grows with the wheel, the rest stays fixed
+def sweepValues(toothNumber, drivenRadius):
+   return {
+      'driven_radius': drivenRadius,
+      'slot_radius': max(2.0, 0.05*drivenRadius),
+      'number_of_slots': toothNumber,
+      'backlash': 0.5,
+      'thickness': 10.0,
+      'filletRadius': 0.5,
+   }
+
+
+def caseName(toothNumber, drivenRadius):
+   return f'n{toothNumber} R{drivenRadius:g}'
+
+
+# Cases of the sweep that pass geneva_validation, as (name, values). Skipped cases are printed.
+def sweepCases(limits):
+   cases = []
+   for toothNumber in SLOT_COUNTS:
+      for drivenRadius in DRIVEN_RADII:
+         values = sweepValues(toothNumber, drivenRadius)
+         problems = geneva_validation.validate(values, limits)
+         if problems:
+            print(f'Skipped {caseName(toothNumber, drivenRadius)}: {problems[0]}')
+            continue
+         cases.append((caseName(toothNumber, drivenRadius), values))
+   return cases
+
+
+# Builds one design and returns ({section: (calls, seconds)}, message boxes, seconds for the whole dialog)
+def measure(session, values):
+   start = time.perf_counter()
+   session.build(geneva_catalog.creatorArguments(values))
+   elapsed = time.perf_counter() - start
+   return RECORDER.summary(), session.messages, elapsed
+
+
+# Differences to the baseline that make the run fail, as messages
+def regressions(name, summary, baseline):
+   expected = baseline.get(name)
+   if expected is None:
+      return [f'{name}: not in the baseline, run with --update-baseline']
+   problems = []
+   for section, (calls, seconds) in summary.items():
+      if section not in expected:
+         problems.append(f'{name}: new section "{section}" with {calls} calls')
+      elif calls > expected[section]:
+         problems.append(f'{name}: {section} went from {expected[section]} to {calls} calls')
+   total = sum(calls for calls, seconds in summary.values())
+   if total > sum(expected.values()):
+      problems.append(f'{name}: total went from {sum(expected.values())} to {total} calls')
+   return problems
+
+
+def printTable(results):
+   sections = []
+   for name, summary, messages, elapsed in results:
+      for section in summary:
+         if section not in sections:
+            sections.append(section)
+   names = [name for name, summary, messages, elapsed in results]
+   width = max(len(section) for section in sections + ['total calls', 'API time (ms)', 'dialog time (ms)'])
+   print(f'{"":{width}}' + ''.join(f'{name:>10}' for name in names))
+   for section in sections:
+      row = [summary.get(section, (0, 0.0))[0] for name, summary, messages, elapsed in results]
+      print(f'{section:{width}}' + ''.join(f'{calls:>10}' for calls in row))
+   print(f'{"total calls":{width}}' + ''.join(f'{sum(calls for calls, seconds in summary.values()):>10}' for name, summary, messages, elapsed in results))
+   print(f'{"API time (ms)":{width}}' + ''.join(f'{1000*sum(seconds for calls, seconds in summary.values()):>10.2f}' for name, summary, messages, elapsed in results))
+   print(f'{"dialog time (ms)":{width}}' + ''.join(f'{1000*elapsed:>10.2f}' for name, summary, messages, elapsed in results))
+
+
+# Every call of one design, in order
+def printTrace(session, values):
+   measure(session, values)
+   for phase, section, name, kind, args, duration in RECORDER.calls:
+      call = name if kind == 'get' else f'{name}({", ".join(repr(arg) for arg in args)})'
+      print(f'{RECORDER.sectionName(phase, section):26} {kind:4} {call} {1e6*duration:.1f} us')
+
+
+def main(argv=None):
+   parser = argparse.ArgumentParser(description='Count the Fusion API calls of Create_Geneva_Gear on a fake Fusion and compare them to the baseline.')
+   parser.add_argument('--update-baseline', action='store_true', help='write the counts of this run to baseline.json')
+   parser.add_argument('--trace', nargs=2, type=float, metavar=('SLOTS', 'RADIUS'), help='print every call made for one design (radius in mm)')
+   args = parser.parse_args(argv)
+
+   with open(os.path.join(fake_fusion.SCRIPT_DIR, 'geneva_parameters.json')) as f:
+      limits = json.load(f)['geneva_mechanism']
+
+   if args.trace:
+      with fake_fusion.Session() as session:
+         printTrace(session, sweepValues(int(args.trace[0]), args.trace[1]))
+      return 0
+
+   # Every case gets its own copy of the add-in and so an empty build history, the builds of the cases
+   # before it would add to the "Recent build" list of the dialog
+   results = []
+   for name, values in sweepCases(limits):
+      with fake_fusion.Session() as session:
+         summary, messages, elapsed = measure(session, values)
+      results.append((name, summary, messages, elapsed))
+
+   printTable(results)
+
+   problems = [f'{name}: message box "{message.splitlines()[0]}"' for name, summary, messages, elapsed in results for message in messages]
+   if args.update_baseline:
+      if problems:
+         print('\n'.join(['Baseline not written:'] + problems))
+         return 1
+      baseline = {name: {section: calls for section, (calls, seconds) in summary.items()} for name, summary, messages, elapsed in results}
+      with open(BASELINE_PATH, 'w') as f:
+         json.dump(baseline, f, indent=2)
+         f.write('\n')
+      print(f'Wrote {BASELINE_PATH}')
+      return 0
+
+   if os.path.exists(BASELINE_PATH):
+      with open(BASELINE_PATH) as f:
+         baseline = json.load(f)
+      for name, summary, messages, elapsed in results:
+         problems.extend(regressions(name, summary, baseline))
+   else:
+      problems.append(f'No baseline at {BASELINE_PATH}, run with --update-baseline')
+
+   if problems:
+      print('\n'.join(['', 'FAILED:'] + problems))
+      return 1
+   print('\nNo more API calls than the baseline')
+   return 0
+
+
+if __name__ == '__main__':
+   sys.exit(main())
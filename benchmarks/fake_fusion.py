@@ -0,0 +1,158 @@
+# Fake Fusion Session
+# Description: Runs Create_Geneva_Gear without Fusion 360 on top of the fake adsk package next to this file.
+#              A session loads a copy of the add-in folder (the add-in writes its JSON file on OK), calls run
+#              and then fires the dialog events the way Fusion does: commandCreated, validateInputs, the
+#              preview, execute and destroy. Each event is a phase of the recorder, the dialog values are set
+#              between them without recording, like a user typing. Custom events fired by the worker thread of
+#              the script are handed to their handlers on the main thread by processEvents.
+
+import importlib.util
+import itertools
+import os
+import queue
+import shutil
+import sys
+import tempfile
+
+_benchmarkDir = os.path.dirname(os.path.realpath(__file__))
+if _benchmarkDir not in sys.path:
+   sys.path.insert(0, _benchmarkDir)
+
+import adsk
+from adsk._recorder import RECORDER
+
+SCRIPT_DIR = os.path.join(os.path.dirname(_benchmarkDir), 'Create_Geneva_Gear')
+SCRIPT_NAME = 'Create_Geneva_Gear.py'
+
+# Dialog inputs in GenevaCreator argument order, with the attribute that holds their value
+DIALOG_INPUTS = (
+   ('drivenRadius', 'valueOne'),
+   ('slotRadius', 'valueOne'),
+   ('toothNumber', 'value'),
+   ('backlash', 'valueOne'),
+   ('thickness', 'valueOne'),
+   ('filletRadius', 'valueOne'),
+)
+
+# Every loaded copy of the script gets its own module name
+_moduleIds = itertools.count()
+
+
+class Session:
+   # Copies the script folder to a temporary folder and loads the script from there. The build history of
+   # the add-in is left out, a session starts with none.
+   def __init__(self):
+      self.folder = tempfile.mkdtemp(prefix='geneva_bench_')
+      shutil.copytree(SCRIPT_DIR, self.folder, dirs_exist_ok=True, ignore=shutil.ignore_patterns('__pycache__', 'geneva_history.sqlite*'))
+      scriptPath = os.path.join(self.folder, SCRIPT_NAME)
+      spec = importlib.util.spec_from_file_location(f'geneva_script_{next(_moduleIds)}', scriptPath)
+      self.script = importlib.util.module_from_spec(spec)
+      spec.loader.exec_module(self.script)
+      self.command = None
+
+   def close(self):
+      shutil.rmtree(self.folder, ignore_errors=True)
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, *exc):
+      self.close()
+
+   # Starts from an empty design and a clean recorder, then starts the add-in by hand
+   def run(self):
+      RECORDER.reset()
+      self.design = adsk.fusion.Design()
+      self.app = adsk.core.Application(self.design)
+      adsk.core.Application._instance = self.app
+      self._fire('run', None, self.script.run, {'IsApplicationStartup': False})
+      self.definition = self.app.userInterface.commandDefinitions.itemById(self.script.COMMAND_ID)
+
+   # Stops the add-in, which removes its button and command
+   def stop(self):
+      self._fire('stop', None, self.script.stop, {})
+
+   # Fusion creates the command after the definition is executed and fires commandCreated
+   def createCommand(self):
+      self.command = adsk.core.Command()
+      args = adsk.core.CommandCreatedEventArgs(self.command)
+      for handler in list(self.definition.commandCreated._handlers):
+         self._fire('commandCreated', handler, handler.notify, args)
+
+   # Sets the dialog to the GenevaCreator arguments (cm and a slot count), without recording
+   def setValues(self, arguments):
+      inputs = self.command.commandInputs
+      RECORDER.startPhase(None)
+      for (inputId, attribute), value in zip(DIALOG_INPUTS, arguments):
+         setattr(inputs.itemById(inputId), attribute, value)
+
+   # The user picked or changed an input, fires inputChanged
+   def changeInput(self, inputId):
+      inputs = self.command.commandInputs
+      args = adsk.core.InputChangedEventArgs(inputs.itemById(inputId), inputs)
+      for handler in list(self.command.inputChanged._handlers):
+         self._fire('inputChanged', handler, handler.notify, args)
+
+   # Returns whether OK is enabled
+   def validateInputs(self):
+      args = adsk.core.ValidateInputsEventArgs(self.command.commandInputs)
+      for handler in list(self.command.validateInputs._handlers):
+         self._fire('validateInputs', handler, handler.notify, args)
+      RECORDER.startPhase(None)
+      return args.areInputsValid
+
+   def preview(self):
+      self._commandEvent('preview', self.command.executePreview)
+
+   def execute(self):
+      self._commandEvent('execute', self.command.execute)
+
+   def destroy(self):
+      self._commandEvent('destroy', self.command.destroy)
+
+   # Hand the custom events fired so far to their handlers, like Fusion does between UI events.
+   # Waits up to timeout seconds for the first one, returns how many were handled.
+   def processEvents(self, timeout=5.0):
+      handled = 0
+      while True:
+         try:
+            eventId, additionalInfo = self.app._firedEvents.get(timeout=timeout) if not handled else self.app._firedEvents.get_nowait()
+         except queue.Empty:
+            return handled
+         event = self.app._customEvents.get(eventId)
+         if event is not None:
+            args = adsk.core.CustomEventArgs(additionalInfo)
+            for handler in list(event._handlers):
+               self._fire('customEvent', handler, handler.notify, args)
+         handled += 1
+
+   # The whole dialog: open it, enter the values, let it check and preview them (on the worker thread),
+   # press OK and close it
+   def build(self, arguments):
+      self.run()
+      self.createCommand()
+      self.setValues(arguments)
+      valid = self.validateInputs()
+      self.preview()
+      self.processEvents()
+      if valid:
+         self.execute()
+      self.destroy()
+      return valid
+
+   # Message boxes shown so far, the script reports every failure with one
+   @property
+   def messages(self):
+      return list(self.app.userInterface._messages)
+
+   def _commandEvent(self, phase, event):
+      args = adsk.core.CommandEventArgs(self.command)
+      for handler in list(event._handlers):
+         self._fire(phase, handler, handler.notify, args)
+
+   def _fire(self, phase, handler, notify, args):
+      RECORDER.startPhase(phase)
+      try:
+         notify(args)
+      finally:
+         RECORDER.startPhase(None)
@@ -0,0 +1,12 @@
+# Test setup
+# Description: Makes the modules in Create_Geneva_Gear and the fake adsk package in benchmarks importable,
+#              the same way the add-in and the benchmark find them.
+
+import os
+import sys
+
+_rootDir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+for folder in ('Create_Geneva_Gear', 'benchmarks'):
+   path = os.path.join(_rootDir, folder)
+   if path not in sys.path:
+      sys.path.insert(0, path)
@@ -0,0 +1,56 @@
+# Clearance Check Tests
+# Description: Signed distances against a known outline, and the clearance of gear pairs that clear, among them
+#              the default design, and of one whose parts overlap deeper than the search radius.
+
+import numpy as np
+import pytest
+
+import geneva_clearance
+import geneva_geometry
+
+
+# Counter clockwise square of the given side with its corner at the origin, in the form _polylines returns
+def squareOutline(side):
+   points = np.array([(0.0, 0.0), (side, 0.0), (side, side), (0.0, side)])
+   ends = np.array([1, 2, 3, 0])
+   previous = np.array([3, 0, 1, 2])
+   return {'points': points, 'ends': ends, 'previous': previous, 'convex': np.ones(4, dtype=bool), 'loops': np.zeros(4, dtype=int)}
+
+
+def test_signed_distances_near_the_outline():
+   index = geneva_clearance.buildIndex(squareOutline(10.0), 1.0)
+   signed, closest = geneva_clearance.signedDistances(index, np.array([(5.0, 0.5), (5.0, -0.3), (-0.3, -0.4)]))
+   assert signed == pytest.approx([-0.5, 0.3, 0.5])
+   assert closest[0] == 0
+
+
+def test_signed_distances_far_from_the_outline():
+   index = geneva_clearance.buildIndex(squareOutline(10.0), 1.0)
+   signed, closest = geneva_clearance.signedDistances(index, np.array([(5.0, 5.0), (3.0, 6.5), (20.0, 5.0), (5.0, -3.0)]))
+
+   # Embedded points get their full depth, points clear of the outline get the search radius
+   assert signed == pytest.approx([-5.0, -3.0, 1.0, 1.0])
+   assert list(closest[:2] >= 0) == [True, True]
+   assert list(closest[2:]) == [-1, -1]
+
+
+def test_pair_with_clearance():
+   result = geneva_clearance.checkClearance(geneva_geometry.computeGeometry(100, 10, 6, 3, 15, 3), steps=360)
+   assert not result['interference']
+   assert result['minClearance'] > 0
+
+
+def test_default_pair_clears_with_rounded_corners():
+   # The values of geneva_parameters.json, whose sharp corners would touch the crescent
+   geometry = geneva_geometry.computeGeometry(100, 10, 6, 1, 15, 3)
+   result = geneva_clearance.checkClearance(geometry, steps=720)
+   assert not result['interference']
+   assert result['minClearance'] > 0.05
+
+
+def test_overlapping_pair_reports_full_depth():
+   # A negative backlash makes the pin and locking disc larger than the slot and cut-out they run in
+   geometry = geneva_geometry.computeGeometry(100, 10, 6, -3, 15, 3)
+   result = geneva_clearance.checkClearance(geometry, steps=360, searchRadius=2.0)
+   assert result['interference']
+   assert result['minClearance'] < -3.0
@@ -0,0 +1,151 @@
+# Dialog Tests
+# Description: Runs the add-in on the fake Fusion of the benchmark and checks what the dialog stores on the design.
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import adsk
+import fake_fusion
+import geneva_geometry
+import geneva_motion
+
+
+# Copy of the add-in loaded on the fake Fusion
+@pytest.fixture
+def session():
+   with fake_fusion.Session() as session:
+      yield session
+
+
+# Change settings of geneva_parameters.json in the copy, before the add-in is run
+def changeSettings(session, **settings):
+   path = os.path.join(session.folder, 'geneva_parameters.json')
+   with open(path) as f:
+      parameters = json.load(f)
+   parameters['geneva_mechanism'].update(settings)
+   with open(path, 'w') as f:
+      json.dump(parameters, f)
+
+
+# Open the dialog on the gear pair picked in the "Gear pair" dropdown, enter the values and press OK
+def editPair(session, name, arguments):
+   session.createCommand()
+   for listItem in session.command.commandInputs.itemById('genevaTarget').listItems:
+      listItem.isSelected = listItem.name == name
+   session.changeInput('genevaTarget')
+   session.setValues(arguments)
+   assert session.validateInputs()
+   session.execute()
+   session.destroy()
+
+
+def test_edit_replaces_motion_table(session):
+   changeSettings(session, motionMode='table')
+   assert session.build((10, 1, 6, 0.1, 1.5, 0.3))
+
+   edited = (10, 1, 5, 0.1, 1.5, 0.3)
+   editPair(session, 'geneva1', edited)
+   assert not session.messages
+
+   attributes = session.design.attributes.itemsByGroup(geneva_motion.ATTRIBUTE_GROUP)
+   assert len(attributes) == 1
+   driveToken, drivenToken, table = geneva_motion.decodeMotion(attributes[0].value)
+   assert table == pytest.approx(geneva_motion.motionTable(geneva_geometry.computeGeometry(*edited)), abs=1e-9)
+   assert session.design.findEntityByToken(driveToken) and session.design.findEntityByToken(drivenToken)
+
+
+def test_train_is_not_editable(session):
+   changeSettings(session, trainStages=3)
+   assert session.build((10, 1, 6, 0.1, 1.5, 0.3))
+
+   # A single pair next to the train can still be edited
+   session.createCommand()
+   session.command.commandInputs.itemById('trainStages').value = 1
+   session.setValues((12, 1, 6, 0.1, 1.5, 0.3))
+   assert session.validateInputs()
+   session.execute()
+   session.destroy()
+   assert not session.messages
+
+   session.createCommand()
+   names = [listItem.name for listItem in session.command.commandInputs.itemById('genevaTarget').listItems]
+   assert names == ['New gear pair', 'geneva2']
+
+
+def test_closed_dialogs_drop_their_handlers(session):
+   session.build((10, 1, 6, 0.1, 1.5, 0.3))
+   session.createCommand()
+   session.destroy()
+   assert len(session.script._handlers) == 1
+
+
+# Starting the add-in leaves NumPy to the first dialog, checked in a new interpreter
+def test_run_does_not_load_numpy():
+   code = 'import sys, fake_fusion\nwith fake_fusion.Session() as session:\n   session.run()\nprint("numpy" in sys.modules)'
+   result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(fake_fusion.__file__), capture_output=True, text=True, check=True)
+   assert result.stdout.strip() == 'False'
+
+
+def test_preset_named_none_is_rejected(session):
+   session.run()
+   session.createCommand()
+   session.setValues((10, 1, 6, 0.1, 1.5, 0.3))
+   session.command.commandInputs.itemById('presetName').value = ' None '
+   assert session.validateInputs()
+   session.execute()
+   session.destroy()
+   assert session.messages and 'None' in session.messages[-1]
+   assert not session.design.attributes.itemsByGroup('GenevaGear')
+
+   session.createCommand()
+   assert [listItem.name for listItem in session.command.commandInputs.itemById('preset').listItems] == ['None']
+   session.destroy()
+
+
+# Occurrences joined by every joint of a three stage train and whether the joint is rigid
+@pytest.mark.parametrize('layout, shafts', [
+   ('stack', [('drive1', 'drive0'), ('drive2', 'drive0')]),
+   ('chain', [('drive1', 'driven0'), ('drive2', 'driven1')]),
+])
+def test_train_joints(session, layout, shafts):
+   changeSettings(session, trainStages=3, trainLayout=layout)
+   assert session.build((10, 1, 6, 0.1, 1.5, 0.3))
+   assert not session.messages
+
+   rootComp = session.design.rootComponent
+   labels = ['ground', 'drive0', 'driven0', 'drive1', 'driven1', 'drive2', 'driven2']
+   occurrences = list(rootComp.occurrences)
+   assert len(occurrences) == len(labels)
+
+   def label(occurrence):
+      return next(name for name, item in zip(labels, occurrences) if item is occurrence)
+
+   joints = [(label(joint.occurrenceOne), label(joint.occurrenceTwo), joint.jointMotion.jointType == adsk.fusion.JointTypes.RigidJointType)
+             for joint in rootComp.asBuiltJoints]
+   assert sorted(joints) == sorted(
+      [('drive0', 'ground', False), ('driven0', 'ground', False), ('driven1', 'ground', False), ('driven2', 'ground', False)]
+      + [(stage, shaft, True) for stage, shaft in shafts])
+
+
+# The add-in shares geneva_settings with the tests, a failed write is made by replacing save
+def test_failed_save_keeps_the_settings(session, monkeypatch):
+   def failedSave(jsonPath, parameters):
+      raise OSError('disk full')
+
+   assert session.build((10, 1, 6, 0.1, 1.5, 0.3))
+   monkeypatch.setattr(sys.modules['geneva_settings'], 'save', failedSave)
+   session.createCommand()
+   session.setValues((12, 1, 6, 0.1, 1.5, 0.3))
+   assert session.validateInputs()
+   session.execute()
+   session.destroy()
+   assert 'disk full' in session.messages[-1]
+
+   # The next dialog shows the values that were written last
+   session.createCommand()
+   assert session.command.commandInputs.itemById('drivenRadius').valueOne == pytest.approx(10)
+   session.destroy()
@@ -0,0 +1,63 @@
+# History Tests
+# Description: The build history refuses updates and deletes, and builds and presets read back as written.
+
+import sqlite3
+
+import pytest
+
+import geneva_history
+
+
+def designValues(drivenRadius, toothNumber):
+   return {'driven_radius': drivenRadius, 'slot_radius': 10.0, 'number_of_slots': toothNumber,
+           'backlash': 1.0, 'thickness': 15.0, 'filletRadius': 3.0}
+
+
+@pytest.fixture
+def history(tmp_path):
+   store = geneva_history.HistoryStore(str(tmp_path / geneva_history.HISTORY_NAME))
+   yield store
+   store.close()
+
+
+@pytest.mark.parametrize('statement', ['UPDATE builds SET outcome = ?', 'DELETE FROM builds WHERE outcome <> ?'])
+def test_builds_are_append_only(history, statement):
+   history.record(designValues(100, 6), 'geneva1', 1.5, 'built')
+   connection = sqlite3.connect(history.path)
+   try:
+      with pytest.raises(sqlite3.IntegrityError, match='append-only'):
+         with connection:
+            connection.execute(statement, ('failed',))
+   finally:
+      connection.close()
+   assert history.count() == 1
+
+
+def test_recent_builds(history):
+   history.record(designValues(100, 6), 'geneva1', 1.5, 'built')
+   history.record(designValues(80, 5), None, 0.2, 'failed', 'ValueError: no')
+   history.record(designValues(120, 8), 'geneva2', 0.5, 'updated')
+   recent = history.recent()
+   assert [(build['name'], build['outcome']) for build in recent] == [('geneva2', 'updated'), ('geneva1', 'built')]
+   assert recent[1]['values'] == designValues(100, 6)
+   assert isinstance(recent[1]['values']['number_of_slots'], int)
+   assert [build['message'] for build in history.recent(outcomes=('failed',))] == ['ValueError: no']
+   with pytest.raises(ValueError):
+      history.record(designValues(100, 6), 'geneva3', 1.0, 'lost')
+
+
+def test_presets_round_trip(history):
+   history.savePreset('small', designValues(40, 4))
+   history.savePreset('large', designValues(200, 12))
+   history.savePreset('small', designValues(50, 5))
+   assert history.presetNames() == ['large', 'small']
+   assert history.preset('small') == designValues(50, 5)
+   assert history.preset('missing') is None
+
+   # The same file opened again
+   history.close()
+   reopened = geneva_history.HistoryStore(history.path)
+   try:
+      assert reopened.preset('large') == designValues(200, 12)
+   finally:
+      reopened.close()
@@ -0,0 +1,76 @@
+# Kinematics Tests
+# Description: The motion of the driven wheel against the closed form of a Geneva drive with n slots: crank ratio
+#              sin(pi/n), engagement at pi/2 - pi/n, an index of 2 pi/n per drive turn and a peak velocity of
+#              r/(1 - r) times the drive speed at the middle of the index.
+
+import math
+
+import numpy as np
+import pytest
+
+import geneva_geometry
+import geneva_kinematics
+
+SLOT_COUNTS = (3, 4, 6, 8, 12, 20)
+
+
+def gearGeometry(toothNumber):
+   return geneva_geometry.computeGeometry(100, 10, toothNumber, 1, 15, 3)
+
+
+@pytest.mark.parametrize('toothNumber', SLOT_COUNTS)
+def test_engagement_and_index(toothNumber):
+   geometry = gearGeometry(toothNumber)
+   assert geneva_kinematics.crankRatio(geometry) == pytest.approx(math.sin(math.pi/toothNumber))
+   engageAngle, dwellAngle = geneva_kinematics.engagement(geometry)
+   assert engageAngle == pytest.approx(math.pi/2 - math.pi/toothNumber)
+   assert dwellAngle == pytest.approx(math.pi/toothNumber)
+
+   # Locked half a turn from the build position, one index further after every full turn
+   assert geneva_kinematics.motion(geometry, math.pi) == pytest.approx((-math.pi/toothNumber, 0, 0, 0))
+   for turns in (1, 2, -1):
+      assert geneva_kinematics.motion(geometry, 2*math.pi*turns)[0] == pytest.approx(-2*math.pi*turns/toothNumber)
+
+
+@pytest.mark.parametrize('toothNumber', SLOT_COUNTS)
+def test_peak_velocity(toothNumber):
+   geometry = gearGeometry(toothNumber)
+   ratio = math.sin(math.pi/toothNumber)
+   driveSpeed = 2*math.pi
+   angle, velocity, acceleration, jerk = geneva_kinematics.motion(geometry, 0.0, driveSpeed)
+   assert (angle, acceleration) == pytest.approx((0, 0))
+   assert velocity == pytest.approx(-driveSpeed*ratio/(1 - ratio))
+   assert geneva_kinematics.peakMotion(geometry, driveSpeed, 2001)['velocity'] == pytest.approx(driveSpeed*ratio/(1 - ratio))
+
+
+@pytest.mark.parametrize('toothNumber', SLOT_COUNTS)
+def test_continuous_at_engagement(toothNumber):
+   geometry = gearGeometry(toothNumber)
+   engageAngle, dwellAngle = geneva_kinematics.engagement(geometry)
+   for edge in (engageAngle, -engageAngle):
+      inside = geneva_kinematics.motion(geometry, edge - math.copysign(1e-9, edge))
+      outside = geneva_kinematics.motion(geometry, edge + math.copysign(1e-9, edge))
+      assert inside[0] == pytest.approx(outside[0], abs=1e-8)
+      assert inside[0] == pytest.approx(-math.copysign(dwellAngle, edge))
+      assert inside[1] == pytest.approx(0, abs=1e-8) and outside[1] == 0
+
+
+def test_derivatives_match_differences():
+   geometry = gearGeometry(6)
+   step = 1e-6
+   for crankAngle in (-0.8, -0.3, 0.1, 0.5, 0.9):
+      before = geneva_kinematics.motion(geometry, crankAngle - step)
+      after = geneva_kinematics.motion(geometry, crankAngle + step)
+      angle, velocity, acceleration, jerk = geneva_kinematics.motion(geometry, crankAngle)
+      assert velocity == pytest.approx((after[0] - before[0])/(2*step), rel=1e-5)
+      assert acceleration == pytest.approx((after[1] - before[1])/(2*step), rel=1e-5)
+      assert jerk == pytest.approx((after[2] - before[2])/(2*step), rel=1e-4)
+
+
+def test_batch_matches_single_calls():
+   geometry = gearGeometry(5)
+   crankAngles = np.linspace(-9, 15, 997)
+   batch = geneva_kinematics.motionBatch(geometry, crankAngles, 3.0)
+   single = np.array([geneva_kinematics.motion(geometry, crankAngle, 3.0) for crankAngle in crankAngles])
+   for column, name in enumerate(('angle', 'velocity', 'acceleration', 'jerk')):
+      assert batch[name] == pytest.approx(single[:, column], abs=1e-12)
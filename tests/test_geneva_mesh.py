@@ -0,0 +1,67 @@
+# Mesh Export Tests
+# Description: The 3MF model written from character arrays reads back as the same vertices and triangles, and the
+#              binary STL of the default pair is a closed, outward facing mesh of each wheel.
+
+import re
+import zipfile
+
+import numpy as np
+import pytest
+
+import geneva_geometry
+import geneva_mesh
+
+STL_RECORD = np.dtype([('normal', '<f4', (3,)), ('corners', '<f4', (3, 3)), ('attribute', '<u2')])
+
+
+def readModel(path):
+   with zipfile.ZipFile(path) as package:
+      model = package.read('3D/3dmodel.model').decode('utf-8')
+   vertices = np.array(re.findall(r'<vertex x="([^"]+)" y="([^"]+)" z="([^"]+)"/>', model), dtype=float)
+   triangles = np.array(re.findall(r'<triangle v1="(\d+)" v2="(\d+)" v3="(\d+)"/>', model), dtype=int)
+   return model, vertices, triangles
+
+
+def test_3mf_round_trip(tmp_path):
+   vertices, triangles = geneva_mesh.partMeshes(geneva_geometry.computeGeometry(100, 10, 6, 1, 15, 3))['driven']
+   path = tmp_path / 'driven.3mf'
+   geneva_mesh.write3mf(path, vertices, triangles)
+   model, readVertices, readTriangles = readModel(path)
+   assert readVertices == pytest.approx(vertices, abs=10**-geneva_mesh.VERTEX_DECIMALS)
+   assert (readTriangles == triangles).all()
+
+
+def test_3mf_number_text(tmp_path):
+   vertices = np.array([(0.0, -0.5, 1234567.25), (10.1, -4e-7, 100.0)])
+   path = tmp_path / 'numbers.3mf'
+   geneva_mesh.write3mf(path, vertices, np.array([(0, 1, 1), (1, 0, 10000)]))
+   model, readVertices, readTriangles = readModel(path)
+   assert '<vertex x="0" y="-0.5" z="1234567.25"/>' in model
+   assert '<vertex x="10.1" y="0" z="100"/>' in model
+   assert '<triangle v1="1" v2="0" v3="10000"/>' in model
+
+
+@pytest.mark.parametrize('part', ['driven', 'drive'])
+def test_stl_is_closed(tmp_path, part):
+   geometry = geneva_geometry.computeGeometry(100, 10, 6, 1, 15, 3)
+   vertices, triangles = geneva_mesh.partMeshes(geometry)[part]
+   path = tmp_path / f'{part}.stl'
+   geneva_mesh.writeStl(path, vertices, triangles, name=f'Geneva {part}')
+
+   data = path.read_bytes()
+   assert data[:80] == f'Geneva {part}'.encode('ascii').ljust(80, b' ')
+   count = int(np.frombuffer(data[80:84], '<u4')[0])
+   assert count == len(triangles) and len(data) == 84 + STL_RECORD.itemsize*count
+   corners = np.frombuffer(data[84:], STL_RECORD)['corners'].astype(float)
+
+   # Every edge is shared by two triangles that run along it in opposite directions
+   points, corner = np.unique(corners.reshape(-1, 3), axis=0, return_inverse=True)
+   corner = corner.reshape(-1, 3)
+   edges = np.concatenate([corner[:, [0, 1]], corner[:, [1, 2]], corner[:, [2, 0]]])
+   forward = {tuple(edge) for edge in edges}
+   assert len(forward) == len(edges)
+   assert all((end, start) in forward for start, end in forward)
+
+   # Outward facing: the enclosed volume is positive and below the cylinder around the wheel
+   volume = np.einsum('ij,ij->i', corners[:, 0], np.cross(corners[:, 1], corners[:, 2])).sum()/6
+   assert 0 < volume < np.pi*(geometry['thirdDist'] + geometry['drivenRadius'])**2*2*geometry['thickness']
@@ -0,0 +1,24 @@
+# Optimizer Tests
+# Description: Designs that clear once the driven wheel has its rounded corners pass the clearance target.
+
+import geneva_optimize
+
+
+def designValues(drivenRadius, slotRadius, toothNumber, backlash=1.0, thickness=15.0, filletRadius=3.0):
+   return {
+      'driven_radius': drivenRadius,
+      'slot_radius': slotRadius,
+      'number_of_slots': toothNumber,
+      'backlash': backlash,
+      'thickness': thickness,
+      'filletRadius': filletRadius,
+   }
+
+
+def test_compact_design_survives():
+   # The default design and a compact one, both within a fraction of a mm of the drive crescent
+   candidates = [designValues(100, 10, 6), designValues(65, 2, 16)]
+   best, checked = geneva_optimize.optimize(candidates, {'minClearance': 0.0}, top=2, workers=1, steps=720)
+   assert checked == 2
+   assert [design['values']['number_of_slots'] for design in best] == [16, 6]
+   assert all(design['metrics']['clearance'] > 0 for design in best)
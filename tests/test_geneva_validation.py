@@ -0,0 +1,80 @@
+# Validation Tests
+# Description: Every problem of a parameter set is listed at once, impossible geometry is caught before it is
+#              computed into nonsense, the batch check agrees with the single one, and a JSON file with a value
+#              that is not a number gives a SettingsError.
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+import geneva_catalog
+import geneva_geometry
+import geneva_settings
+import geneva_validation
+
+SCRIPT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'Create_Geneva_Gear')
+
+
+@pytest.fixture
+def limits():
+   with open(os.path.join(SCRIPT_DIR, geneva_settings.JSON_NAME)) as f:
+      return json.load(f)['geneva_mechanism']
+
+
+def designValues(drivenRadius, slotRadius, toothNumber, backlash=1.0, thickness=15.0, filletRadius=3.0):
+   return dict(zip(geneva_catalog.PARAMETER_KEYS, (drivenRadius, slotRadius, toothNumber, backlash, thickness, filletRadius)))
+
+
+def test_default_design_is_valid(limits):
+   assert geneva_validation.validate(designValues(100, 10, 6), limits) == []
+
+
+def test_every_problem_is_listed(limits):
+   problems = geneva_validation.validate(designValues(500, 10, 6, backlash=10, thickness=1), limits)
+   assert problems == [
+      'Driven radius 500 mm is too large, must be at most 200 mm',
+      'Backlash 10 mm is too large, must be at most 5 mm',
+      'Thickness 1 mm is too small, must be at least 2 mm',
+      'Backlash 10 mm must be smaller than the slot radius 10 mm, the pin would have no size left',
+   ]
+
+
+def test_pin_base_near_the_pin_circle(limits):
+   # const2 divides by the gap between the pin base and the pin circle, it is zero at half the construction radius
+   geometry = geneva_geometry.computeGeometry(100, 10, 6, 1, 15, 3)
+   for slotRadius in (28.0, geometry['constructionRadius']/2):
+      problems = geneva_validation.validate(designValues(100, slotRadius, 6), limits)
+      assert problems[0].startswith(f'Slot radius {slotRadius:g} mm is too large for 6 slots')
+
+
+def test_slots_wider_than_their_spacing(limits):
+   problems = geneva_validation.validate(designValues(100, 15, 6, filletRadius=0.5), limits)
+   assert problems[0].startswith('Slots are wider than the space between them')
+   assert not any(problem.startswith('Slot radius') for problem in problems)
+
+
+def test_batch_matches_single_designs(limits):
+   drivenRadius, slotRadius, toothNumber = np.meshgrid([20, 60, 100, 250], [2, 8, 15, 28, 45], [2, 3, 6, 12, 20])
+   values = {
+      'driven_radius': drivenRadius.ravel(),
+      'slot_radius': slotRadius.ravel(),
+      'number_of_slots': toothNumber.ravel(),
+      'backlash': 1.0,
+      'thickness': 15.0,
+      'filletRadius': 1.0,
+   }
+   valid = geneva_validation.validateBatch(values, limits)['valid']
+   single = [not geneva_validation.validate(designValues(*design, filletRadius=1.0), limits)
+             for design in zip(values['driven_radius'], values['slot_radius'], values['number_of_slots'])]
+   assert list(valid) == single
+   assert any(single) and not all(single)
+
+
+@pytest.mark.parametrize('value', ['100', None, [100]])
+def test_settings_value_that_is_not_a_number(tmp_path, limits, value):
+   path = tmp_path / geneva_settings.JSON_NAME
+   path.write_text(json.dumps({'geneva_mechanism': dict(limits, driven_radius=value)}))
+   with pytest.raises(geneva_settings.SettingsError, match='driven_radius'):
+      geneva_settings.load(str(path))